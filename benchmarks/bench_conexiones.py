@@ -0,0 +1,108 @@
+# benchmarks/bench_conexiones.py
+# Latencia de base de datos por comando (/ver_solicitud: estado del usuario,
+# solicitud y días de antelación) con una conexión nueva por consulta, como el
+# db_connect() original, frente a la conexión persistente por hilo de
+# bot/database.py, con y sin las cachés de configuración y autorización.
+#
+#   python benchmarks/bench_conexiones.py [--comandos 2000] [--solicitudes 5000]
+
+import argparse
+import sqlite3
+
+import comun  # Añade la raíz del proyecto a sys.path
+from bot import database
+from bot.config import DB_FILE
+
+USUARIO = 1001
+
+
+def _consulta(sql, params, row_factory=None):
+    """Una consulta con su propia conexión, como las funciones originales."""
+    conn = sqlite3.connect(DB_FILE, check_same_thread=False)
+    if row_factory:
+        conn.row_factory = row_factory
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    resultado = cursor.fetchone()
+    conn.close()
+    return resultado
+
+
+def comando_original(solicitud_id):
+    _consulta("SELECT estado FROM usuarios WHERE telegram_id = ?", (USUARIO,))
+    _consulta("SELECT * FROM solicitudes WHERE id = ?", (solicitud_id,), sqlite3.Row)
+    _consulta("SELECT valor FROM configuracion WHERE clave = ?", ("dias_anticipacion",))
+
+
+def comando_persistente(solicitud_id):
+    """Las mismas tres consultas sobre la conexión persistente del hilo."""
+    with database.db_cursor() as cursor:
+        cursor.execute("SELECT estado FROM usuarios WHERE telegram_id = ?", (USUARIO,))
+        cursor.fetchone()
+    with database.db_cursor() as cursor:
+        cursor.execute("SELECT * FROM solicitudes WHERE id = ?", (solicitud_id,))
+        cursor.fetchone()
+    with database.db_cursor() as cursor:
+        cursor.execute(
+            "SELECT valor FROM configuracion WHERE clave = ?", ("dias_anticipacion",)
+        )
+        cursor.fetchone()
+
+
+def comando_actual(solicitud_id):
+    """El camino actual: filtro de autorización, solicitud y configuración en memoria."""
+    database.get_user_auth(USUARIO)
+    database.get_solicitud_by_id(solicitud_id)
+    database.get_dias_anticipacion()
+
+
+def poblar(solicitudes):
+    with database.db_cursor(commit=True) as cursor:
+        cursor.execute(
+            "INSERT INTO usuarios (telegram_id, nombre, rol, estado) VALUES (?, ?, ?, ?)",
+            (USUARIO, "Usuario", "contrataciones", "autorizado"),
+        )
+        cursor.execute(
+            "INSERT INTO configuracion (clave, valor) VALUES ('dias_anticipacion', '3')"
+        )
+        cursor.executemany(
+            "INSERT INTO solicitudes (id, solicitud_contratacion, hito_actual, "
+            "fecha_planificada_estrategia) VALUES (?, ?, 'estrategia', '2026-11-02')",
+            [(n, f"Solicitud {n}") for n in range(1, solicitudes + 1)],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--comandos", type=int, default=2000)
+    parser.add_argument("--solicitudes", type=int, default=5000)
+    args = parser.parse_args()
+
+    with comun.base_temporal():
+        poblar(args.solicitudes)
+        casos = [
+            ("Conexión por consulta (original)", comando_original),
+            ("Conexión persistente", comando_persistente),
+            ("Conexión persistente + cachés", comando_actual),
+        ]
+        print(f"/ver_solicitud: 3 consultas por comando, {args.comandos} comandos\n")
+        medias = {}
+        for nombre, comando in casos:
+            ids = iter(range(args.comandos * 2))
+
+            def siguiente():
+                comando(next(ids) % args.solicitudes + 1)
+
+            comun.medir(siguiente, 50)  # Calentamiento
+            tiempos = comun.medir(siguiente, args.comandos)
+            medias[nombre] = sum(tiempos) / len(tiempos)
+            print(f"{nombre:34} {comun.resumen(tiempos)}")
+
+        original = medias["Conexión por consulta (original)"]
+        print()
+        for nombre, media in list(medias.items())[1:]:
+            print(f"{nombre:34} {original / media:6.1f}x más rápido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# benchmarks/bench_envio.py
+# Envío de la revisión diaria contra una Bot API falsa local: el bucle original
+# (un send_message tras otro; un error se registra y el mensaje se pierde) frente
+# a MotorEnvio de bot/delivery.py. La API falsa responde con la latencia indicada,
+# aplica los límites de Telegram (30 mensajes/s en total y 1/s por chat, con
+# ráfagas de 3) devolviendo 429 con retry_after, y falla al azar con 502.
+#
+#   python benchmarks/bench_envio.py [--chats 300] [--latencia 0.1] [--errores 0.02]
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import Counter, deque
+from urllib.parse import parse_qsl
+
+import comun  # Añade la raíz del proyecto a sys.path
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from bot.delivery import MotorEnvio
+
+TOKEN = "123456:FAKE"
+
+
+class BotAPIFalsa:
+    """Servidor HTTP/1.1 mínimo con getMe y sendMessage."""
+
+    def __init__(self, latencia, errores, tasa_global=30, tasa_chat=1, rafaga_chat=3):
+        self.latencia = latencia
+        self.errores = errores
+        self.tasa_global = tasa_global
+        self.tasa_chat = tasa_chat
+        self.rafaga_chat = rafaga_chat
+        self.azar = random.Random(1)
+        self.reiniciar()
+
+    def reiniciar(self):
+        self._ventana = (
+            deque()
+        )  # Instantes de los envíos aceptados en el último segundo
+        self._chats = {}  # {chat_id: (tokens, último instante)}
+        self.entregados = Counter()  # {(chat_id, texto): veces}
+        self.rechazos = Counter()  # {código HTTP: veces}
+        self.max_por_segundo = 0
+
+    def _limite_superado(self, chat_id, ahora):
+        while self._ventana and ahora - self._ventana[0] >= 1:
+            self._ventana.popleft()
+        if len(self._ventana) >= self.tasa_global:
+            return True
+        tokens, ultimo = self._chats.get(chat_id, (self.rafaga_chat, ahora))
+        tokens = min(self.rafaga_chat, tokens + (ahora - ultimo) * self.tasa_chat)
+        if tokens < 1:
+            self._chats[chat_id] = (tokens, ahora)
+            return True
+        self._chats[chat_id] = (tokens - 1, ahora)
+        self._ventana.append(ahora)
+        self.max_por_segundo = max(self.max_por_segundo, len(self._ventana))
+        return False
+
+    async def _responder(self, metodo, parametros):
+        if metodo == "getMe":
+            return 200, {
+                "ok": True,
+                "result": {
+                    "id": 1,
+                    "is_bot": True,
+                    "first_name": "Falso",
+                    "username": "falso_bot",
+                },
+            }
+        if metodo != "sendMessage":
+            return 404, {"ok": False, "error_code": 404, "description": "Not Found"}
+
+        chat_id = int(parametros["chat_id"])
+        if self.azar.random() < self.errores:
+            await asyncio.sleep(self.latencia)
+            self.rechazos[502] += 1
+            return 502, {"ok": False, "error_code": 502, "description": "Bad Gateway"}
+        if self._limite_superado(chat_id, time.monotonic()):
+            await asyncio.sleep(self.latencia)
+            self.rechazos[429] += 1
+            return 429, {
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests: retry after 1",
+                "parameters": {"retry_after": 1},
+            }
+        await asyncio.sleep(self.latencia)
+        self.entregados[(chat_id, parametros["text"])] += 1
+        return 200, {
+            "ok": True,
+            "result": {
+                "message_id": sum(self.entregados.values()),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": parametros["text"],
+            },
+        }
+
+    async def atender(self, reader, writer):
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                _, ruta, _ = linea.decode().split(" ", 2)
+                cabeceras = {}
+                while (cabecera := await reader.readline()) not in (b"\r\n", b""):
+                    nombre, valor = cabecera.decode().split(":", 1)
+                    cabeceras[nombre.strip().lower()] = valor.strip()
+                cuerpo = await reader.readexactly(
+                    int(cabeceras.get("content-length", 0))
+                )
+                if "json" in cabeceras.get("content-type", ""):
+                    parametros = json.loads(cuerpo or b"{}")
+                else:
+                    parametros = dict(parse_qsl(cuerpo.decode()))
+                estado, respuesta = await self._responder(
+                    ruta.rsplit("/", 1)[-1], parametros
+                )
+                datos = json.dumps(respuesta).encode()
+                writer.write(
+                    f"HTTP/1.1 {estado} X\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(datos)}\r\n\r\n".encode() + datos
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def envio_original(bot, mensajes):
+    """El bucle original de check_and_send_notifications."""
+    for chat_id, texto in mensajes:
+        try:
+            await bot.send_message(chat_id=chat_id, text=texto, parse_mode="HTML")
+        except Exception:
+            pass
+
+
+async def envio_motor(bot, mensajes):
+    await MotorEnvio(bot).enviar_todos(mensajes)
+
+
+async def ejecutar(args):
+    api = BotAPIFalsa(args.latencia, args.errores)
+    servidor = await asyncio.start_server(api.atender, "127.0.0.1", 0)
+    puerto = servidor.sockets[0].getsockname()[1]
+    bot = Bot(
+        TOKEN,
+        base_url=f"http://127.0.0.1:{puerto}/bot",
+        request=HTTPXRequest(connection_pool_size=32),
+    )
+    mensajes = [
+        (1000 + chat, f"<b>Alertas</b> del chat {chat}, mensaje {n}")
+        for chat in range(args.chats)
+        for n in range(args.mensajes_por_chat)
+    ]
+    print(
+        f"{len(mensajes)} mensajes a {args.chats} chats; latencia "
+        f"{args.latencia * 1000:.0f} ms, {args.errores:.0%} de errores 502\n"
+    )
+    async with bot:
+        for nombre, enviar in (
+            ("Secuencial (original)", envio_original),
+            ("MotorEnvio", envio_motor),
+        ):
+            api.reiniciar()
+            inicio = time.perf_counter()
+            await enviar(bot, mensajes)
+            segundos = time.perf_counter() - inicio
+            entregados = len(api.entregados)
+            print(
+                f"{nombre:22} {segundos:7.1f} s | {entregados / segundos:5.1f} msg/s | "
+                f"entregados {entregados}/{len(mensajes)} | "
+                f"duplicados {sum(api.entregados.values()) - entregados} | "
+                f"429: {api.rechazos[429]} | 502: {api.rechazos[502]} | "
+                f"máx {api.max_por_segundo} msg en 1 s"
+            )
+    servidor.close()
+    await servidor.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=300)
+    parser.add_argument("--mensajes-por-chat", type=int, default=1)
+    parser.add_argument("--latencia", type=float, default=0.1)
+    parser.add_argument("--errores", type=float, default=0.02)
+    args = parser.parse_args()
+    # Los reintentos y errores ya se cuentan en la tabla
+    logging.disable(logging.CRITICAL)
+    asyncio.run(ejecutar(args))
+
+
+if __name__ == "__main__":
+    main()
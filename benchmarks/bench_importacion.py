@@ -0,0 +1,162 @@
+# benchmarks/bench_importacion.py
+# Carga de un CRONOGRAMA sintético (50.000 filas por defecto) con /sincerar_datos:
+# la carga original fila a fila (iterrows + safe_date_convert + un INSERT por fila)
+# frente a la carga vectorizada y a la lectura en streaming de bot/excel_import.py.
+#
+#   python benchmarks/bench_importacion.py [--filas 50000]
+
+import argparse
+import os
+import shutil
+import sqlite3
+import time
+
+import pandas as pd
+
+import comun  # Añade la raíz del proyecto a sys.path
+from bot import database, excel_import
+from bot.config import DB_FILE, EXCEL_CACHE_DIR, HITOS_SECUENCIA, HITO_NOMBRES_LARGOS
+
+
+def safe_date_convert(date_value):
+    if pd.isna(date_value) or date_value == "" or str(date_value).strip() == "-":
+        return None
+    try:
+        return pd.to_datetime(date_value, dayfirst=True).strftime("%Y-%m-%d")
+    except (ValueError, TypeError):
+        return None
+
+
+def sincerar_fila_a_fila(df):
+    """Reproduce la carga original de /sincerar_datos sobre el DataFrame leído."""
+    conn = sqlite3.connect(DB_FILE)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM solicitudes")
+    columnas = None
+    for _, row in df.rename(columns=excel_import.COLUMN_MAPPING).iterrows():
+        solicitud_id = row.get("id")
+        if pd.isna(solicitud_id):
+            continue
+        data = {"id": int(solicitud_id)}
+        for col in excel_import.COLUMN_MAPPING.values():
+            if col != "id":
+                data[col] = row.get(col)
+        hito_actual = None
+        for hito_key in HITOS_SECUENCIA:
+            excel_val = row.get(HITO_NOMBRES_LARGOS[hito_key])
+            if str(excel_val).strip() == "-":
+                data[f"fecha_real_{hito_key}"] = "-"
+                data[f"fecha_planificada_{hito_key}"] = None
+            else:
+                fecha_plan = safe_date_convert(excel_val)
+                data[f"fecha_planificada_{hito_key}"] = fecha_plan
+                data[f"fecha_real_{hito_key}"] = None
+                if fecha_plan and not hito_actual:
+                    hito_actual = hito_key
+        data["hito_actual"] = hito_actual
+        if columnas is None:
+            columnas = list(data)
+            sql = (
+                f"INSERT INTO solicitudes ({', '.join(columnas)}) "
+                f"VALUES ({', '.join('?' * len(columnas))})"
+            )
+        cursor.execute("SELECT 1 FROM solicitudes WHERE id = ?", (data["id"],))
+        cursor.fetchone()
+        cursor.execute(sql, [data[col] for col in columnas])
+    conn.commit()
+    conn.close()
+
+
+def sincerar_dataframe(df):
+    """Carga vectorizada de /sincerar_datos sobre el DataFrame leído."""
+    database.replace_solicitudes_from_excel([excel_import.preparar_registros(df)])
+
+
+def sincerar_archivo(file_path, streaming):
+    excel_import.EXCEL_LECTURA_STREAMING = streaming
+    shutil.rmtree(EXCEL_CACHE_DIR, ignore_errors=True)
+    excel_import.sincerar_excel(file_path)
+
+
+def contar_solicitudes():
+    conn = sqlite3.connect(DB_FILE)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM solicitudes").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=50000)
+    args = parser.parse_args()
+
+    with comun.base_temporal() as directorio:
+        ruta = os.path.join(directorio, "cronograma.xlsx")
+        inicio = time.perf_counter()
+        comun.escribir_cronograma(ruta, args.filas)
+        print(
+            f"Cronograma sintético de {args.filas} filas "
+            f"({os.path.getsize(ruta) / 1e6:.1f} MB) generado en "
+            f"{time.perf_counter() - inicio:.1f} s\n"
+        )
+
+        # El parseo con pd.read_excel es común a la carga original y a la
+        # vectorizada: se mide aparte y ambas procesan el mismo DataFrame
+        pd.read_excel(ruta, nrows=10)
+        df = None
+
+        def leer():
+            nonlocal df
+            df = pd.read_excel(ruta)
+
+        (parseo,) = comun.medir(leer)
+        print(f"{'pd.read_excel (parseo)':34} {parseo:8.2f} s")
+
+        print("\nProcesamiento del DataFrame (sin parseo):")
+        procesamiento = {}
+        for nombre, funcion in (
+            ("Fila a fila (original)", lambda: sincerar_fila_a_fila(df)),
+            ("Vectorizada", lambda: sincerar_dataframe(df)),
+        ):
+            (procesamiento[nombre],) = comun.medir(funcion)
+            print(
+                f"  {nombre:32} {procesamiento[nombre]:8.2f} s "
+                f"({contar_solicitudes()} solicitudes)"
+            )
+
+        print("\nDel archivo a la base de datos (con la caché del Excel vacía):")
+        completo = {
+            "Fila a fila (original)": parseo + procesamiento["Fila a fila (original)"]
+        }
+        print(
+            f"  {'Fila a fila (original)':32} {completo['Fila a fila (original)']:8.2f} s"
+        )
+        for nombre, streaming in (
+            ("Vectorizada", False),
+            ("Vectorizada en streaming", True),
+        ):
+            (completo[nombre],) = comun.medir(lambda: sincerar_archivo(ruta, streaming))
+            print(
+                f"  {nombre:32} {completo[nombre]:8.2f} s "
+                f"({contar_solicitudes()} solicitudes)"
+            )
+
+        # Segunda sincronización sin cambios: reutiliza la caché del Excel y los
+        # hashes de fila, por lo que no escribe ninguna solicitud
+        excel_import.EXCEL_LECTURA_STREAMING = False
+        excel_import.sincronizar_excel(ruta)
+        (sin_cambios,) = comun.medir(lambda: excel_import.sincronizar_excel(ruta))
+        print(f"  {'Sincronización sin cambios':32} {sin_cambios:8.2f} s")
+
+        original = completo["Fila a fila (original)"]
+        print(
+            f"\nAceleración del procesamiento: "
+            f"{procesamiento['Fila a fila (original)'] / procesamiento['Vectorizada']:.1f}x; "
+            f"de punta a punta: {original / completo['Vectorizada']:.1f}x "
+            f"(streaming: {original / completo['Vectorizada en streaming']:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# benchmarks/bench_render.py
+# Throughput del renderizado de bloques de /reporte_dia_pendiente para 10.000
+# solicitudes: la concatenación original con html.escape por campo frente a las
+# plantillas precompiladas de bot/render.py.
+#
+#   python benchmarks/bench_render.py [--filas 10000] [--repeticiones 5]
+
+import argparse
+import html
+from datetime import date, datetime, timedelta
+
+import comun  # Añade la raíz del proyecto a sys.path
+from bot.config import HITOS_SECUENCIA, HITO_NOMBRES_LARGOS
+from bot.handlers import _bloques_pendientes_por_fecha
+
+
+def get_tarea_a_cumplir(hito_key):
+    if not hito_key:
+        return "N/A"
+    if hito_key == "presupuesto_base":
+        return "Entrega de presupuesto base."
+    if hito_key == "fecha_solicitud":
+        return "Entrega de proceso de inicio a la Gerencia de Contrataciones."
+    hito = str(HITO_NOMBRES_LARGOS.get(hito_key, "")).lower()
+    return f"Entrega {hito} para firma de Presidencia ENT."
+
+
+def bloques_originales(pendientes_por_fecha):
+    """Construcción original de los bloques, con += y html.escape por campo."""
+    dias = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+    hoy = datetime.now().date()
+    bloques = []
+    for fecha_str in sorted(pendientes_por_fecha.keys()):
+        fecha_obj = datetime.strptime(fecha_str, "%Y-%m-%d").date()
+        nombre_dia = dias[fecha_obj.weekday()]
+        fecha_display = fecha_obj.strftime("%d/%m/%Y")
+        estatus_simbolo = "🔴" if (fecha_obj - hoy).days < 0 else "🟢"
+
+        titulo = f"<b>Fecha Límite: {nombre_dia}, {fecha_display}</b>\n\n"
+        for solicitud in pendientes_por_fecha[fecha_str]:
+            nombre_hito = HITO_NOMBRES_LARGOS.get(
+                solicitud["hito_actual"], solicitud["hito_actual"]
+            )
+            tarea = get_tarea_a_cumplir(solicitud["hito_actual"])
+
+            bloque = titulo
+            bloque += f"<b>Gerencia:</b> {html.escape(solicitud.get('gerencia', 'No especificada'))}\n"
+            bloque += f"<b>Responsable:</b> {html.escape(solicitud.get('responsable', 'No especificado'))}\n"
+            bloque += f"<b>Fase:</b> {html.escape(nombre_hito)}\n"
+            bloque += f"<b>Tarea a Cumplir:</b> {html.escape(tarea)}\n"
+            bloque += f"{estatus_simbolo} <b>Solicitud (ID {solicitud['id']}):</b> {html.escape(solicitud['solicitud_contratacion'])}\n"
+            bloque += "----------------------------------------\n\n"
+            bloques.append(bloque)
+            titulo = ""
+    return bloques
+
+
+def pendientes_sinteticos(filas):
+    """{fecha: [solicitud, ...]} con la forma de get_solicitudes_pendientes_por_dia."""
+    pendientes = {}
+    inicio = date.today() - timedelta(days=60)
+    for n in range(1, filas + 1):
+        fecha = (inicio + timedelta(days=n % 180)).isoformat()
+        pendientes.setdefault(fecha, []).append(
+            {
+                "id": n,
+                "solicitud_contratacion": f"Contratación del servicio {n} <lote {n % 97}> & cía",
+                "gerencia": f"Gerencia {n % 25}",
+                "responsable": f"Gerencia {n % 20}",
+                "hito_actual": HITOS_SECUENCIA[n % len(HITOS_SECUENCIA)],
+            }
+        )
+    return pendientes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=10000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    pendientes = pendientes_sinteticos(args.filas)
+    assert bloques_originales(pendientes) == _bloques_pendientes_por_fecha(pendientes)
+
+    casos = [
+        ("Concatenación original", lambda: bloques_originales(pendientes)),
+        ("Plantillas precompiladas", lambda: _bloques_pendientes_por_fecha(pendientes)),
+    ]
+    print(f"Renderizado de {args.filas} solicitudes (salidas idénticas)\n")
+    for nombre, funcion in casos:
+        tiempos = comun.medir(funcion, args.repeticiones)
+        mejor = min(tiempos)
+        print(
+            f"{nombre:28} {comun.resumen(tiempos)} | "
+            f"{args.filas / mejor:10,.0f} filas/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
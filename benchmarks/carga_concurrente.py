@@ -0,0 +1,113 @@
+# benchmarks/carga_concurrente.py
+# Prueba de carga: latencia de /hoy para otros usuarios mientras un administrador
+# ejecuta /sincerar_datos con un CRONOGRAMA grande. Se usan los handlers reales con
+# mensajes simulados, en dos escenarios:
+#   - en el event loop: las funciones de base de datos se llaman directamente desde
+#     los handlers, como antes de run_db;
+#   - executor: las consultas se ejecutan con run_db en el executor dedicado.
+#
+#   python benchmarks/carga_concurrente.py [--filas 20000] [--usuarios 10]
+
+import argparse
+import asyncio
+import os
+import shutil
+import time
+from types import SimpleNamespace
+
+import comun  # Añade la raíz del proyecto a sys.path
+from bot import excel_cache, handlers
+from bot.config import EXCEL_CACHE_DIR, NOMBRE_ARCHIVO_EXCEL
+from bot.database import run_db
+
+
+async def _en_el_loop(func, *args, **kwargs):
+    """Sustituto de run_db que ejecuta la consulta en el propio event loop."""
+    return func(*args, **kwargs)
+
+
+def _mensaje(rol):
+    async def reply_text(*args, **kwargs):
+        pass
+
+    update = SimpleNamespace(
+        message=SimpleNamespace(reply_text=reply_text),
+        effective_user=SimpleNamespace(id=1),
+    )
+    return update, SimpleNamespace(user_role=rol, args=[], bot_data={})
+
+
+async def _usuario(latencias, fin, pausa):
+    """
+    Un usuario que envía /hoy cada `pausa` segundos hasta que se active `fin`. La
+    latencia se mide desde la llegada programada del mensaje, por lo que incluye
+    el tiempo que espera si el event loop está bloqueado.
+    """
+    update, context = _mensaje("notificado")
+    llegada = time.perf_counter()
+    while not fin.is_set():
+        await asyncio.sleep(max(0.0, llegada - time.perf_counter()))
+        await handlers.hoy_command(update, context)
+        latencias.append(time.perf_counter() - llegada)
+        llegada += pausa
+
+
+async def escenario(usuarios, pausa, con_importacion, duracion=3.0):
+    """Latencias de /hoy de `usuarios` usuarios, con o sin /sincerar_datos a la vez."""
+    latencias, fin = [], asyncio.Event()
+    tareas = [
+        asyncio.create_task(_usuario(latencias, fin, pausa)) for _ in range(usuarios)
+    ]
+    await asyncio.sleep(pausa)
+    inicio = time.perf_counter()
+    if con_importacion:
+        # Sin caché del Excel, para que la importación incluya el parseo
+        shutil.rmtree(EXCEL_CACHE_DIR, ignore_errors=True)
+        excel_cache._memoria.clear()
+        update, context = _mensaje("admin")
+        await handlers.sincerar_datos_command(update, context)
+    else:
+        await asyncio.sleep(duracion)
+    segundos = time.perf_counter() - inicio
+    fin.set()
+    await asyncio.gather(*tareas)
+    return latencias, segundos
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=20000)
+    parser.add_argument("--usuarios", type=int, default=10)
+    parser.add_argument("--pausa", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with comun.base_temporal() as directorio:
+        comun.escribir_cronograma(
+            os.path.join(directorio, NOMBRE_ARCHIVO_EXCEL), args.filas
+        )
+        # Carga inicial para que /hoy tenga solicitudes que mostrar
+        handlers.sincerar_excel(NOMBRE_ARCHIVO_EXCEL)
+
+        print(
+            f"/hoy de {args.usuarios} usuarios (uno cada {args.pausa * 1000:.0f} ms) "
+            f"mientras se ejecuta /sincerar_datos con {args.filas} filas\n"
+        )
+        for nombre, ejecutor in (
+            ("en el event loop", _en_el_loop),
+            ("executor (run_db)", run_db),
+        ):
+            handlers.run_db = ejecutor
+            for carga, con_importacion in (("sin carga", False), ("importando", True)):
+                latencias, segundos = asyncio.run(
+                    escenario(args.usuarios, args.pausa, con_importacion)
+                )
+                print(
+                    f"{nombre:18} {carga:11} {comun.resumen(latencias)} | "
+                    f"máx {max(latencias) * 1000:8.1f} ms | "
+                    f"{len(latencias) / segundos:6.1f} /hoy/s en {segundos:5.1f} s"
+                )
+        handlers.run_db = run_db
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/comun.py
+# Utilidades compartidas por los benchmarks: base de datos temporal, cronograma
+# Excel sintético y medición de tiempos. Los benchmarks se ejecutan desde la raíz
+# del proyecto, p. ej.: python benchmarks/bench_importacion.py
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from bot.config import HITOS_SECUENCIA, HITO_NOMBRES_LARGOS  # noqa: E402
+
+
+@contextmanager
+def base_temporal():
+    """
+    Crea bot_database.db con setup_database() en un directorio temporal, que pasa a
+    ser el directorio de trabajo mientras dura el bloque. Devuelve su ruta.
+    """
+    import database_stup
+    from bot import database
+
+    anterior = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_") as directorio:
+        os.chdir(directorio)
+        try:
+            database_stup.setup_database()
+            database._config = None
+            yield directorio
+        finally:
+            database.close_all_connections()
+            os.chdir(anterior)
+
+
+def filas_cronograma(filas, inicio=date(2026, 1, 5)):
+    """
+    Filas sintéticas del CRONOGRAMA con las columnas de COLUMN_MAPPING y una fecha
+    por hito (algunas con "-" o vacías, como en el archivo real).
+    """
+    for n in range(1, filas + 1):
+        fila = {
+            "N": n,
+            "SOLICITUD DE CONTRATACIÓN": f"Contratación del servicio {n} <lote {n % 97}>",
+            "SERVICIO": f"Servicio {n % 12}",
+            "DISTRITO": f"Distrito {n % 6}",
+            "GERENCIA": f"Gerencia {n % 25}",
+            "RESPONSABLE": f"Gerencia {n % 20}",
+            "ETAPA DE CONTRATACIÓN": f"Etapa {n % 4}",
+        }
+        base = inicio + timedelta(days=n % 365)
+        for posicion, hito_key in enumerate(HITOS_SECUENCIA):
+            if (n + posicion) % 11 == 0:
+                valor = "-"
+            elif (n + posicion) % 13 == 0:
+                valor = None
+            else:
+                valor = base + timedelta(days=15 * posicion)
+            fila[HITO_NOMBRES_LARGOS[hito_key]] = valor
+        yield fila
+
+
+def escribir_cronograma(ruta, filas):
+    """Escribe un CRONOGRAMA sintético de `filas` filas en `ruta` (xlsx)."""
+    import openpyxl
+
+    wb = openpyxl.Workbook(write_only=True)
+    hoja = wb.create_sheet()
+    encabezado = None
+    for fila in filas_cronograma(filas):
+        if encabezado is None:
+            encabezado = list(fila)
+            hoja.append(encabezado)
+        hoja.append([fila[col] for col in encabezado])
+    wb.save(ruta)
+    return ruta
+
+
+def medir(funcion, repeticiones=1):
+    """Ejecuta `funcion` `repeticiones` veces y devuelve los tiempos en segundos."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def resumen(tiempos):
+    """Texto con la media, la mediana y el percentil 95 de `tiempos` (en ms)."""
+    ordenados = sorted(tiempos)
+    p95 = ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))]
+    return (
+        f"media {statistics.mean(ordenados) * 1000:9.3f} ms | "
+        f"p50 {statistics.median(ordenados) * 1000:9.3f} ms | "
+        f"p95 {p95 * 1000:9.3f} ms"
+    )
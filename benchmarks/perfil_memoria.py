@@ -0,0 +1,98 @@
+# benchmarks/perfil_memoria.py
+# Perfil de memoria de /sincerar_datos con un CRONOGRAMA sintético: lectura con
+# pd.read_excel (libro completo en memoria) frente a la lectura en streaming con
+# openpyxl read_only de bot/excel_import.py. Cada modo se ejecuta en un proceso
+# propio para que el pico de memoria (RSS) de uno no contamine al otro.
+#
+#   python benchmarks/perfil_memoria.py [--filas 50000] [--lote 500]
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import comun  # Añade la raíz del proyecto a sys.path
+
+MODOS = ("importaciones", "pandas", "streaming")
+
+
+def _rss_maximo_mb():
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / (1024 * 1024) if sys.platform == "darwin" else maximo / 1024
+
+
+def perfilar(modo, archivo, lote):
+    """Carga `archivo` con el modo indicado y devuelve las mediciones."""
+    from bot import excel_import
+
+    excel_import.EXCEL_TAMANO_LOTE = lote
+    excel_import.EXCEL_LECTURA_STREAMING = modo == "streaming"
+    with comun.base_temporal():
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        cargadas = (
+            0 if modo == "importaciones" else excel_import.sincerar_excel(archivo)
+        )
+        segundos = time.perf_counter() - inicio
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        "cargadas": cargadas,
+        "segundos": segundos,
+        "pico_python_mb": pico / 1e6,
+        "rss_maximo_mb": _rss_maximo_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filas", type=int, default=50000)
+    parser.add_argument("--lote", type=int, default=500)
+    parser.add_argument("--modo", choices=MODOS, help=argparse.SUPPRESS)
+    parser.add_argument("--archivo", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        print(json.dumps(perfilar(args.modo, args.archivo, args.lote)))
+        return
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as directorio:
+        archivo = os.path.join(directorio, "cronograma.xlsx")
+        comun.escribir_cronograma(archivo, args.filas)
+        print(
+            f"Cronograma sintético de {args.filas} filas "
+            f"({os.path.getsize(archivo) / 1e6:.1f} MB), lotes de {args.lote}\n"
+        )
+        resultados = {}
+        for modo in MODOS:
+            salida = subprocess.run(
+                [sys.executable, __file__, "--modo", modo, "--archivo", archivo]
+                + ["--lote", str(args.lote)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            resultados[modo] = json.loads(salida.strip().splitlines()[-1])
+
+    base = resultados["importaciones"]["rss_maximo_mb"]
+    print(f"RSS del proceso solo con las importaciones: {base:.0f} MB\n")
+    print(
+        f"{'Modo':12} {'Tiempo':>9} {'Pico Python':>12} {'RSS máximo':>11} {'Sobre base':>11}"
+    )
+    for modo in ("pandas", "streaming"):
+        r = resultados[modo]
+        print(
+            f"{modo:12} {r['segundos']:8.2f}s {r['pico_python_mb']:10.1f}MB "
+            f"{r['rss_maximo_mb']:9.0f}MB {r['rss_maximo_mb'] - base:9.0f}MB"
+        )
+    print("\nLos tiempos incluyen el costo de tracemalloc.")
+
+
+if __name__ == "__main__":
+    main()
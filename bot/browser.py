@@ -0,0 +1,106 @@
+# bot/browser.py
+# Navegador de resultados largos. En lugar de enviar todas las páginas de una
+# consulta, se envía la primera con botones ◀️/▶️ que editan el mismo mensaje.
+# Las páginas se renderizan una sola vez y se guardan en memoria, por usuario y
+# consulta, durante NAVEGADOR_TTL segundos.
+
+import itertools
+import time
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
+from telegram.constants import ParseMode
+from telegram.ext import ContextTypes
+
+from .config import NAVEGADOR_TTL
+from .paginator import LIMITE_MENSAJE, paginar
+
+# Prefijo de los callback_data del navegador: "pag:<consulta>:<token>:<página>"
+PREFIJO = "pag:"
+
+# Espacio reservado al final de cada página para el indicador "Página n/m"
+_RESERVA_PIE = 40
+
+# Resultados en caché: {(telegram_id, consulta): (token, páginas, expira)}
+_resultados = {}
+_tokens = itertools.count(1)
+
+
+def _purgar(ahora):
+    for clave in [c for c, (_, _, expira) in _resultados.items() if expira <= ahora]:
+        del _resultados[clave]
+
+
+def _pagina(consulta, token, paginas, indice):
+    """Texto y teclado de la página `indice` (desde 0) de un resultado."""
+    texto = paginas[indice]
+    if len(paginas) == 1:
+        return texto, None
+    texto = texto.rstrip() + f"\n\n<i>Página {indice + 1}/{len(paginas)}</i>"
+    botones = []
+    if indice > 0:
+        botones.append(
+            InlineKeyboardButton(
+                "◀️", callback_data=f"{PREFIJO}{consulta}:{token}:{indice - 1}"
+            )
+        )
+    if indice < len(paginas) - 1:
+        botones.append(
+            InlineKeyboardButton(
+                "▶️", callback_data=f"{PREFIJO}{consulta}:{token}:{indice + 1}"
+            )
+        )
+    return texto, InlineKeyboardMarkup([botones])
+
+
+async def enviar_navegable(enviar, telegram_id, consulta, bloques, encabezado=""):
+    """
+    Pagina `bloques` (HTML), guarda las páginas para `telegram_id` y `consulta`
+    (un nombre corto, sin ':') y envía la primera con `enviar` (p. ej.
+    update.message.reply_text). Un resultado nuevo reemplaza al anterior de la
+    misma consulta. Devuelve el número de páginas; si no hay ninguna, no envía nada.
+    """
+    paginas = list(paginar(bloques, encabezado, LIMITE_MENSAJE - _RESERVA_PIE))
+    if not paginas:
+        return 0
+    ahora = time.monotonic()
+    _purgar(ahora)
+    token = next(_tokens)
+    if len(paginas) > 1:
+        _resultados[(telegram_id, consulta)] = (
+            token,
+            paginas,
+            ahora + NAVEGADOR_TTL,
+        )
+    texto, teclado = _pagina(consulta, token, paginas, 0)
+    await enviar(texto, parse_mode=ParseMode.HTML, reply_markup=teclado)
+    return len(paginas)
+
+
+async def navegador_callback(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+) -> None:
+    """Atiende los botones ◀️/▶️: edita el mensaje con la página pedida."""
+    query = update.callback_query
+    try:
+        consulta, token, indice = query.data[len(PREFIJO) :].rsplit(":", 2)
+        token, indice = int(token), int(indice)
+    except ValueError:
+        await query.answer()
+        return
+
+    resultado = _resultados.get((update.effective_user.id, consulta))
+    if resultado is None or resultado[0] != token or resultado[2] <= time.monotonic():
+        await query.answer(
+            "Esta consulta expiró. Vuelve a ejecutar el comando.", show_alert=True
+        )
+        return
+
+    _, paginas, _ = resultado
+    if not 0 <= indice < len(paginas):
+        await query.answer()
+        return
+    await query.answer()
+    texto, teclado = _pagina(consulta, token, paginas, indice)
+    await query.edit_message_text(
+        texto, parse_mode=ParseMode.HTML, reply_markup=teclado
+    )
@@ -13,7 +13,39 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 NOMBRE_ARCHIVO_EXCEL = "CRONOGRAMA DE CONTRATACIÓN.xlsx"
 NOMBRE_ARCHIVO_PRINCIPAL = "CRONOGRAMA PRINCIPAL.xlsx"  # "CRONOGRAMA DE CONTRATACIÓN.xlsx"  #   # --- NUEVO ARCHIVO ---
 DB_FILE = "bot_database.db"
+# Carpeta donde se guardan los Excel ya parseados (ver bot/excel_cache.py)
+EXCEL_CACHE_DIR = os.getenv("EXCEL_CACHE_DIR", ".cache_excel")
+# Lee el Excel de /cargar_excel y /sincerar_datos fila a fila con openpyxl (menos memoria)
+EXCEL_LECTURA_STREAMING = os.getenv("EXCEL_LECTURA_STREAMING", "0") == "1"
+EXCEL_TAMANO_LOTE = int(os.getenv("EXCEL_TAMANO_LOTE", "500"))  # Filas por lote
+DB_WORKERS = int(os.getenv("DB_WORKERS", "4"))  # Hilos dedicados a consultas SQLite
+USUARIOS_CACHE_TTL = int(os.getenv("USUARIOS_CACHE_TTL", "300"))  # Segundos
+# --- Envío de mensajes (ver bot/delivery.py) ---
+ENVIO_CONCURRENCIA = int(os.getenv("ENVIO_CONCURRENCIA", "8"))  # Envíos simultáneos
+ENVIO_TASA_GLOBAL = float(os.getenv("ENVIO_TASA_GLOBAL", "25"))  # Mensajes/s (máx. 30)
+ENVIO_TASA_POR_CHAT = float(
+    os.getenv("ENVIO_TASA_POR_CHAT", "1")
+)  # Mensajes/s por chat
+ENVIO_MAX_REINTENTOS = int(os.getenv("ENVIO_MAX_REINTENTOS", "3"))
+# --- Cola persistente de mensajes (ver bot/outbox.py) ---
+COLA_INTERVALO = int(os.getenv("COLA_INTERVALO", "30"))  # Segundos entre revisiones
+COLA_LOTE = int(os.getenv("COLA_LOTE", "200"))  # Mensajes leídos por revisión
+# Intentos antes de dar un mensaje por fallido
+COLA_MAX_INTENTOS = int(os.getenv("COLA_MAX_INTENTOS", "5"))
+# --- Revisión diaria por grupos de responsable (ver bot/scheduler.py) ---
+NOTIF_GRUPOS_CONCURRENTES = int(os.getenv("NOTIF_GRUPOS_CONCURRENTES", "4"))
+# Segundos durante los que se reparten los envíos de la revisión (0 = de inmediato)
+NOTIF_ESCALONADO = int(os.getenv("NOTIF_ESCALONADO", "0"))
+# Reportes de /reporte_principal que se generan a la vez (ver bot/report_generator.py)
+REPORTES_CONCURRENTES = int(os.getenv("REPORTES_CONCURRENTES", "2"))
+# Segundos que se conservan las páginas de un resultado navegable (ver bot/browser.py)
+NAVEGADOR_TTL = int(os.getenv("NAVEGADOR_TTL", "900"))
+# Guarda los hitos en la tabla normalizada 'hitos' (requiere ejecutar migrate_db_v4.py)
+HITOS_NORMALIZADOS = os.getenv("HITOS_NORMALIZADOS", "0") == "1"
 TIMEZONE = "America/Caracas"  # Asegúrate de que esta sea tu zona horaria
+# Segundos de retraso con los que aún se ejecuta una revisión diaria que no pudo
+# lanzarse a su hora (p. ej. por un bloqueo del bucle de eventos)
+JOB_MISFIRE_GRACE = int(os.getenv("JOB_MISFIRE_GRACE", "3600"))
 
 # --- Constantes de Hitos (Movidas aquí para evitar importación circular) ---
 HITOS_SECUENCIA = [
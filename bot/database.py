@@ -1,34 +1,247 @@
 # bot/database.py
 # Todas las funciones que interactúan con la base de datos SQLite.
 
+import asyncio
+import functools
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from .config import DB_FILE, HITOS_SECUENCIA
+from .config import (
+    DB_FILE,
+    DB_WORKERS,
+    HITOS_SECUENCIA,
+    HITOS_NORMALIZADOS,
+    USUARIOS_CACHE_TTL,
+)
+from .fechas import hoy as fecha_hoy
+from .hitos import HITOS
+
+# --- Modo de Almacenamiento de Hitos ---
+# En el modo ancho cada hito vive en sus propias columnas de 'solicitudes'. En el
+# modo normalizado viven en la tabla 'hitos' y las lecturas de filas completas usan
+# la vista de compatibilidad 'vista_solicitudes'.
+if HITOS_NORMALIZADOS:
+    TABLA_SOLICITUDES = "vista_solicitudes"
+    FUENTE_HITO_ACTUAL = (
+        "hitos JOIN solicitudes ON solicitudes.id = hitos.solicitud_id"
+        " AND solicitudes.hito_actual = hitos.hito"
+    )
+    COL_FECHA_ACTUAL = "hitos.fecha_planificada"
+    # Enumerar los hitos permite a SQLite usar el índice (hito, fecha_planificada)
+    FILTRO_HITO_ACTUAL = "hitos.hito IN ({}) AND solicitudes.eliminada = 0".format(
+        ", ".join(f"'{hito}'" for hito in HITOS_SECUENCIA)
+    )
+else:
+    TABLA_SOLICITUDES = "solicitudes"
+    FUENTE_HITO_ACTUAL = "solicitudes"
+    COL_FECHA_ACTUAL = "fecha_planificada_actual"
+    FILTRO_HITO_ACTUAL = "hito_actual IS NOT NULL AND eliminada = 0"
+
+# --- Gestor de Conexiones ---
+# Cada hilo reutiliza una única conexión de larga duración. Así se evita abrir y
+# cerrar el archivo en cada consulta y el módulo sqlite3 puede reutilizar las
+# sentencias ya preparadas (caché de sentencias por conexión).
+_local = threading.local()
+_conexiones = []
+_conexiones_lock = threading.Lock()
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -8000",
+    "PRAGMA foreign_keys = ON",
+)
 
 
 def db_connect():
-    """Crea una conexión a la base de datos."""
-    return sqlite3.connect(DB_FILE, check_same_thread=False)
+    """Devuelve la conexión persistente del hilo actual, creándola si no existe."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_FILE, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        _local.conn = conn
+        with _conexiones_lock:
+            _conexiones.append(conn)
+    return conn
+
+
+def close_all_connections():
+    """Cierra todas las conexiones abiertas (se usa al apagar el bot)."""
+    with _conexiones_lock:
+        while _conexiones:
+            _conexiones.pop().close()
+    _local.__dict__.pop("conn", None)
+
+
+# --- Acceso Asíncrono ---
+# Las funciones de este módulo son síncronas. Los handlers las ejecutan en un
+# executor dedicado mediante `run_db` para no bloquear el event loop de asyncio
+# (cada hilo del executor mantiene su propia conexión persistente).
+_db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+
+
+async def run_db(func, *args, **kwargs):
+    """Ejecuta una función síncrona de base de datos en el executor dedicado."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _db_executor, functools.partial(func, *args, **kwargs)
+    )
 
 
-def get_config_value(key):
+def shutdown_db_executor():
+    """Espera a que terminen las consultas en curso y detiene el executor."""
+    _db_executor.shutdown(wait=True)
+
+
+@contextmanager
+def db_cursor(commit=False):
+    """
+    Entrega un cursor sobre la conexión del hilo. Si `commit` es True la
+    transacción se confirma al salir y se revierte si ocurre un error.
+    """
     conn = db_connect()
     cursor = conn.cursor()
-    cursor.execute("SELECT valor FROM configuracion WHERE clave = ?", (key,))
-    result = cursor.fetchone()
-    conn.close()
-    return result[0] if result else None
+    try:
+        yield cursor
+        if commit:
+            conn.commit()
+    except Exception:
+        if commit:
+            conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+# --- Configuración en Memoria ---
+# La tabla 'configuracion' se carga completa al arrancar (post_init) y se mantiene en
+# memoria; set_config_value escribe en la base de datos y en la copia (write-through),
+# así que las lecturas nunca vuelven a consultar SQLite.
+_config = None  # {clave: valor} una vez cargada
+_config_lock = threading.Lock()
+
+
+def cargar_configuracion():
+    """Lee toda la tabla 'configuracion' a memoria."""
+    global _config
+    with db_cursor() as cursor:
+        cursor.execute("SELECT clave, valor FROM configuracion")
+        valores = {row[0]: row[1] for row in cursor.fetchall()}
+    with _config_lock:
+        _config = valores
+
+
+def get_config_value(key):
+    """
+    Valor de 'configuracion' desde la copia en memoria. Si aún no se cargó, la lee
+    de la base de datos: desde el event loop se llama siempre mediante `run_db`.
+    """
+    if _config is None:
+        cargar_configuracion()
+    return _config.get(key)
 
 
 def set_config_value(key, value):
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT OR REPLACE INTO configuracion (clave, valor) VALUES (?, ?)",
-        (key, str(value)),
-    )
-    conn.commit()
-    conn.close()
+    with db_cursor(commit=True) as cursor:
+        cursor.execute(
+            "INSERT OR REPLACE INTO configuracion (clave, valor) VALUES (?, ?)",
+            (key, str(value)),
+        )
+    _actualizar_config_en_memoria({key: str(value)})
+
+
+def _actualizar_config_en_memoria(valores):
+    """Refleja en la copia en memoria valores ya escritos en 'configuracion'."""
+    if _config is None:
+        cargar_configuracion()
+    else:
+        with _config_lock:
+            _config.update(valores)
+
+
+def get_dias_anticipacion():
+    """Días de antelación de las alertas como int, o None si no están configurados."""
+    valor = get_config_value("dias_anticipacion")
+    return int(valor) if valor else None
+
+
+def get_hora_notificacion():
+    """Hora de la revisión diaria como datetime.time, o None si no está configurada."""
+    valor = get_config_value("hora_notificacion")
+    if not valor:
+        return None
+    return datetime.strptime(valor, "%H:%M").time()
+
+
+def get_ventanas_notificacion():
+    """
+    Ventanas de alerta configuradas: (días antes del vencimiento en orden
+    descendente, si se alertan las atrasadas a diario). Sin 'ventanas_notificacion'
+    se usa una única ventana de 'dias_anticipacion'; devuelve None si tampoco existe.
+    """
+    valor = get_config_value("ventanas_notificacion")
+    if not valor:
+        dias = get_dias_anticipacion()
+        return None if dias is None else ([dias], False)
+    partes = valor.split(",")
+    ventanas = sorted({int(p) for p in partes if p != "atrasadas"}, reverse=True)
+    return ventanas, "atrasadas" in partes
+
+
+# --- Caché de Autorización ---
+# Estado y rol de cada usuario en memoria durante USUARIOS_CACHE_TTL segundos, para
+# que el filtro de autorización no consulte SQLite en cada mensaje. Las funciones que
+# modifican usuarios invalidan su entrada de inmediato.
+_usuarios_cache = {}  # {telegram_id: (expira, estado, rol)}
+_usuarios_version = 0
+_usuarios_cache_lock = threading.Lock()
+
+
+def _invalidar_usuario(user_id):
+    """Elimina un usuario de la caché."""
+    global _usuarios_version
+    with _usuarios_cache_lock:
+        _usuarios_version += 1
+        _usuarios_cache.pop(user_id, None)
+
+
+def get_cached_user_auth(user_id):
+    """Devuelve (estado, rol) si el usuario está vigente en la caché, o None."""
+    with _usuarios_cache_lock:
+        entrada = _usuarios_cache.get(user_id)
+    if entrada and entrada[0] > time.monotonic():
+        return entrada[1:]
+    return None
+
+
+def get_user_auth(user_id):
+    """Devuelve (estado, rol) del usuario; (None, None) si no está registrado."""
+    cached = get_cached_user_auth(user_id)
+    if cached:
+        return cached
+    version = _usuarios_version
+    with db_cursor() as cursor:
+        cursor.execute(
+            "SELECT estado, rol FROM usuarios WHERE telegram_id = ?", (user_id,)
+        )
+        result = cursor.fetchone()
+    estado, rol = (result["estado"], result["rol"]) if result else (None, None)
+    with _usuarios_cache_lock:
+        # Si se invalidó mientras se consultaba, el resultado puede estar obsoleto
+        if version == _usuarios_version:
+            _usuarios_cache[user_id] = (
+                time.monotonic() + USUARIOS_CACHE_TTL,
+                estado,
+                rol,
+            )
+    return estado, rol
 
 
 def get_admin_id():
@@ -41,260 +254,528 @@ def set_admin_id(user_id):
 
 
 def get_user_status(user_id):
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute("SELECT estado FROM usuarios WHERE telegram_id = ?", (user_id,))
-    result = cursor.fetchone()
-    conn.close()
-    return result[0] if result else None
+    return get_user_auth(user_id)[0]
 
 
 def get_user_role(user_id):
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT rol FROM usuarios WHERE telegram_id = ? AND estado = 'autorizado'",
-        (user_id,),
-    )
-    result = cursor.fetchone()
-    conn.close()
-    return result[0] if result else None
+    estado, rol = get_user_auth(user_id)
+    return rol if estado == "autorizado" else None
 
 
 def add_pending_user(user_id, name):
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute(
-        "INSERT OR IGNORE INTO usuarios (telegram_id, nombre, rol, estado) VALUES (?, ?, ?, ?)",
-        (user_id, name, "desconocido", "pendiente"),
-    )
-    conn.commit()
-    conn.close()
+    with db_cursor(commit=True) as cursor:
+        cursor.execute(
+            "INSERT OR IGNORE INTO usuarios (telegram_id, nombre, rol, estado) VALUES (?, ?, ?, ?)",
+            (user_id, name, "desconocido", "pendiente"),
+        )
+    _invalidar_usuario(user_id)
 
 
 def get_notifiable_users():
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute("SELECT telegram_id FROM usuarios WHERE estado = 'autorizado'")
-    results = cursor.fetchall()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute("SELECT telegram_id FROM usuarios WHERE estado = 'autorizado'")
+        results = cursor.fetchall()
     return [row[0] for row in results]
 
 
 def update_user_status(user_id, rol):
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE usuarios SET rol = ?, estado = 'autorizado' WHERE telegram_id = ?",
-        (rol, user_id),
-    )
-    conn.commit()
-    updated_rows = cursor.rowcount
-    conn.close()
+    with db_cursor(commit=True) as cursor:
+        cursor.execute(
+            "UPDATE usuarios SET rol = ?, estado = 'autorizado' WHERE telegram_id = ?",
+            (rol, user_id),
+        )
+        updated_rows = cursor.rowcount
+    _invalidar_usuario(user_id)
     return updated_rows > 0
 
 
 def get_all_users():
-    conn = db_connect()
-    cursor = conn.cursor()
-    cursor.execute("SELECT telegram_id, nombre, rol, estado FROM usuarios")
-    users = cursor.fetchall()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute("SELECT telegram_id, nombre, rol, estado FROM usuarios")
+        users = cursor.fetchall()
     return users
 
 
 def get_solicitud_by_id(solicitud_id):
-    conn = db_connect()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM solicitudes WHERE id = ?", (solicitud_id,))
-    solicitud = cursor.fetchone()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute(
+            f"SELECT * FROM {TABLA_SOLICITUDES} WHERE id = ? AND eliminada = 0",
+            (solicitud_id,),
+        )
+        solicitud = cursor.fetchone()
     return solicitud
 
 
-def get_solicitudes_for_balance(distrito=None, gerencia=None, servicio=None):
-    """Obtiene todas las solicitudes activas con su gerencia, hito actual y fecha planificada."""
-    conn = db_connect()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+# --- Resumen de Estado Materializado ---
+# La tabla 'resumen_estado' guarda, por distrito/gerencia/servicio, cuántas solicitudes
+# activas hay retrasadas, próximas a vencer y a tiempo, de modo que /balance y
+# /reporte leen unos pocos grupos en vez de clasificar cada solicitud. Se recalcula
+# por grupo al completar o replanificar, por completo al importar el Excel, y de
+# forma perezosa en la primera consulta tras cambiar el día o 'dias_anticipacion'.
+CLAVE_RESUMEN_FECHA = "resumen_estado_fecha"
+CLAVE_RESUMEN_DIAS = "resumen_estado_dias"
+
+_RESUMEN_ESTADO_SQL = f"""
+    INSERT INTO resumen_estado (
+        distrito, gerencia, servicio, total, atrasadas, proximas, al_dia, proxima_fecha
+    )
+    SELECT solicitudes.distrito, solicitudes.gerencia, solicitudes.servicio,
+           COUNT(*),
+           COUNT(CASE WHEN {COL_FECHA_ACTUAL} < :hoy THEN 1 END),
+           COUNT(CASE WHEN {COL_FECHA_ACTUAL} BETWEEN :hoy AND :limite THEN 1 END),
+           COUNT(CASE WHEN {COL_FECHA_ACTUAL} > :limite THEN 1 END),
+           MIN(CASE WHEN {COL_FECHA_ACTUAL} >= :hoy THEN {COL_FECHA_ACTUAL} END)
+    FROM {FUENTE_HITO_ACTUAL}
+    WHERE {FILTRO_HITO_ACTUAL} {{condicion}}
+    GROUP BY solicitudes.distrito, solicitudes.gerencia, solicitudes.servicio
+"""
+_CONDICION_GRUPO = (
+    "{0}distrito IS :distrito AND {0}gerencia IS :gerencia AND {0}servicio IS :servicio"
+)
+
+
+def _parametros_resumen():
+    dias_anticipacion = get_dias_anticipacion() or 0
+    hoy = fecha_hoy()
+    limite = hoy + timedelta(days=dias_anticipacion)
+    return {"hoy": hoy.isoformat(), "limite": limite.isoformat()}, dias_anticipacion
+
+
+def _refrescar_resumen_estado(cursor):
+    """
+    Recalcula por completo 'resumen_estado' dentro de la transacción del llamador.
+    Devuelve la vigencia escrita en 'configuracion', que el llamador refleja en
+    memoria con `_actualizar_config_en_memoria` después del commit.
+    """
+    params, dias_anticipacion = _parametros_resumen()
+    cursor.execute("DELETE FROM resumen_estado")
+    cursor.execute(_RESUMEN_ESTADO_SQL.format(condicion=""), params)
+    vigencia = {
+        CLAVE_RESUMEN_FECHA: params["hoy"],
+        CLAVE_RESUMEN_DIAS: str(dias_anticipacion),
+    }
+    cursor.executemany(
+        "INSERT OR REPLACE INTO configuracion (clave, valor) VALUES (?, ?)",
+        vigencia.items(),
+    )
+    return vigencia
 
-    query_parts = []
-    for hito in HITOS_SECUENCIA:
-        query_parts.append(f"WHEN '{hito}' THEN fecha_planificada_{hito}")
-    case_statement = "CASE hito_actual " + " ".join(query_parts) + " END"
 
-    query = f"SELECT gerencia, ({case_statement}) as fecha_planificada FROM solicitudes WHERE hito_actual IS NOT NULL"
-    params = []
+def _refrescar_grupo_resumen(cursor, solicitud_id):
+    """Recalcula solo el grupo (distrito, gerencia, servicio) de una solicitud."""
+    cursor.execute(
+        "SELECT distrito, gerencia, servicio FROM solicitudes WHERE id = ?",
+        (solicitud_id,),
+    )
+    grupo = cursor.fetchone()
+    if not grupo:
+        return
+    params, _ = _parametros_resumen()
+    params.update(dict(grupo))
+    cursor.execute(
+        "DELETE FROM resumen_estado WHERE " + _CONDICION_GRUPO.format(""), params
+    )
+    cursor.execute(
+        _RESUMEN_ESTADO_SQL.format(
+            condicion="AND " + _CONDICION_GRUPO.format("solicitudes.")
+        ),
+        params,
+    )
 
-    if distrito and distrito != "TODOS":
-        query += " AND distrito = ?"
-        params.append(distrito)
-    if gerencia and gerencia != "TODOS":
-        query += " AND gerencia = ?"
-        params.append(gerencia)
-    if servicio and servicio != "TODOS":
-        query += " AND servicio = ?"
-        params.append(servicio)
 
-    cursor.execute(query, params)
-    results = cursor.fetchall()
-    conn.close()
+def _asegurar_resumen_vigente():
+    """Recalcula el resumen si se calculó otro día o con otro 'dias_anticipacion'."""
+    vigente = get_config_value(CLAVE_RESUMEN_FECHA) == fecha_hoy().isoformat()
+    vigente = vigente and get_config_value(CLAVE_RESUMEN_DIAS) == str(
+        get_dias_anticipacion() or 0
+    )
+    if not vigente:
+        with db_cursor(commit=True) as cursor:
+            vigencia = _refrescar_resumen_estado(cursor)
+        _actualizar_config_en_memoria(vigencia)
+
+
+def _filtros_resumen(distrito, gerencia, servicio):
+    conditions, params = [], []
+    for columna, valor in (
+        ("distrito", distrito),
+        ("gerencia", gerencia),
+        ("servicio", servicio),
+    ):
+        if valor and valor != "TODOS":
+            conditions.append(f"{columna} = ?")
+            params.append(valor)
+    return conditions, params
+
+
+def get_balance_resumen(distrito=None, gerencia=None, servicio=None):
+    """
+    Devuelve (total, atrasadas, proximas, al_dia) de las solicitudes activas,
+    leídos del resumen materializado.
+    """
+    _asegurar_resumen_vigente()
+    conditions, params = _filtros_resumen(distrito, gerencia, servicio)
+    query = "SELECT TOTAL(total), TOTAL(atrasadas), TOTAL(proximas), TOTAL(al_dia) FROM resumen_estado"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    with db_cursor() as cursor:
+        cursor.execute(query, params)
+        result = cursor.fetchone()
+    return tuple(int(valor) for valor in result)
+
+
+def get_balance_por_gerencia(distrito=None, gerencia=None, servicio=None):
+    """
+    Devuelve, por gerencia, los totales del resumen materializado y la fecha del
+    próximo hito pendiente (hoy o posterior).
+    """
+    _asegurar_resumen_vigente()
+    conditions, params = _filtros_resumen(distrito, gerencia, servicio)
+    conditions.insert(0, "gerencia IS NOT NULL AND gerencia != ''")
+    query = f"""
+        SELECT gerencia, SUM(total) AS total, SUM(atrasadas) AS atrasadas,
+               SUM(proximas) AS proximas, SUM(al_dia) AS al_dia,
+               MIN(proxima_fecha) AS proxima_fecha
+        FROM resumen_estado
+        WHERE {" AND ".join(conditions)}
+        GROUP BY gerencia
+        ORDER BY gerencia
+    """
+    with db_cursor() as cursor:
+        cursor.execute(query, params)
+        results = cursor.fetchall()
     return [dict(row) for row in results]
 
 
-def get_unique_column_values(column_name, distrito=None, gerencia=None, status="all"):
-    """Obtiene valores únicos de una columna, con filtros opcionales."""
-    conn = db_connect()
-    cursor = conn.cursor()
+# --- Índice de Facetas en Memoria ---
+# Los teclados de filtros (distrito, gerencia, servicio) se responden desde un índice
+# en memoria {(distrito, gerencia, servicio): [solicitudes, retrasadas]} sin consultar
+# SQLite. Se construye al arrancar, se actualiza por grupo al completar o replanificar
+# y se reconstruye al importar el Excel o al cambiar el día.
+COLUMNAS_FACETAS = ("distrito", "gerencia", "servicio")
+_facetas = {}
+_facetas_fecha = None
+_facetas_lock = threading.Lock()
+
+_FACETAS_TOTAL_SQL = """
+    SELECT solicitudes.distrito, solicitudes.gerencia, solicitudes.servicio, COUNT(*)
+    FROM solicitudes
+    WHERE solicitudes.eliminada = 0 {condicion}
+    GROUP BY solicitudes.distrito, solicitudes.gerencia, solicitudes.servicio
+"""
+_FACETAS_RETRASADAS_SQL = f"""
+    SELECT solicitudes.distrito, solicitudes.gerencia, solicitudes.servicio, COUNT(*)
+    FROM {FUENTE_HITO_ACTUAL}
+    WHERE {FILTRO_HITO_ACTUAL} AND {COL_FECHA_ACTUAL} < :hoy {{condicion}}
+    GROUP BY solicitudes.distrito, solicitudes.gerencia, solicitudes.servicio
+"""
+
+
+def _consultar_facetas(cursor, condicion="", params=None):
+    hoy_str = fecha_hoy().isoformat()
+    params = dict(params or {}, hoy=hoy_str)
+    facetas = {}
+    cursor.execute(_FACETAS_TOTAL_SQL.format(condicion=condicion), params)
+    for distrito, gerencia, servicio, total in cursor.fetchall():
+        facetas[(distrito, gerencia, servicio)] = [total, 0]
+    cursor.execute(_FACETAS_RETRASADAS_SQL.format(condicion=condicion), params)
+    for distrito, gerencia, servicio, retrasadas in cursor.fetchall():
+        facetas[(distrito, gerencia, servicio)][1] = retrasadas
+    return facetas, hoy_str
+
+
+def _construir_indice_facetas(cursor):
+    """Consulta el índice completo; se publica con `_publicar_indice_facetas`."""
+    return _consultar_facetas(cursor)
+
+
+def _publicar_indice_facetas(indice):
+    global _facetas, _facetas_fecha
+    facetas, hoy_str = indice
+    with _facetas_lock:
+        _facetas, _facetas_fecha = facetas, hoy_str
+
+
+def _refrescar_grupo_facetas(cursor, solicitud_id):
+    """
+    Consulta solo el grupo (distrito, gerencia, servicio) de una solicitud y
+    devuelve (grupo, conteos) para `_publicar_grupo_facetas`, o None si no existe.
+    """
+    cursor.execute(
+        "SELECT distrito, gerencia, servicio FROM solicitudes WHERE id = ?",
+        (solicitud_id,),
+    )
+    grupo = cursor.fetchone()
+    if not grupo:
+        return None
+    facetas, _ = _consultar_facetas(
+        cursor, "AND " + _CONDICION_GRUPO.format("solicitudes."), dict(grupo)
+    )
+    clave = tuple(grupo)
+    return clave, facetas.get(clave)
 
-    query = f"SELECT DISTINCT {column_name} FROM solicitudes WHERE {column_name} IS NOT NULL AND {column_name} != ''"
-    params = []
 
-    if status == "delayed":
-        hoy_str = datetime.now().strftime("%Y-%m-%d")
-        case_statement = "CASE hito_actual "
-        for hito in HITOS_SECUENCIA:
-            case_statement += f"WHEN '{hito}' THEN fecha_planificada_{hito} "
-        case_statement += "END"
-        query += f" AND hito_actual IS NOT NULL AND ({case_statement}) < ?"
-        params.append(hoy_str)
+def _publicar_grupo_facetas(grupo):
+    """
+    Aplica al índice compartido un grupo consultado por `_refrescar_grupo_facetas`.
+    Se llama después del commit para no publicar cambios que aún pueden revertirse.
+    """
+    if grupo is None:
+        return
+    clave, conteos = grupo
+    with _facetas_lock:
+        if conteos is not None:
+            _facetas[clave] = conteos
+        else:
+            _facetas.pop(clave, None)
 
-    if distrito and distrito != "TODOS":
-        query += " AND distrito = ?"
-        params.append(distrito)
-    if gerencia and gerencia != "TODOS":
-        query += " AND gerencia = ?"
-        params.append(gerencia)
 
-    query += f" ORDER BY {column_name}"
-    cursor.execute(query, params)
-    values = [row[0] for row in cursor.fetchall()]
-    conn.close()
-    return values
+def cargar_indice_facetas():
+    """Construye el índice de facetas (se llama al arrancar el bot)."""
+    with db_cursor() as cursor:
+        indice = _construir_indice_facetas(cursor)
+    _publicar_indice_facetas(indice)
+
+
+def get_unique_column_values(column_name, distrito=None, gerencia=None, status="all"):
+    """
+    Obtiene valores únicos de una columna de COLUMNAS_FACETAS, con filtros opcionales,
+    a partir del índice de facetas en memoria.
+    """
+    if _facetas_fecha != fecha_hoy().isoformat():
+        cargar_indice_facetas()
+    posicion = COLUMNAS_FACETAS.index(column_name)
+    with _facetas_lock:
+        grupos = list(_facetas.items())
+
+    values = set()
+    for (distrito_g, gerencia_g, servicio_g), (_, retrasadas) in grupos:
+        if status == "delayed" and not retrasadas:
+            continue
+        if distrito and distrito != "TODOS" and distrito_g != distrito:
+            continue
+        if gerencia and gerencia != "TODOS" and gerencia_g != gerencia:
+            continue
+        value = (distrito_g, gerencia_g, servicio_g)[posicion]
+        if value is not None and value != "":
+            values.add(value)
+    # Mismo orden que ORDER BY en SQLite: primero los números y luego el texto
+    return sorted(values, key=lambda value: (isinstance(value, str), value))
 
 
 def get_filtered_solicitudes(distrito=None, servicio=None):
-    conn = db_connect()
-    cursor = conn.cursor()
     query = "SELECT id, solicitud_contratacion FROM solicitudes"
     params = []
-    conditions = []
+    conditions = ["eliminada = 0"]
     if distrito and distrito != "TODOS":
         conditions.append("distrito = ?")
         params.append(distrito)
     if servicio and servicio != "TODOS":
         conditions.append("servicio = ?")
         params.append(servicio)
-    if conditions:
-        query += " WHERE " + " AND ".join(conditions)
+    query += " WHERE " + " AND ".join(conditions)
     query += " ORDER BY id"
-    cursor.execute(query, params)
-    solicitudes = cursor.fetchall()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute(query, params)
+        solicitudes = cursor.fetchall()
     return solicitudes
 
 
+def _escribir_columnas_anchas(cursor, solicitud_id, claves):
+    """
+    Copia los hitos `claves` de la tabla 'hitos' a sus columnas de 'solicitudes'.
+    Mientras existan esas columnas el modo normalizado las mantiene al día, así que
+    volver a HITOS_NORMALIZADOS=0 no recupera fechas desactualizadas.
+    """
+    for clave in claves:
+        hito = HITOS[clave]
+        cursor.execute(
+            f"""
+            UPDATE solicitudes SET
+                {hito.col_planificada} = hitos.fecha_planificada,
+                {hito.col_real} = hitos.fecha_real,
+                {hito.col_posposiciones} = hitos.posposiciones,
+                {hito.col_historial} = hitos.historial_fechas
+            FROM hitos
+            WHERE solicitudes.id = ? AND hitos.solicitud_id = solicitudes.id
+              AND hitos.hito = ?
+            """,
+            (solicitud_id, clave),
+        )
+
+
 def completar_hito_actual(solicitud_id):
-    conn = db_connect()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    cursor.execute("SELECT hito_actual FROM solicitudes WHERE id = ?", (solicitud_id,))
-    solicitud = cursor.fetchone()
-    if not solicitud or not solicitud["hito_actual"]:
-        return None, None
-    hito_actual = solicitud["hito_actual"]
-    fecha_real_col = f"fecha_real_{hito_actual}"
-    hoy_str = datetime.now().strftime("%Y-%m-%d")
-    cursor.execute(
-        f"UPDATE solicitudes SET {fecha_real_col} = ? WHERE id = ?",
-        (hoy_str, solicitud_id),
+    with db_cursor(commit=True) as cursor:
+        cursor.execute(
+            "SELECT hito_actual FROM solicitudes WHERE id = ? AND eliminada = 0",
+            (solicitud_id,),
+        )
+        solicitud = cursor.fetchone()
+        if not solicitud or not solicitud["hito_actual"]:
+            return None, None
+        hito_actual = solicitud["hito_actual"]
+        fecha_real_col = HITOS[hito_actual].col_real
+        hoy_str = fecha_hoy().isoformat()
+        nuevo_hito = HITOS[hito_actual].siguiente
+        if HITOS_NORMALIZADOS:
+            cursor.execute(
+                "UPDATE hitos SET fecha_real = ? WHERE solicitud_id = ? AND hito = ?",
+                (hoy_str, solicitud_id, hito_actual),
+            )
+            cursor.execute(
+                "UPDATE solicitudes SET hito_actual = ? WHERE id = ?",
+                (nuevo_hito, solicitud_id),
+            )
+            _escribir_columnas_anchas(cursor, solicitud_id, [hito_actual])
+        else:
+            cursor.execute(
+                f"UPDATE solicitudes SET {fecha_real_col} = ?, hito_actual = ? WHERE id = ?",
+                (hoy_str, nuevo_hito, solicitud_id),
+            )
+        _refrescar_grupo_resumen(cursor, solicitud_id)
+        facetas = _refrescar_grupo_facetas(cursor, solicitud_id)
+    _publicar_grupo_facetas(facetas)
+    return hito_actual, nuevo_hito
+
+
+# Ajuste en cascada sobre la tabla 'hitos' en una sola sentencia: la CTE recorre los
+# hitos posteriores en orden y mueve al día siguiente de la fecha de referencia
+# cada hito que quede en o antes de ella, igual que el recorrido del modo ancho.
+_CASCADA_HITOS_SQL = """
+    WITH RECURSIVE cascada(orden, referencia, nueva_fecha) AS (
+        SELECT ?, ?, NULL
+        UNION ALL
+        SELECT h.orden,
+               CASE WHEN h.fecha_planificada <= c.referencia
+                    THEN date(c.referencia, '+1 day') ELSE c.referencia END,
+               CASE WHEN h.fecha_planificada <= c.referencia
+                    THEN date(c.referencia, '+1 day') END
+        FROM cascada c
+        JOIN hitos h ON h.solicitud_id = ? AND h.orden = c.orden + 1
     )
-    indice_actual = HITOS_SECUENCIA.index(hito_actual)
-    nuevo_hito = None
-    if indice_actual + 1 < len(HITOS_SECUENCIA):
-        nuevo_hito = HITOS_SECUENCIA[indice_actual + 1]
-    cursor.execute(
-        "UPDATE solicitudes SET hito_actual = ? WHERE id = ?",
-        (nuevo_hito, solicitud_id),
+    UPDATE hitos
+    SET fecha_planificada = (
+        SELECT nueva_fecha FROM cascada WHERE cascada.orden = hitos.orden
     )
-    conn.commit()
-    conn.close()
-    return hito_actual, nuevo_hito
+    WHERE solicitud_id = ?
+      AND orden IN (SELECT orden FROM cascada WHERE nueva_fecha IS NOT NULL)
+    RETURNING orden, hito, fecha_planificada
+"""
+
+
+def _replanificar_hito_normalizado(solicitud_id, nueva_fecha_str):
+    """Versión de replanificar_hito_actual para el modo normalizado."""
+    with db_cursor(commit=True) as cursor:
+        cursor.execute(
+            "SELECT hito_actual FROM solicitudes WHERE id = ? AND eliminada = 0",
+            (solicitud_id,),
+        )
+        solicitud = cursor.fetchone()
+        if not solicitud or not solicitud["hito_actual"]:
+            return None, []
+        hito_actual = solicitud["hito_actual"]
+        cursor.execute(
+            """
+            UPDATE hitos SET
+                historial_fechas = CASE
+                    WHEN fecha_planificada IS NULL THEN historial_fechas
+                    WHEN historial_fechas IS NULL OR historial_fechas = '' THEN fecha_planificada
+                    ELSE historial_fechas || ', ' || fecha_planificada END,
+                posposiciones = posposiciones + (fecha_planificada IS NOT NULL),
+                fecha_planificada = ?
+            WHERE solicitud_id = ? AND hito = ?
+            """,
+            (nueva_fecha_str, solicitud_id, hito_actual),
+        )
+        cursor.execute(
+            _CASCADA_HITOS_SQL,
+            (
+                HITOS[hito_actual].orden,
+                nueva_fecha_str,
+                solicitud_id,
+                solicitud_id,
+            ),
+        )
+        ajustados = sorted(cursor.fetchall(), key=lambda row: row["orden"])
+        _escribir_columnas_anchas(
+            cursor, solicitud_id, [hito_actual] + [row["hito"] for row in ajustados]
+        )
+        _refrescar_grupo_resumen(cursor, solicitud_id)
+        facetas = _refrescar_grupo_facetas(cursor, solicitud_id)
+    _publicar_grupo_facetas(facetas)
+    return hito_actual, [(row["hito"], row["fecha_planificada"]) for row in ajustados]
 
 
 def replanificar_hito_actual(solicitud_id, nueva_fecha_str):
-    conn = db_connect()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
+    if HITOS_NORMALIZADOS:
+        return _replanificar_hito_normalizado(solicitud_id, nueva_fecha_str)
     solicitud = get_solicitud_by_id(solicitud_id)
     if not solicitud or not solicitud["hito_actual"]:
         return None, []
     hito_actual = solicitud["hito_actual"]
-    indice_hito_actual = HITOS_SECUENCIA.index(hito_actual)
-    fecha_plan_col = f"fecha_planificada_{hito_actual}"
-    historial_col = f"historial_fechas_{hito_actual}"
-    posposiciones_col = f"posposiciones_{hito_actual}"
+    hito = HITOS[hito_actual]
+    fecha_plan_col = hito.col_planificada
+    historial_col = hito.col_historial
+    posposiciones_col = hito.col_posposiciones
     fecha_anterior = solicitud[fecha_plan_col]
-    if fecha_anterior:
-        query = f"UPDATE solicitudes SET {fecha_plan_col} = ?, {historial_col} = CASE WHEN {historial_col} IS NULL OR {historial_col} = '' THEN ? ELSE {historial_col} || ', ' || ? END, {posposiciones_col} = {posposiciones_col} + 1 WHERE id = ?"
-        cursor.execute(
-            query, (nueva_fecha_str, fecha_anterior, fecha_anterior, solicitud_id)
-        )
-    else:
-        cursor.execute(
-            f"UPDATE solicitudes SET {fecha_plan_col} = ? WHERE id = ?",
-            (nueva_fecha_str, solicitud_id),
-        )
-    hitos_ajustados = []
-    fecha_referencia = datetime.strptime(nueva_fecha_str, "%Y-%m-%d")
-    for i in range(indice_hito_actual + 1, len(HITOS_SECUENCIA)):
-        hito_futuro = HITOS_SECUENCIA[i]
-        fecha_futura_col = f"fecha_planificada_{hito_futuro}"
-        fecha_futura_actual_str = solicitud[fecha_futura_col]
-        if fecha_futura_actual_str:
-            fecha_futura_actual = datetime.strptime(fecha_futura_actual_str, "%Y-%m-%d")
-            if fecha_futura_actual <= fecha_referencia:
-                fecha_referencia += timedelta(days=1)
-                nueva_fecha_futura_str = fecha_referencia.strftime("%Y-%m-%d")
-                cursor.execute(
-                    f"UPDATE solicitudes SET {fecha_futura_col} = ? WHERE id = ?",
-                    (nueva_fecha_futura_str, solicitud_id),
+    with db_cursor(commit=True) as cursor:
+        if fecha_anterior:
+            query = f"UPDATE solicitudes SET {fecha_plan_col} = ?, {historial_col} = CASE WHEN {historial_col} IS NULL OR {historial_col} = '' THEN ? ELSE {historial_col} || ', ' || ? END, {posposiciones_col} = {posposiciones_col} + 1 WHERE id = ?"
+            cursor.execute(
+                query, (nueva_fecha_str, fecha_anterior, fecha_anterior, solicitud_id)
+            )
+        else:
+            cursor.execute(
+                f"UPDATE solicitudes SET {fecha_plan_col} = ? WHERE id = ?",
+                (nueva_fecha_str, solicitud_id),
+            )
+        hitos_ajustados = []
+        fecha_referencia = datetime.strptime(nueva_fecha_str, "%Y-%m-%d")
+        for hito_futuro in HITOS_SECUENCIA[hito.orden + 1 :]:
+            fecha_futura_col = HITOS[hito_futuro].col_planificada
+            fecha_futura_actual_str = solicitud[fecha_futura_col]
+            if fecha_futura_actual_str:
+                fecha_futura_actual = datetime.strptime(
+                    fecha_futura_actual_str, "%Y-%m-%d"
                 )
-                hitos_ajustados.append((hito_futuro, nueva_fecha_futura_str))
-    conn.commit()
-    conn.close()
+                if fecha_futura_actual <= fecha_referencia:
+                    fecha_referencia += timedelta(days=1)
+                    nueva_fecha_futura_str = fecha_referencia.strftime("%Y-%m-%d")
+                    cursor.execute(
+                        f"UPDATE solicitudes SET {fecha_futura_col} = ? WHERE id = ?",
+                        (nueva_fecha_futura_str, solicitud_id),
+                    )
+                    hitos_ajustados.append((hito_futuro, nueva_fecha_futura_str))
+        _refrescar_grupo_resumen(cursor, solicitud_id)
+        facetas = _refrescar_grupo_facetas(cursor, solicitud_id)
+    _publicar_grupo_facetas(facetas)
     return hito_actual, hitos_ajustados
 
 
+def set_responsable(solicitud_id, responsable):
+    """Reasigna la gerencia responsable de una solicitud."""
+    with db_cursor(commit=True) as cursor:
+        cursor.execute(
+            "UPDATE solicitudes SET responsable = ? WHERE id = ?",
+            (responsable, solicitud_id),
+        )
+
+
 def get_solicitudes_for_today():
-    conn = db_connect()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    hoy_str = datetime.now().strftime("%Y-%m-%d")
-    cursor.execute("SELECT * FROM solicitudes WHERE hito_actual IS NOT NULL")
-    solicitudes_activas = cursor.fetchall()
-    solicitudes_de_hoy = []
-    for solicitud in solicitudes_activas:
-        hito_actual = solicitud["hito_actual"]
-        fecha_plan = solicitud[f"fecha_planificada_{hito_actual}"]
-        if fecha_plan == hoy_str:
-            solicitudes_de_hoy.append(dict(solicitud))
-    conn.close()
-    return solicitudes_de_hoy
+    hoy_str = fecha_hoy().isoformat()
+    with db_cursor() as cursor:
+        cursor.execute(
+            f"SELECT * FROM {TABLA_SOLICITUDES} WHERE id IN (SELECT solicitudes.id FROM {FUENTE_HITO_ACTUAL} WHERE {FILTRO_HITO_ACTUAL} AND {COL_FECHA_ACTUAL} = ?)",
+            (hoy_str,),
+        )
+        solicitudes_de_hoy = cursor.fetchall()
+    return [dict(row) for row in solicitudes_de_hoy]
 
 
 def get_delayed_solicitudes(distrito=None, gerencia=None, servicio=None):
     """Obtiene las solicitudes retrasadas, opcionalmente filtradas."""
-    conn = db_connect()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    hoy_str = datetime.now().strftime("%Y-%m-%d")
-    query_parts = []
-    for hito in HITOS_SECUENCIA:
-        query_parts.append(f"WHEN '{hito}' THEN fecha_planificada_{hito}")
-    case_statement = "CASE hito_actual " + " ".join(query_parts) + " END"
-    query = f"SELECT id, solicitud_contratacion, gerencia, responsable, hito_actual, ({case_statement}) as fecha_planificada FROM solicitudes WHERE hito_actual IS NOT NULL AND ({case_statement}) < ?"
+    hoy_str = fecha_hoy().isoformat()
+    query = f"SELECT id, solicitud_contratacion, gerencia, responsable, hito_actual, {COL_FECHA_ACTUAL} as fecha_planificada FROM {FUENTE_HITO_ACTUAL} WHERE {FILTRO_HITO_ACTUAL} AND {COL_FECHA_ACTUAL} < ?"
     params = [hoy_str]
     if distrito and distrito != "TODOS":
         query += " AND distrito = ?"
@@ -306,94 +787,403 @@ def get_delayed_solicitudes(distrito=None, gerencia=None, servicio=None):
         query += " AND servicio = ?"
         params.append(servicio)
     query += " ORDER BY gerencia, fecha_planificada"
-    cursor.execute(query, params)
-    solicitudes = cursor.fetchall()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute(query, params)
+        solicitudes = cursor.fetchall()
     return [dict(row) for row in solicitudes]
 
 
-def solicitud_exists(cursor, solicitud_id):
-    """Verifica si una solicitud ya existe en la base de datos."""
-    cursor.execute("SELECT 1 FROM solicitudes WHERE id = ?", (solicitud_id,))
-    return cursor.fetchone() is not None
+# Valor por defecto de `responsable`: None es un grupo válido (sin responsable)
+_TODOS = object()
 
 
-def update_solicitud_info_from_excel(cursor, data):
-    """Actualiza la información descriptiva de una solicitud."""
-    cursor.execute(
-        """
-        UPDATE solicitudes SET 
-            solicitud_contratacion = ?, servicio = ?, distrito = ?, gerencia = ?, 
-            responsable = ?, etapa_contratacion = ?
-        WHERE id = ?
-    """,
-        (
-            data["solicitud_contratacion"],
-            data["servicio"],
-            data["distrito"],
-            data["gerencia"],
-            data["responsable"],
-            data["etapa_contratacion"],
-            data["id"],
-        ),
+def _rango_notificacion(hasta, desde):
+    if desde:
+        return f"{COL_FECHA_ACTUAL} BETWEEN ? AND ?", [desde, hasta]
+    return f"{COL_FECHA_ACTUAL} <= ?", [hasta]
+
+
+def get_responsables_para_notificar(hasta, desde=None):
+    """Responsables con algún hito actual que vence en el rango de notificación."""
+    rango, params = _rango_notificacion(hasta, desde)
+    query = f"""
+        SELECT DISTINCT responsable FROM {FUENTE_HITO_ACTUAL}
+        WHERE {FILTRO_HITO_ACTUAL} AND {rango}
+    """
+    with db_cursor() as cursor:
+        cursor.execute(query, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def get_solicitudes_para_notificar(hasta, desde=None, responsable=_TODOS):
+    """
+    Obtiene en una sola consulta por rango (sobre el índice de la fecha del hito
+    actual) las solicitudes cuyo hito actual vence hasta `hasta` y, si se indica,
+    desde `desde`. Con `responsable` se limita a un grupo y usa el índice
+    (responsable, fecha); None en un grupo representa las solicitudes sin responsable.
+    """
+    rango, params = _rango_notificacion(hasta, desde)
+    if responsable is not _TODOS:
+        rango = f"responsable IS ? AND {rango}"
+        params = [responsable] + params
+    query = f"""
+        SELECT id, solicitud_contratacion, hito_actual, responsable, gerencia, distrito,
+            {COL_FECHA_ACTUAL} AS fecha_vencimiento
+        FROM {FUENTE_HITO_ACTUAL}
+        WHERE {FILTRO_HITO_ACTUAL} AND {rango}
+        ORDER BY responsable, {COL_FECHA_ACTUAL}, id
+    """
+    with db_cursor() as cursor:
+        cursor.execute(query, params)
+        solicitudes = cursor.fetchall()
+    return solicitudes
+
+
+# --- Suscripciones a Notificaciones ---
+CAMPOS_SUSCRIPCION = ("gerencia", "distrito")
+
+
+def get_suscripciones():
+    """Devuelve {telegram_id: {"gerencia": {...}, "distrito": {...}}}."""
+    with db_cursor() as cursor:
+        cursor.execute("SELECT telegram_id, campo, valor FROM suscripciones")
+        suscripciones = {}
+        for telegram_id, campo, valor in cursor.fetchall():
+            suscripciones.setdefault(telegram_id, {}).setdefault(campo, set()).add(
+                valor
+            )
+    return suscripciones
+
+
+def add_suscripcion(telegram_id, campo, valor):
+    with db_cursor(commit=True) as cursor:
+        cursor.execute(
+            "INSERT OR IGNORE INTO suscripciones (telegram_id, campo, valor) VALUES (?, ?, ?)",
+            (telegram_id, campo, valor),
+        )
+        return cursor.rowcount > 0
+
+
+def delete_suscripciones(telegram_id, campo=None, valor=None):
+    """Elimina una suscripción concreta o, sin campo, todas las del usuario."""
+    with db_cursor(commit=True) as cursor:
+        if campo is None:
+            cursor.execute(
+                "DELETE FROM suscripciones WHERE telegram_id = ?", (telegram_id,)
+            )
+        else:
+            cursor.execute(
+                "DELETE FROM suscripciones WHERE telegram_id = ? AND campo = ? AND valor = ?",
+                (telegram_id, campo, valor),
+            )
+        return cursor.rowcount
+
+
+# --- Estado de los Jobs Programados ---
+def get_estado_job(id_job):
+    with db_cursor() as cursor:
+        cursor.execute(
+            "SELECT ultima_ejecucion, fin_ejecucion, resultado FROM estado_jobs WHERE id_job = ?",
+            (id_job,),
+        )
+        return cursor.fetchone()
+
+
+def registrar_ejecucion_job(id_job, inicio, fin, resultado):
+    with db_cursor(commit=True) as cursor:
+        cursor.execute(
+            """
+            INSERT INTO estado_jobs (id_job, ultima_ejecucion, fin_ejecucion, resultado)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (id_job) DO UPDATE SET
+                ultima_ejecucion = excluded.ultima_ejecucion,
+                fin_ejecucion = excluded.fin_ejecucion,
+                resultado = excluded.resultado
+            """,
+            (id_job, inicio, fin, resultado),
+        )
+
+
+def contar_mensajes_por_estado():
+    """Devuelve {estado: cantidad} de los mensajes de la cola."""
+    with db_cursor() as cursor:
+        cursor.execute("SELECT estado, COUNT(*) FROM cola_mensajes GROUP BY estado")
+        return dict(cursor.fetchall())
+
+
+# --- Cola Persistente de Mensajes ---
+# Las alertas se encolan en 'cola_mensajes' y un worker (bot/outbox.py) las envía.
+# 'log_notificaciones' registra cada alerta (solicitud, hito, fecha, usuario) con su
+# estado de entrega; su índice único impide encolar dos veces la misma alerta.
+def get_alertas_registradas(desde):
+    """
+    Devuelve {(id_solicitud, hito, nombre_evento, fecha_evento, telegram_id)} de las
+    alertas ya encoladas con fecha_evento >= desde.
+    """
+    with db_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT id_solicitud, hito, nombre_evento, fecha_evento, telegram_id_usuario
+            FROM log_notificaciones WHERE fecha_evento >= ?
+            """,
+            (desde,),
+        )
+        return {tuple(row) for row in cursor.fetchall()}
+
+
+def encolar_mensajes(mensajes, escalonado=0):
+    """
+    Encola en una sola transacción una lista de (id_mensaje, telegram_id, texto,
+    alertas), donde alertas es [(id_solicitud, hito, nombre_evento, fecha_evento), ...].
+    Las alertas se registran primero: un mensaje cuyas alertas ya estaban todas
+    registradas (p. ej. por otra revisión simultánea) se descarta. Con `escalonado`
+    (segundos), los envíos se reparten a lo largo de ese intervalo.
+    Devuelve el número de mensajes encolados.
+    """
+    inicio = datetime.now()
+    ahora = inicio.strftime("%Y-%m-%d %H:%M:%S")
+    paso = escalonado / len(mensajes) if mensajes else 0
+    encolados = 0
+    with db_cursor(commit=True) as cursor:
+        for id_mensaje, telegram_id, texto, alertas in mensajes:
+            nuevas = 0
+            for id_solicitud, hito, nombre_evento, fecha_evento in alertas:
+                cursor.execute(
+                    """
+                    INSERT OR IGNORE INTO log_notificaciones (
+                        id_solicitud, nombre_evento, fecha_notificacion,
+                        telegram_id_usuario, hito, fecha_evento, id_mensaje
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        id_solicitud,
+                        nombre_evento,
+                        ahora,
+                        telegram_id,
+                        hito,
+                        fecha_evento,
+                        id_mensaje,
+                    ),
+                )
+                nuevas += cursor.rowcount
+            if not nuevas:
+                continue
+            proximo_intento = inicio + timedelta(seconds=encolados * paso)
+            cursor.execute(
+                """
+                INSERT INTO cola_mensajes (
+                    id_mensaje, telegram_id_usuario, texto, proximo_intento, fecha_creacion
+                ) VALUES (?, ?, ?, ?, ?)
+                """,
+                (
+                    id_mensaje,
+                    telegram_id,
+                    texto,
+                    proximo_intento.strftime("%Y-%m-%d %H:%M:%S"),
+                    ahora,
+                ),
+            )
+            encolados += 1
+    return encolados
+
+
+def get_mensajes_pendientes(limite):
+    """Mensajes pendientes cuyo próximo intento ya venció, en orden de creación."""
+    ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with db_cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT id_mensaje, telegram_id_usuario, texto, intentos
+            FROM cola_mensajes
+            WHERE estado = 'pendiente' AND proximo_intento <= ?
+            ORDER BY fecha_creacion, rowid
+            LIMIT ?
+            """,
+            (ahora, limite),
+        )
+        return cursor.fetchall()
+
+
+def marcar_mensaje_enviado(id_mensaje):
+    ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with db_cursor(commit=True) as cursor:
+        cursor.execute(
+            "UPDATE cola_mensajes SET estado = 'enviado', intentos = intentos + 1, fecha_envio = ? WHERE id_mensaje = ?",
+            (ahora, id_mensaje),
+        )
+        cursor.execute(
+            "UPDATE log_notificaciones SET estado = 'enviado', intentos = intentos + 1, fecha_notificacion = ? WHERE id_mensaje = ?",
+            (ahora, id_mensaje),
+        )
+
+
+def marcar_mensaje_fallido(id_mensaje, max_intentos, espera_segundos):
+    """
+    Registra un intento fallido. El mensaje se reprograma tras `espera_segundos`
+    o queda como 'fallido' al alcanzar `max_intentos`.
+    """
+    proximo = (datetime.now() + timedelta(seconds=espera_segundos)).strftime(
+        "%Y-%m-%d %H:%M:%S"
     )
+    with db_cursor(commit=True) as cursor:
+        cursor.execute(
+            """
+            UPDATE cola_mensajes SET
+                intentos = intentos + 1,
+                estado = CASE WHEN intentos + 1 >= ? THEN 'fallido' ELSE 'pendiente' END,
+                proximo_intento = ?
+            WHERE id_mensaje = ?
+            RETURNING estado
+            """,
+            (max_intentos, proximo, id_mensaje),
+        )
+        estado = cursor.fetchone()[0]
+        cursor.execute(
+            "UPDATE log_notificaciones SET estado = ?, intentos = intentos + 1 WHERE id_mensaje = ?",
+            (estado, id_mensaje),
+        )
+    return estado
+
+
+# --- Carga masiva desde el Excel ---
+# Orden de las columnas en los registros que entrega bot/excel_import.py
+COLUMNAS_DESCRIPTIVAS_EXCEL = [
+    "solicitud_contratacion",
+    "servicio",
+    "distrito",
+    "gerencia",
+    "responsable",
+    "etapa_contratacion",
+]
+COLUMNAS_SOLICITUD_EXCEL = (
+    ["id"]
+    + COLUMNAS_DESCRIPTIVAS_EXCEL
+    + ["hito_actual"]
+    + [f"fecha_planificada_{hito}" for hito in HITOS_SECUENCIA]
+    + [f"fecha_real_{hito}" for hito in HITOS_SECUENCIA]
+    + ["hash_fila"]
+)
+_POS_HASH_FILA = COLUMNAS_SOLICITUD_EXCEL.index("hash_fila")
+
+# Las solicitudes nuevas se insertan completas; en las existentes solo se
+# actualizan los datos descriptivos (y su hash) para no perder el progreso de los
+# hitos. Una solicitud que reaparece en el Excel deja de estar eliminada.
+_UPSERT_SOLICITUD_SQL = (
+    f"INSERT INTO solicitudes ({', '.join(COLUMNAS_SOLICITUD_EXCEL)}) "
+    f"VALUES ({', '.join('?' for _ in COLUMNAS_SOLICITUD_EXCEL)}) "
+    "ON CONFLICT(id) DO UPDATE SET "
+    + ", ".join(
+        f"{col} = excluded.{col}" for col in COLUMNAS_DESCRIPTIVAS_EXCEL + ["hash_fila"]
+    )
+    + ", eliminada = 0"
+)
 
+_INSERT_HITOS_SQL = """
+    INSERT OR IGNORE INTO hitos (
+        solicitud_id, hito, orden, fecha_planificada, fecha_real
+    ) VALUES (?, ?, ?, ?, ?)
+"""
 
-def insert_solicitud_from_excel(cursor, data):
-    """Inserta una nueva solicitud con todos sus datos desde el Excel."""
-    cursor.execute(
-        """
-        INSERT INTO solicitudes (
-            id, solicitud_contratacion, servicio, distrito, gerencia, responsable,
-            etapa_contratacion, hito_actual,
-            fecha_planificada_presupuesto_base, fecha_real_presupuesto_base,
-            fecha_planificada_fecha_solicitud, fecha_real_fecha_solicitud,
-            fecha_planificada_estrategia, fecha_real_estrategia,
-            fecha_planificada_inicio, fecha_real_inicio,
-            fecha_planificada_decision, fecha_real_decision,
-            fecha_planificada_acta_otorgamiento, fecha_real_acta_otorgamiento,
-            fecha_planificada_notif_otorgamiento, fecha_real_notif_otorgamiento,
-            fecha_planificada_contrato, fecha_real_contrato
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """,
-        (
-            data["id"],
-            data["solicitud_contratacion"],
-            data["servicio"],
-            data["distrito"],
-            data["gerencia"],
-            data["responsable"],
-            data["etapa_contratacion"],
-            data["hito_actual"],
-            data.get("fecha_planificada_presupuesto_base"),
-            data.get("fecha_real_presupuesto_base"),
-            data.get("fecha_planificada_fecha_solicitud"),
-            data.get("fecha_real_fecha_solicitud"),
-            data.get("fecha_planificada_estrategia"),
-            data.get("fecha_real_estrategia"),
-            data.get("fecha_planificada_inicio"),
-            data.get("fecha_real_inicio"),
-            data.get("fecha_planificada_decision"),
-            data.get("fecha_real_decision"),
-            data.get("fecha_planificada_acta_otorgamiento"),
-            data.get("fecha_real_acta_otorgamiento"),
-            data.get("fecha_planificada_notif_otorgamiento"),
-            data.get("fecha_real_notif_otorgamiento"),
-            data.get("fecha_planificada_contrato"),
-            data.get("fecha_real_contrato"),
-        ),
+
+def _filas_hitos(registros):
+    """Genera las filas de la tabla 'hitos' a partir de los registros del Excel."""
+    base_plan = COLUMNAS_SOLICITUD_EXCEL.index(
+        f"fecha_planificada_{HITOS_SECUENCIA[0]}"
     )
+    base_real = COLUMNAS_SOLICITUD_EXCEL.index(f"fecha_real_{HITOS_SECUENCIA[0]}")
+    for registro in registros:
+        for orden, hito in enumerate(HITOS_SECUENCIA):
+            yield (
+                registro[0],
+                hito,
+                orden,
+                registro[base_plan + orden],
+                registro[base_real + orden],
+            )
+
+
+def _guardar_registros_excel(cursor, registros):
+    cursor.executemany(_UPSERT_SOLICITUD_SQL, registros)
+    if HITOS_NORMALIZADOS:
+        cursor.executemany(_INSERT_HITOS_SQL, _filas_hitos(registros))
+
+
+def sincronizar_solicitudes_from_excel(lotes):
+    """
+    Sincronización incremental con el Excel en una sola transacción: solo escribe
+    las filas nuevas o cuyo hash cambió, y marca como eliminadas las solicitudes
+    que ya no aparecen en el archivo. Recibe los registros en lotes (listas) para
+    que la lectura del Excel pueda hacerse en streaming.
+    Devuelve (insertadas, actualizadas, sin_cambios, eliminadas).
+    """
+    inserted_count, updated_count, unchanged_count = 0, 0, 0
+    with db_cursor(commit=True) as cursor:
+        cursor.execute("SELECT id, hash_fila, eliminada FROM solicitudes")
+        existentes = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+
+        vistas = set()
+        for lote in lotes:
+            # Si un N se repite en el Excel, prevalece la última fila
+            por_id = {registro[0]: registro for registro in lote}
+            a_guardar = []
+            for solicitud_id, registro in por_id.items():
+                actual = existentes.get(solicitud_id)
+                if actual is None:
+                    inserted_count += 1
+                elif actual[0] != registro[_POS_HASH_FILA] or actual[1]:
+                    updated_count += 1
+                else:
+                    unchanged_count += 1
+                    continue
+                a_guardar.append(registro)
+                existentes[solicitud_id] = (registro[_POS_HASH_FILA], 0)
+            vistas.update(por_id)
+            _guardar_registros_excel(cursor, a_guardar)
+
+        faltantes = [
+            (solicitud_id,)
+            for solicitud_id, (_, eliminada) in existentes.items()
+            if not eliminada and solicitud_id not in vistas
+        ]
+        cursor.executemany(
+            "UPDATE solicitudes SET eliminada = 1 WHERE id = ?", faltantes
+        )
+        vigencia = _refrescar_resumen_estado(cursor)
+        indice = _construir_indice_facetas(cursor)
+    _actualizar_config_en_memoria(vigencia)
+    _publicar_indice_facetas(indice)
+
+    return inserted_count, updated_count, unchanged_count, len(faltantes)
+
+
+def replace_solicitudes_from_excel(lotes):
+    """
+    Borra todas las solicitudes y carga los lotes de registros del Excel en una
+    sola transacción. Devuelve el número de registros cargados.
+    """
+    total = 0
+    with db_cursor(commit=True) as cursor:
+        # 'log_notificaciones' referencia a 'solicitudes': la verificación se aplaza
+        # hasta el commit para conservar el historial de las solicitudes recargadas
+        cursor.execute("PRAGMA defer_foreign_keys = ON")
+        cursor.execute("DELETE FROM solicitudes")
+        for lote in lotes:
+            _guardar_registros_excel(cursor, lote)
+            total += len(lote)
+        cursor.execute(
+            "DELETE FROM log_notificaciones WHERE id_solicitud NOT IN (SELECT id FROM solicitudes)"
+        )
+        vigencia = _refrescar_resumen_estado(cursor)
+        indice = _construir_indice_facetas(cursor)
+    _actualizar_config_en_memoria(vigencia)
+    _publicar_indice_facetas(indice)
+    return total
 
 
 def get_solicitudes_unidad_usuaria(distrito=None, gerencia=None, servicio=None):
     """Obtiene las solicitudes donde la gerencia es igual al responsable."""
-    conn = db_connect()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    query = "SELECT * FROM solicitudes WHERE gerencia = responsable"
     params = []
-    conditions = ["gerencia = responsable"]
+    conditions = ["gerencia = responsable", "eliminada = 0"]
 
     if distrito and distrito != "TODOS":
         conditions.append("distrito = ?")
@@ -406,26 +1196,19 @@ def get_solicitudes_unidad_usuaria(distrito=None, gerencia=None, servicio=None):
         params.append(servicio)
 
     query = (
-        "SELECT * FROM solicitudes WHERE " + " AND ".join(conditions) + " ORDER BY id"
+        f"SELECT * FROM {TABLA_SOLICITUDES} WHERE "
+        + " AND ".join(conditions)
+        + " ORDER BY id"
     )
 
-    cursor.execute(query, params)
-    solicitudes = cursor.fetchall()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute(query, params)
+        solicitudes = cursor.fetchall()
     return [dict(row) for row in solicitudes]
 
 
 def get_solicitudes_pendientes_por_dia():
     """Obtiene todas las solicitudes pendientes, ordenadas por su próxima fecha de hito."""
-    conn = db_connect()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    query_parts = []
-    for hito in HITOS_SECUENCIA:
-        query_parts.append(f"WHEN '{hito}' THEN fecha_planificada_{hito}")
-    case_statement = "CASE hito_actual " + " ".join(query_parts) + " END"
-
     query = f"""
         SELECT 
             id, 
@@ -433,15 +1216,15 @@ def get_solicitudes_pendientes_por_dia():
             gerencia, 
             responsable, 
             hito_actual, 
-            ({case_statement}) as fecha_planificada 
-        FROM solicitudes 
-        WHERE hito_actual IS NOT NULL AND fecha_planificada IS NOT NULL
-        ORDER BY fecha_planificada
+            {COL_FECHA_ACTUAL} as fecha_planificada 
+        FROM {FUENTE_HITO_ACTUAL} 
+        WHERE {FILTRO_HITO_ACTUAL} AND {COL_FECHA_ACTUAL} IS NOT NULL
+        ORDER BY {COL_FECHA_ACTUAL}
     """
 
-    cursor.execute(query)
-    solicitudes = cursor.fetchall()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute(query)
+        solicitudes = cursor.fetchall()
     return [dict(row) for row in solicitudes]
 
 
@@ -450,15 +1233,6 @@ def get_solicitudes_unidad_usuaria_pendientes_por_dia():
     Obtiene todas las solicitudes pendientes donde la gerencia es el responsable,
     ordenadas por su próxima fecha de hito.
     """
-    conn = db_connect()
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    query_parts = []
-    for hito in HITOS_SECUENCIA:
-        query_parts.append(f"WHEN '{hito}' THEN fecha_planificada_{hito}")
-    case_statement = "CASE hito_actual " + " ".join(query_parts) + " END"
-
     query = f"""
         SELECT
             id,
@@ -466,15 +1240,15 @@ def get_solicitudes_unidad_usuaria_pendientes_por_dia():
             gerencia,
             responsable,
             hito_actual,
-            ({case_statement}) as fecha_planificada
-        FROM solicitudes
-        WHERE hito_actual IS NOT NULL
-          AND fecha_planificada IS NOT NULL
+            {COL_FECHA_ACTUAL} as fecha_planificada
+        FROM {FUENTE_HITO_ACTUAL}
+        WHERE {FILTRO_HITO_ACTUAL}
+          AND {COL_FECHA_ACTUAL} IS NOT NULL
           AND gerencia = responsable
-        ORDER BY fecha_planificada
+        ORDER BY {COL_FECHA_ACTUAL}
     """
 
-    cursor.execute(query)
-    solicitudes = cursor.fetchall()
-    conn.close()
+    with db_cursor() as cursor:
+        cursor.execute(query)
+        solicitudes = cursor.fetchall()
     return [dict(row) for row in solicitudes]
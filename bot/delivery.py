@@ -0,0 +1,148 @@
+# bot/delivery.py
+# Motor de envío de mensajes: envía en paralelo respetando los límites de Telegram
+# (global y por chat), la espera indicada por RetryAfter y reintentando los errores
+# transitorios de red.
+
+import asyncio
+import random
+from datetime import timedelta
+
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+from .config import (
+    logger,
+    ENVIO_CONCURRENCIA,
+    ENVIO_TASA_GLOBAL,
+    ENVIO_TASA_POR_CHAT,
+    ENVIO_MAX_REINTENTOS,
+)
+
+
+class TokenBucket:
+    """Limitador de tasa: `tasa` mensajes por segundo con ráfagas de `capacidad`."""
+
+    def __init__(self, tasa, capacidad):
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.tokens = capacidad
+        self.ultimo = None
+
+    async def adquirir(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            ahora = loop.time()
+            if self.ultimo is not None:
+                self.tokens = min(
+                    self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa
+                )
+            self.ultimo = ahora
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.tasa)
+
+
+class MotorEnvio:
+    """
+    Envía lotes de mensajes con concurrencia acotada. Los mensajes de un mismo chat
+    se envían en orden; los de chats distintos, en paralelo.
+    """
+
+    def __init__(
+        self,
+        bot,
+        concurrencia=ENVIO_CONCURRENCIA,
+        tasa_global=ENVIO_TASA_GLOBAL,
+        tasa_por_chat=ENVIO_TASA_POR_CHAT,
+        max_reintentos=ENVIO_MAX_REINTENTOS,
+    ):
+        self.bot = bot
+        self.max_reintentos = max_reintentos
+        self.tasa_por_chat = tasa_por_chat
+        self._semaforo = asyncio.Semaphore(concurrencia)
+        # Sin ráfagas: con capacidad `tasa_global` caben hasta 2 * tasa_global envíos
+        # en un mismo segundo, por encima del límite de 30/s de Telegram
+        self._bucket_global = TokenBucket(tasa_global, 1)
+        self._buckets_chat = {}
+        # Tras un RetryAfter, Telegram bloquea al bot completo: todos esperan
+        self._pausa_hasta = 0.0
+
+    async def _esperar_turno(self, chat_id):
+        loop = asyncio.get_running_loop()
+        while loop.time() < self._pausa_hasta:
+            await asyncio.sleep(self._pausa_hasta - loop.time())
+        bucket = self._buckets_chat.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets_chat[chat_id] = TokenBucket(self.tasa_por_chat, 1)
+        await bucket.adquirir()
+        await self._bucket_global.adquirir()
+
+    async def enviar(self, chat_id, text, parse_mode=ParseMode.HTML, **kwargs):
+        """Envía un mensaje con reintentos. Devuelve True si se entregó."""
+        for intento in range(self.max_reintentos + 1):
+            await self._esperar_turno(chat_id)
+            try:
+                async with self._semaforo:
+                    await self.bot.send_message(
+                        chat_id=chat_id, text=text, parse_mode=parse_mode, **kwargs
+                    )
+                return True
+            except RetryAfter as e:
+                espera = e.retry_after
+                if isinstance(espera, timedelta):
+                    espera = espera.total_seconds()
+                logger.warning(
+                    f"Límite de Telegram alcanzado; pausando envíos {espera} s."
+                )
+                loop = asyncio.get_running_loop()
+                self._pausa_hasta = max(self._pausa_hasta, loop.time() + espera)
+            except (BadRequest, Forbidden) as e:
+                # Errores permanentes (chat inexistente, bot bloqueado...): no se reintenta
+                logger.error(f"No se pudo enviar el mensaje a {chat_id}: {e}")
+                return False
+            except NetworkError as e:
+                if intento == self.max_reintentos:
+                    logger.error(
+                        f"No se pudo enviar el mensaje a {chat_id} tras {intento + 1} intentos: {e}"
+                    )
+                    return False
+                espera = min(30, 2**intento) + random.uniform(0, 1)
+                logger.warning(
+                    f"Error de red enviando a {chat_id} ({e}); reintento en {espera:.1f} s."
+                )
+                await asyncio.sleep(espera)
+        logger.error(f"No se pudo enviar el mensaje a {chat_id}: límite de reintentos.")
+        return False
+
+    async def _enviar_chat(self, chat_id, mensajes, al_terminar):
+        enviados = 0
+        for indice, text, kwargs in mensajes:
+            ok = await self.enviar(chat_id, text, **kwargs)
+            if ok:
+                enviados += 1
+            if al_terminar is not None:
+                await al_terminar(indice, ok)
+        return enviados
+
+    async def enviar_todos(self, mensajes, al_terminar=None):
+        """
+        Envía una lista de (chat_id, texto) o (chat_id, texto, kwargs).
+        Si se indica, se espera `al_terminar(indice, ok)` tras cada mensaje.
+        Devuelve (enviados, fallidos).
+        """
+        por_chat = {}
+        for indice, mensaje in enumerate(mensajes):
+            chat_id, text = mensaje[0], mensaje[1]
+            kwargs = mensaje[2] if len(mensaje) > 2 else {}
+            por_chat.setdefault(chat_id, []).append((indice, text, kwargs))
+
+        resultados = await asyncio.gather(
+            *(
+                self._enviar_chat(chat_id, lista, al_terminar)
+                for chat_id, lista in por_chat.items()
+            )
+        )
+        enviados = sum(resultados)
+        total = sum(len(lista) for lista in por_chat.values())
+        return enviados, total - enviados
@@ -0,0 +1,121 @@
+# bot/digest.py
+# Resúmenes diarios de alertas. Cada bloque (encabezado de responsable y
+# detalle de solicitud) se renderiza una sola vez por día; el resumen de cada
+# usuario se compone uniendo los fragmentos ya renderizados.
+
+import threading
+
+from . import render
+from .fechas import formato_display
+from .hitos import nombre_hito_html, tarea_alerta_html
+from .paginator import LIMITE_MENSAJE, longitud
+
+# Fragmentos renderizados del día: {clave: texto}; se vacía al cambiar de fecha
+_fragmentos = {}
+_fragmentos_fecha = None
+_fragmentos_lock = threading.Lock()
+
+
+def _describir_plazo(dias):
+    if dias < 0:
+        return f"⚠️ atrasada {-dias} día(s)"
+    if dias == 0:
+        return "vence hoy"
+    return f"vence en {dias} día(s)"
+
+
+def _renderizar_encabezado(hoy):
+    return (
+        "<b>PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n"
+        f"<b>🗓️ Alertas del {formato_display(hoy)}</b> 🗓️\n\n"
+    )
+
+
+def _renderizar_responsable(responsable):
+    return render.GRUPO_GERENCIA_RESPONSABLE(gerencia=responsable)
+
+
+def _renderizar_solicitud(solicitud, dias):
+    hito_actual = solicitud["hito_actual"]
+    return render.SOLICITUD_ALERTA(
+        vencimiento=formato_display(solicitud["fecha_vencimiento"]),
+        plazo=_describir_plazo(dias),
+        fase=nombre_hito_html(hito_actual),
+        tarea=tarea_alerta_html(hito_actual),
+        id=solicitud["id"],
+        solicitud=solicitud["solicitud_contratacion"],
+    )
+
+
+def _fragmento(hoy, clave, renderizar, *args):
+    """Devuelve el fragmento `clave` del día, renderizándolo solo la primera vez."""
+    global _fragmentos, _fragmentos_fecha
+    with _fragmentos_lock:
+        if _fragmentos_fecha != hoy:
+            _fragmentos, _fragmentos_fecha = {}, hoy
+        texto = _fragmentos.get(clave)
+        if texto is None:
+            texto = _fragmentos[clave] = renderizar(*args)
+    return texto
+
+
+def filtrar_por_suscripcion(plan, suscripcion):
+    """
+    Alertas del plan que corresponden a la suscripción de un usuario
+    ({"gerencia": {...}, "distrito": {...}}). Sin suscripción se reciben todas.
+    """
+    if not suscripcion:
+        return plan
+    gerencias = suscripcion.get("gerencia", ())
+    distritos = suscripcion.get("distrito", ())
+    return [
+        alerta
+        for alerta in plan
+        if str(alerta[0]["gerencia"]) in gerencias
+        or str(alerta[0]["distrito"]) in distritos
+    ]
+
+
+def construir_resumen(hoy, plan):
+    """
+    Compone el resumen del día `hoy` (YYYY-MM-DD) para las alertas de
+    planner.planificar_alertas, agrupadas por responsable. Devuelve una lista de
+    partes (texto, alertas), donde alertas es
+    [(id_solicitud, hito, nombre_evento, fecha_evento), ...], sin superar
+    LIMITE_MENSAJE por parte. Los cortes se hacen entre bloques de solicitud y cada
+    parte repite el encabezado y el responsable en curso.
+    """
+    encabezado = _fragmento(hoy, ("encabezado",), _renderizar_encabezado, hoy)
+    por_responsable = {}
+    for alerta in plan:
+        responsable = alerta[0]["responsable"] or "Sin Responsable"
+        por_responsable.setdefault(responsable, []).append(alerta)
+
+    partes = []
+    bloques, alertas, tamano = [encabezado], [], longitud(encabezado)
+    for responsable, lista in por_responsable.items():
+        cabecera = _fragmento(
+            hoy, ("responsable", responsable), _renderizar_responsable, responsable
+        )
+        cabecera_pendiente = True
+        for sol, nombre_evento, fecha_evento, dias in lista:
+            detalle = _fragmento(
+                hoy, ("solicitud", tuple(sol)), _renderizar_solicitud, sol, dias
+            )
+            extra = longitud(detalle) + (
+                longitud(cabecera) if cabecera_pendiente else 0
+            )
+            if alertas and tamano + extra > LIMITE_MENSAJE:
+                partes.append(("".join(bloques), alertas))
+                bloques, alertas, tamano = [encabezado], [], longitud(encabezado)
+                cabecera_pendiente = True
+                extra = longitud(detalle) + longitud(cabecera)
+            if cabecera_pendiente:
+                bloques.append(cabecera)
+                cabecera_pendiente = False
+            bloques.append(detalle)
+            alertas.append((sol["id"], sol["hito_actual"], nombre_evento, fecha_evento))
+            tamano += extra
+    if alertas:
+        partes.append(("".join(bloques), alertas))
+    return partes
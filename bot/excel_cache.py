@@ -0,0 +1,79 @@
+# bot/excel_cache.py
+# Caché de libros Excel ya parseados. pd.read_excel tarda segundos en archivos
+# grandes; si el archivo no cambió, se reutiliza el DataFrame guardado.
+
+import hashlib
+import io
+import os
+import pickle
+import threading
+
+import pandas as pd
+
+from .config import logger, EXCEL_CACHE_DIR
+
+# Copia en memoria de la última lectura de cada archivo: {ruta: (sha256, df)}
+_memoria = {}
+_memoria_lock = threading.Lock()
+
+
+def _ruta_cache(file_path):
+    nombre = hashlib.sha256(os.path.abspath(file_path).encode("utf-8")).hexdigest()
+    return os.path.join(EXCEL_CACHE_DIR, f"{nombre[:16]}.pkl")
+
+
+def _leer_cache_disco(ruta_cache):
+    try:
+        with open(ruta_cache, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Caché de Excel inválida en '{ruta_cache}', se descarta: {e}")
+        return None
+
+
+def _guardar_cache_disco(ruta_cache, entrada):
+    os.makedirs(EXCEL_CACHE_DIR, exist_ok=True)
+    # Se escribe en un archivo temporal y se renombra para no dejar cachés a medias
+    temporal = f"{ruta_cache}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, "wb") as f:
+        pickle.dump(entrada, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporal, ruta_cache)
+
+
+def leer_excel(file_path):
+    """
+    Equivalente a pd.read_excel(file_path) con caché. La entrada se identifica por
+    ruta y hash SHA-256 del contenido, que se calcula en cada lectura: la fecha de
+    modificación y el tamaño no bastan para dar por bueno un DataFrame guardado.
+    El hash y el parseo usan los mismos bytes, leídos una sola vez.
+    Devuelve siempre una copia, por lo que el llamador puede modificarla.
+    """
+    with open(file_path, "rb") as f:
+        contenido = f.read()
+    sha256 = hashlib.sha256(contenido).hexdigest()
+
+    with _memoria_lock:
+        en_memoria = _memoria.get(file_path)
+    if en_memoria and en_memoria[0] == sha256:
+        return en_memoria[1].copy()
+
+    ruta_cache = _ruta_cache(file_path)
+    entrada = _leer_cache_disco(ruta_cache)
+    if entrada and entrada.get("sha256") == sha256:
+        df = entrada["df"]
+    else:
+        logger.info(f"Parseando '{file_path}' (no hay caché válida)...")
+        df = pd.read_excel(io.BytesIO(contenido))
+        try:
+            _guardar_cache_disco(
+                ruta_cache,
+                {"path": os.path.abspath(file_path), "sha256": sha256, "df": df},
+            )
+        except OSError as e:
+            logger.warning(f"No se pudo guardar la caché de '{file_path}': {e}")
+
+    with _memoria_lock:
+        _memoria[file_path] = (sha256, df)
+    return df.copy()
@@ -0,0 +1,179 @@
+# bot/excel_import.py
+# Lectura vectorizada del CRONOGRAMA y carga masiva en la base de datos.
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from .config import (
+    logger,
+    HITOS_SECUENCIA,
+    HITO_NOMBRES_LARGOS,
+    EXCEL_LECTURA_STREAMING,
+    EXCEL_TAMANO_LOTE,
+)
+from .excel_cache import leer_excel
+from .database import (
+    COLUMNAS_DESCRIPTIVAS_EXCEL,
+    COLUMNAS_SOLICITUD_EXCEL,
+    sincronizar_solicitudes_from_excel,
+    replace_solicitudes_from_excel,
+)
+
+COLUMN_MAPPING = {
+    "N": "id",
+    "SOLICITUD DE CONTRATACIÓN": "solicitud_contratacion",
+    "SERVICIO": "servicio",
+    "DISTRITO": "distrito",
+    "GERENCIA": "gerencia",
+    "RESPONSABLE": "responsable",
+    "ETAPA DE CONTRATACIÓN": "etapa_contratacion",
+}
+
+# Únicas columnas del Excel que se leen en el modo streaming
+COLUMNAS_EXCEL = list(COLUMN_MAPPING) + list(HITO_NOMBRES_LARGOS.values())
+
+
+def convertir_fechas(serie):
+    """
+    Versión vectorizada de safe_date_convert para una columna completa.
+    Devuelve (fechas en formato YYYY-MM-DD o None, máscara de celdas con "-").
+    """
+    texto = serie.astype(str).str.strip()
+    es_guion = texto == "-"
+    vacios = serie.isna() | (texto == "") | es_guion
+    fechas = pd.to_datetime(
+        serie.where(~vacios), dayfirst=True, errors="coerce", format="mixed"
+    )
+    invalidas = int((fechas.isna() & ~vacios).sum())
+    if invalidas:
+        logger.warning(
+            f"No se pudieron convertir {invalidas} valor(es) de la columna '{serie.name}' a fecha."
+        )
+    convertidas = fechas.dt.strftime("%Y-%m-%d")
+    return convertidas.astype(object).where(fechas.notna(), None), es_guion
+
+
+def hash_filas(descriptivas):
+    """
+    Calcula de forma vectorizada un hash por fila de los datos descriptivos, que son
+    los únicos que la sincronización actualiza en las solicitudes existentes.
+    """
+    hashes = pd.util.hash_pandas_object(descriptivas.astype(str), index=False)
+    return hashes.map("{:016x}".format)
+
+
+def preparar_registros(df):
+    """
+    Convierte el DataFrame del Excel en registros listos para la base de datos,
+    en el orden de COLUMNAS_SOLICITUD_EXCEL, sin iterar fila por fila.
+    """
+    df = df.rename(columns=COLUMN_MAPPING)
+    ids = pd.to_numeric(df["id"], errors="coerce") if "id" in df else None
+    if ids is None:
+        return []
+    df = df[ids.notna()]
+    ids = ids[ids.notna()].astype("int64")
+
+    columnas = {"id": ids}
+    for col in COLUMN_MAPPING.values():
+        if col != "id":
+            columnas[col] = df[col].fillna("") if col in df else None
+
+    planificadas, reales = {}, {}
+    for hito_key in HITOS_SECUENCIA:
+        col_name = HITO_NOMBRES_LARGOS[hito_key]
+        if col_name in df:
+            fechas, es_guion = convertir_fechas(df[col_name])
+            # Un "-" en el Excel significa que el hito no aplica: se marca como realizado
+            planificadas[hito_key] = fechas.where(~es_guion, None)
+            reales[hito_key] = pd.Series(
+                np.where(es_guion, "-", None), index=df.index, dtype=object
+            )
+        else:
+            planificadas[hito_key] = pd.Series(None, index=df.index, dtype=object)
+            reales[hito_key] = pd.Series(None, index=df.index, dtype=object)
+
+    # El hito actual es el primer hito (en orden) con fecha planificada
+    con_fecha = np.column_stack(
+        [planificadas[hito_key].notna().to_numpy() for hito_key in HITOS_SECUENCIA]
+    )
+    primer_hito = np.array(HITOS_SECUENCIA, dtype=object)[con_fecha.argmax(axis=1)]
+    columnas["hito_actual"] = pd.Series(
+        np.where(con_fecha.any(axis=1), primer_hito, None), index=df.index
+    )
+    for hito_key in HITOS_SECUENCIA:
+        columnas[f"fecha_planificada_{hito_key}"] = planificadas[hito_key]
+        columnas[f"fecha_real_{hito_key}"] = reales[hito_key]
+    columnas["hash_fila"] = hash_filas(
+        pd.DataFrame({col: columnas[col] for col in COLUMNAS_DESCRIPTIVAS_EXCEL})
+    )
+
+    tabla = pd.DataFrame(
+        {col: columnas[col] for col in COLUMNAS_SOLICITUD_EXCEL}, index=df.index
+    ).astype(object)
+    tabla["id"] = ids.astype(object)
+    tabla = tabla.where(tabla.notna(), None)
+    return list(tabla.itertuples(index=False, name=None))
+
+
+def leer_excel_streaming(file_path, tamano_lote=EXCEL_TAMANO_LOTE):
+    """
+    Lee la primera hoja con openpyxl en modo solo lectura, fila a fila y sin
+    formatos, y entrega DataFrames de como máximo `tamano_lote` filas que solo
+    contienen las columnas de COLUMNAS_EXCEL. La memoria usada no depende del
+    tamaño del archivo.
+    """
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        filas = wb.worksheets[0].iter_rows(values_only=True)
+        encabezado = next(filas, None) or ()
+        # Igual que pandas, si un encabezado se repite se usa la primera columna
+        posiciones = {}
+        for posicion, nombre in enumerate(encabezado):
+            if nombre in COLUMNAS_EXCEL and nombre not in posiciones:
+                posiciones[nombre] = posicion
+
+        lote = []
+        for fila in filas:
+            lote.append(
+                [fila[p] if p < len(fila) else None for p in posiciones.values()]
+            )
+            if len(lote) >= tamano_lote:
+                yield pd.DataFrame(lote, columns=list(posiciones), dtype=object)
+                lote = []
+        if lote:
+            yield pd.DataFrame(lote, columns=list(posiciones), dtype=object)
+    finally:
+        wb.close()
+
+
+def lotes_registros(file_path):
+    """
+    Genera los registros del Excel en lotes de EXCEL_TAMANO_LOTE. Con
+    EXCEL_LECTURA_STREAMING el archivo se lee en streaming; si no, se usa el
+    DataFrame completo (con caché) de pd.read_excel.
+    """
+    if EXCEL_LECTURA_STREAMING:
+        for df in leer_excel_streaming(file_path):
+            yield preparar_registros(df)
+        return
+    registros = preparar_registros(leer_excel(file_path))
+    for inicio in range(0, len(registros), EXCEL_TAMANO_LOTE):
+        yield registros[inicio : inicio + EXCEL_TAMANO_LOTE]
+
+
+def sincronizar_excel(file_path):
+    """
+    Sincroniza de forma incremental los datos descriptivos desde el Excel: inserta
+    las solicitudes nuevas, actualiza solo las filas que cambiaron y marca como
+    eliminadas las que ya no aparecen. Devuelve (insertadas, actualizadas,
+    sin_cambios, eliminadas).
+    Es síncrona: los handlers la ejecutan en el executor de base de datos.
+    """
+    return sincronizar_solicitudes_from_excel(lotes_registros(file_path))
+
+
+def sincerar_excel(file_path):
+    """Borra todas las solicitudes y las recarga desde cero a partir del Excel."""
+    return replace_solicitudes_from_excel(lotes_registros(file_path))
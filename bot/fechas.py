@@ -0,0 +1,74 @@
+# bot/fechas.py
+# Servicio de fechas para los reportes. Las fechas de la base de datos son
+# cadenas ISO (YYYY-MM-DD) que se repiten mucho entre filas: cada cadena distinta
+# se convierte una sola vez (LRU) y los días restantes se calculan contra un único
+# "hoy" en TIMEZONE, que se renueva al pasar la medianoche.
+
+import threading
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from .config import TIMEZONE
+
+_ZONA = ZoneInfo(TIMEZONE)
+_CACHE_FECHAS = 4096
+
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+# (hoy, {fecha_iso: días restantes}, instante de la próxima medianoche); se
+# reemplaza completo al cambiar de día para que los lectores nunca mezclen fechas
+_dia = (None, {}, 0.0)
+_dia_lock = threading.Lock()
+
+
+def _dia_actual():
+    global _dia
+    if time.time() >= _dia[2]:
+        with _dia_lock:
+            if time.time() >= _dia[2]:
+                hoy = datetime.now(_ZONA).date()
+                medianoche = datetime.combine(
+                    hoy + timedelta(days=1), datetime.min.time(), _ZONA
+                )
+                _dia = (hoy, {}, medianoche.timestamp())
+    return _dia
+
+
+def hoy():
+    """Fecha de hoy en TIMEZONE."""
+    return _dia_actual()[0]
+
+
+@lru_cache(maxsize=_CACHE_FECHAS)
+def parse_iso(fecha_iso):
+    """Convierte una fecha YYYY-MM-DD en date (ValueError si no es válida)."""
+    return date.fromisoformat(fecha_iso)
+
+
+@lru_cache(maxsize=_CACHE_FECHAS)
+def formato_display(fecha_iso):
+    """YYYY-MM-DD -> DD/MM/YYYY."""
+    return parse_iso(fecha_iso).strftime("%d/%m/%Y")
+
+
+@lru_cache(maxsize=_CACHE_FECHAS)
+def fecha_larga(fecha_iso):
+    """YYYY-MM-DD -> "Lunes, DD/MM/YYYY"."""
+    fecha = parse_iso(fecha_iso)
+    return f"{DIAS_SEMANA[fecha.weekday()]}, {fecha.strftime('%d/%m/%Y')}"
+
+
+def dias_restantes(fecha_iso):
+    """Días que faltan (negativos si ya pasó) desde hoy hasta `fecha_iso`."""
+    hoy_actual, cache, _ = _dia_actual()
+    dias = cache.get(fecha_iso)
+    if dias is None:
+        dias = cache[fecha_iso] = (parse_iso(fecha_iso) - hoy_actual).days
+    return dias
+
+
+def estatus(fecha_iso):
+    """Símbolo de los reportes: 🔴 si la fecha ya pasó, 🟢 si no."""
+    return "🔴" if dias_restantes(fecha_iso) < 0 else "🟢"
@@ -1,12 +1,15 @@
 # bot/handlers.py
 # Manejadores para todos los comandos y mensajes del bot.
 
+import asyncio
 import os
 import pandas as pd
 import html
+import tempfile
 from datetime import datetime
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
+    ApplicationHandlerStop,
     ContextTypes,
     ConversationHandler,
     CallbackQueryHandler,
@@ -18,13 +21,27 @@ from .config import (
     logger,
     NOMBRE_ARCHIVO_EXCEL,
     NOMBRE_ARCHIVO_PRINCIPAL,
-    HITOS_SECUENCIA,
-    HITO_NOMBRES_LARGOS,
+    REPORTES_CONCURRENTES,
 )
 from .database import *
-from .report_generator import generate_printable_report_html
+from .excel_cache import leer_excel
+from .browser import enviar_navegable
+from .excel_import import sincronizar_excel, sincerar_excel
+from . import fechas
+from .hitos import (
+    HITOS,
+    nombre_hito,
+    nombre_hito_html,
+    tarea_html,
+)
+from .paginator import enviar_paginado, paginar
+from . import render
+from .report_generator import generate_printable_report_html, run_reporte
 
-from .scheduler import check_and_send_notifications
+from .scheduler import (
+    ID_REVISION_DIARIA,
+    programar_revision_diaria,
+)
 
 # Estados para los ConversationHandlers
 SELECTING_DISTRITO, SELECTING_SERVICIO = range(2)
@@ -41,20 +58,6 @@ UNIDAD_SELECTING_DISTRITO, UNIDAD_SELECTING_GERENCIA, UNIDAD_SELECTING_SERVICIO
 
 
 # --- Funciones de Utilidad ---
-def get_tarea_a_cumplir(hito_key):
-    """Determina la tarea a cumplir según el hito actual."""
-    if not hito_key:
-        return "N/A"
-    if hito_key == "presupuesto_base":
-        return "Entrega de presupuesto base."
-    if hito_key == "fecha_solicitud":
-        return "Entrega de proceso de inicio a la Gerencia de Contrataciones."
-
-    # Para todos los demás hitos
-    hito = str(HITO_NOMBRES_LARGOS.get(hito_key, "")).lower()
-    return f"Entrega {hito} para firma de Presidencia ENT."
-
-
 def safe_date_convert(date_value):
     if pd.isna(date_value) or date_value == "" or str(date_value).strip() == "-":
         return None
@@ -72,64 +75,30 @@ def format_date_for_display(date_str_db):
     if not date_str_db:
         return "No especificada"
     try:
-        return datetime.strptime(date_str_db, "%Y-%m-%d").strftime("%d/%m/%Y")
+        return fechas.formato_display(date_str_db)
     except (ValueError, TypeError):
         return date_str_db
 
 
-def get_weekday_in_spanish(date_obj):
-    """Devuelve el nombre del día de la semana en español."""
-    weekdays = [
-        "Lunes",
-        "Martes",
-        "Miércoles",
-        "Jueves",
-        "Viernes",
-        "Sábado",
-        "Domingo",
-    ]
-    return weekdays[date_obj.weekday()]
-
-
-def calculate_balance(solicitudes):
-    total = len(solicitudes)
-    atrasadas, proximas, al_dia = 0, 0, 0
-    dias_anticipacion = int(get_config_value("dias_anticipacion") or 0)
-    hoy = datetime.now().date()
-    for solicitud in solicitudes:
-        fecha_plan = solicitud.get("fecha_planificada")
-        if fecha_plan:
-            fecha_plan_dt = datetime.strptime(fecha_plan, "%Y-%m-%d").date()
-            dias_restantes = (fecha_plan_dt - hoy).days
-            if dias_restantes < 0:
-                atrasadas += 1
-            elif dias_restantes <= dias_anticipacion:
-                proximas += 1
-            else:
-                al_dia += 1
-    return total, atrasadas, proximas, al_dia
-
-
 # --- Lógica de Autorización Centralizada ---
 async def handle_unauthorized(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    """Función central para manejar a cualquier usuario no autorizado."""
+    """
+    Responde a un usuario no autorizado. La llama auth_gate con el estado ya
+    resuelto en `context.user_status`: un usuario nuevo queda pendiente y se avisa
+    al administrador.
+    """
     user = update.effective_user
     user_id, user_name = user.id, user.first_name
-    user_status = get_user_status(user_id)
-    admin_id = get_admin_id()
-
-    if user_id == admin_id and user_status == "autorizado":
-        await update.message.reply_text("Comando no reconocido. Usa /help.")
-        return
 
-    if user_status is None:
+    if context.user_status is None:
         logger.info(f"Usuario nuevo no autorizado: {user_name} ({user.id}).")
-        add_pending_user(user_id, user_name)
+        await run_db(add_pending_user, user_id, user_name)
         await update.message.reply_text(
             "Tu solicitud de acceso está siendo validada por el administrador. Por favor, espera."
         )
+        admin_id = await run_db(get_admin_id)
         if admin_id:
             try:
                 user_name_safe = html.escape(user_name)
@@ -147,43 +116,66 @@ async def handle_unauthorized(
             except Exception as e:
                 logger.error(f"No se pudo notificar al admin {admin_id}: {e}")
 
-    elif user_status == "pendiente":
+    elif context.user_status == "pendiente":
         await update.message.reply_text(
             "Tu solicitud de acceso todavía está pendiente."
         )
 
 
+async def texto_no_reconocido(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+) -> None:
+    """Texto que no es un comando, de un usuario autorizado (auth_gate ya filtró)."""
+    if context.user_role == "admin":
+        await update.message.reply_text("Comando no reconocido. Usa /help.")
+
+
+async def auth_gate(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Filtro de autorización (grupo -1): resuelve estado y rol del usuario desde la
+    caché, los guarda en `context.user_status` y `context.user_role`, y detiene el
+    procesamiento de la actualización si el usuario no está autorizado.
+    """
+    user = update.effective_user
+    if user is None:
+        return
+    auth = get_cached_user_auth(user.id) or await run_db(get_user_auth, user.id)
+    context.user_status, rol = auth
+    context.user_role = rol if context.user_status == "autorizado" else None
+    if context.user_status == "autorizado":
+        return
+
+    message = update.message
+    if message and message.text and message.text.split()[0].split("@")[0] == "/start":
+        # Sin administrador, /start configura al primero que lo use
+        if await run_db(get_admin_id) is None:
+            return
+    if message:
+        await handle_unauthorized(update, context)
+    elif update.callback_query:
+        await update.callback_query.answer("No estás autorizado.")
+    raise ApplicationHandlerStop
+
+
 # --- Handlers de Comandos ---
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user = update.effective_user
-    admin_id = get_admin_id()
+    admin_id = await run_db(get_admin_id)
     if not admin_id:
-        set_admin_id(user.id)
-        add_pending_user(user.id, user.first_name)
-        conn = db_connect()
-        cursor = conn.cursor()
-        cursor.execute(
-            "UPDATE usuarios SET rol = ?, estado = ? WHERE telegram_id = ?",
-            ("admin", "autorizado", user.id),
-        )
-        conn.commit()
-        conn.close()
+        await run_db(set_admin_id, user.id)
+        await run_db(add_pending_user, user.id, user.first_name)
+        await run_db(update_user_status, user.id, "admin")
         await update.message.reply_text(
             f"¡Hola, {user.first_name}! Has sido configurado como administrador."
         )
     else:
-        if get_user_status(user.id) != "autorizado":
-            await handle_unauthorized(update, context)
-        else:
-            await update.message.reply_text(
-                "¡Bienvenido al Bot de Alertas de Contratación!"
-            )
+        # auth_gate ya atendió a los usuarios no autorizados
+        await update.message.reply_text(
+            "¡Bienvenido al Bot de Alertas de Contratación!"
+        )
 
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    if get_user_status(update.effective_user.id) != "autorizado":
-        await handle_unauthorized(update, context)
-        return
 
     help_text = (
         "Comandos disponibles para todos:\n"
@@ -197,7 +189,9 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         "/ver_solicitud [ID] - Muestra el detalle de una solicitud.\n"
         "/unidad_usuaria - Lista solicitudes donde la gerencia es la responsable.\n"
         "/reporte_dia_pendiente - Reporte de solicitudes pendientes por día.\n"
-        "/unidad_usuaria_dia - Reporte de Unidades Usuarias por día.\n\n"
+        "/unidad_usuaria_dia - Reporte de Unidades Usuarias por día.\n"
+        "/suscribir gerencia|distrito NOMBRE - Limita tus notificaciones.\n"
+        "/desuscribir [gerencia|distrito NOMBRE] - Quita una o todas tus suscripciones.\n\n"
         "<b>Comandos de Administrador (Rol: admin):</b>\n"
         "/reporte - Genera un reporte consolidado por gerencia.\n"
         "/reporte_principal - Genera un reporte desde el Cronograma Principal.\n\n"
@@ -205,9 +199,11 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         "/replanificar [ID] [DD/MM/YYYY] - Cambia la fecha del hito actual.\n"
         "/completar [ID] - Marca el hito actual como completado.\n\n"
         "<b>Comandos de Administrador (Rol: admin):</b>\n"
-        "/cargar_excel - Sincroniza datos descriptivos desde el Excel.\n"
+        "/cargar_excel - Sincroniza solo los cambios del Excel.\n"
         "/sincerar_datos - Borra y recarga todas las solicitudes desde el Excel.\n"
         "/configurar_dias N - Define los días de antelación.\n"
+        "/configurar_ventanas 7 3 1 0 atrasadas - Define las ventanas de alerta.\n"
+        "/estado_notificaciones - Muestra la próxima y la última revisión diaria.\n"
         "/configurar_hora HH:MM - Define la hora de las alertas.\n"
         "/listar_usuarios - Muestra todos los usuarios registrados.\n"
         "/autorizar [ID] [rol] - Autoriza a un usuario."
@@ -218,7 +214,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 async def cargar_excel_local(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    if get_user_role(update.effective_user.id) != "admin":
+    if context.user_role != "admin":
         await update.message.reply_text("No tienes permiso para ejecutar este comando.")
         return
     file_path = NOMBRE_ARCHIVO_EXCEL
@@ -231,69 +227,11 @@ async def cargar_excel_local(
         f"Archivo {file_path} encontrado. Sincronizando datos descriptivos..."
     )
     try:
-        df = pd.read_excel(file_path).fillna("")
-        conn = db_connect()
-        cursor = conn.cursor()
-
-        column_mapping = {
-            "N": "id",
-            "SOLICITUD DE CONTRATACIÓN": "solicitud_contratacion",
-            "SERVICIO": "servicio",
-            "DISTRITO": "distrito",
-            "GERENCIA": "gerencia",
-            "RESPONSABLE": "responsable",
-            "ETAPA DE CONTRATACIÓN": "etapa_contratacion",
-        }
-        df_renamed = df.rename(columns=column_mapping)
-
-        updated_count = 0
-        inserted_count = 0
-
-        for index, row in df_renamed.iterrows():
-            solicitud_id = row.get("id")
-            if pd.isna(solicitud_id):
-                continue
-            solicitud_id = int(solicitud_id)
-
-            data = {
-                "id": solicitud_id,
-                "solicitud_contratacion": row.get("solicitud_contratacion"),
-                "servicio": row.get("servicio"),
-                "distrito": row.get("distrito"),
-                "gerencia": row.get("gerencia"),
-                "responsable": row.get("responsable"),
-                "etapa_contratacion": row.get("etapa_contratacion"),
-            }
-
-            if solicitud_exists(cursor, solicitud_id):
-                update_solicitud_info_from_excel(cursor, data)
-                if cursor.rowcount > 0:
-                    updated_count += 1
-            else:
-                for hito_key in HITOS_SECUENCIA:
-                    col_name = HITO_NOMBRES_LARGOS[hito_key]
-                    data[f"fecha_planificada_{hito_key}"] = row.get(col_name)
-
-                hito_actual = None
-                for hito_key in HITOS_SECUENCIA:
-                    excel_val = data.get(f"fecha_planificada_{hito_key}")
-                    if str(excel_val).strip() == "-":
-                        data[f"fecha_real_{hito_key}"] = "-"
-                        data[f"fecha_planificada_{hito_key}"] = None
-                    else:
-                        fecha_plan = safe_date_convert(excel_val)
-                        data[f"fecha_planificada_{hito_key}"] = fecha_plan
-                        data[f"fecha_real_{hito_key}"] = None
-                        if fecha_plan and not hito_actual:
-                            hito_actual = hito_key
-                data["hito_actual"] = hito_actual
-                insert_solicitud_from_excel(cursor, data)
-                inserted_count += 1
-
-        conn.commit()
-        conn.close()
+        inserted_count, updated_count, unchanged_count, removed_count = await run_db(
+            sincronizar_excel, file_path
+        )
         await update.message.reply_text(
-            f"✅ ¡Sincronización completada!\n- {inserted_count} solicitudes nuevas añadidas.\n- {updated_count} solicitudes existentes actualizadas."
+            f"✅ ¡Sincronización completada!\n- {inserted_count} solicitudes nuevas añadidas.\n- {updated_count} solicitudes existentes actualizadas.\n- {unchanged_count} solicitudes sin cambios.\n- {removed_count} solicitudes marcadas como eliminadas (ya no están en el Excel)."
         )
     except Exception as e:
         logger.error(f"Error al procesar el archivo Excel local: {e}")
@@ -305,7 +243,7 @@ async def cargar_excel_local(
 async def sincerar_datos_command(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    if get_user_role(update.effective_user.id) != "admin":
+    if context.user_role != "admin":
         await update.message.reply_text("No tienes permiso para ejecutar este comando.")
         return
     file_path = NOMBRE_ARCHIVO_EXCEL
@@ -319,72 +257,7 @@ async def sincerar_datos_command(
         parse_mode=ParseMode.HTML,
     )
     try:
-        df = pd.read_excel(file_path).fillna("")
-        conn = db_connect()
-        cursor = conn.cursor()
-
-        cursor.execute("DELETE FROM solicitudes")
-
-        column_mapping = {
-            "N": "id",
-            "SOLICITUD DE CONTRATACIÓN": "solicitud_contratacion",
-            "SERVICIO": "servicio",
-            "DISTRITO": "distrito",
-            "GERENCIA": "gerencia",
-            "RESPONSABLE": "responsable",
-            "ETAPA DE CONTRATACIÓN": "etapa_contratacion",
-            HITO_NOMBRES_LARGOS[
-                "presupuesto_base"
-            ]: "fecha_planificada_presupuesto_base",
-            HITO_NOMBRES_LARGOS["fecha_solicitud"]: "fecha_planificada_fecha_solicitud",
-            HITO_NOMBRES_LARGOS["estrategia"]: "fecha_planificada_estrategia",
-            HITO_NOMBRES_LARGOS["inicio"]: "fecha_planificada_inicio",
-            HITO_NOMBRES_LARGOS["decision"]: "fecha_planificada_decision",
-            HITO_NOMBRES_LARGOS[
-                "acta_otorgamiento"
-            ]: "fecha_planificada_acta_otorgamiento",
-            HITO_NOMBRES_LARGOS[
-                "notif_otorgamiento"
-            ]: "fecha_planificada_notif_otorgamiento",
-            HITO_NOMBRES_LARGOS["contrato"]: "fecha_planificada_contrato",
-        }
-        df_renamed = df.rename(columns=column_mapping)
-
-        inserted_count = 0
-        for index, row in df_renamed.iterrows():
-            solicitud_id = row.get("id")
-            if pd.isna(solicitud_id):
-                continue
-            solicitud_id = int(solicitud_id)
-
-            data = {
-                "id": solicitud_id,
-                "solicitud_contratacion": row.get("solicitud_contratacion"),
-                "servicio": row.get("servicio"),
-                "distrito": row.get("distrito"),
-                "gerencia": row.get("gerencia"),
-                "responsable": row.get("responsable"),
-                "etapa_contratacion": row.get("etapa_contratacion"),
-            }
-
-            hito_actual = None
-            for hito_key in HITOS_SECUENCIA:
-                excel_val = row.get(f"fecha_planificada_{hito_key}")
-                if str(excel_val).strip() == "-":
-                    data[f"fecha_real_{hito_key}"] = "-"
-                    data[f"fecha_planificada_{hito_key}"] = None
-                else:
-                    fecha_plan = safe_date_convert(excel_val)
-                    data[f"fecha_planificada_{hito_key}"] = fecha_plan
-                    data[f"fecha_real_{hito_key}"] = None
-                    if fecha_plan and not hito_actual:
-                        hito_actual = hito_key
-            data["hito_actual"] = hito_actual
-            insert_solicitud_from_excel(cursor, data)
-            inserted_count += 1
-
-        conn.commit()
-        conn.close()
+        inserted_count = await run_db(sincerar_excel, file_path)
         await update.message.reply_text(
             f"✅ ¡Sinceramiento completado! Se han cargado {inserted_count} solicitudes desde cero."
         )
@@ -398,15 +271,12 @@ async def sincerar_datos_command(
 async def ver_solicitud_command(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    if get_user_status(update.effective_user.id) != "autorizado":
-        await handle_unauthorized(update, context)
-        return
     try:
         solicitud_id = int(context.args[0])
     except (IndexError, ValueError):
         await update.message.reply_text("Uso incorrecto. Ejemplo: `/ver_solicitud 1`")
         return
-    solicitud = get_solicitud_by_id(solicitud_id)
+    solicitud = await run_db(get_solicitud_by_id, solicitud_id)
     if not solicitud:
         await update.message.reply_text(
             f"No se encontró ninguna solicitud con el ID {solicitud_id}."
@@ -420,52 +290,48 @@ async def ver_solicitud_command(
     message += f"<b>Responsable:</b> {html.escape(solicitud['responsable'] or 'No especificado')}\n"
 
     hito_actual_key = solicitud["hito_actual"]
+    dias_anticipacion = 0
     if hito_actual_key:
-        nombre_largo = HITO_NOMBRES_LARGOS.get(hito_actual_key, hito_actual_key)
-        tarea = get_tarea_a_cumplir(hito_actual_key)
-        message += f"<b>Etapa:</b> {html.escape(nombre_largo)}\n"
-        message += f"<b>Tarea a Cumplir:</b> {html.escape(tarea)}\n\n"
+        dias_anticipacion = await run_db(get_dias_anticipacion) or 0
+        message += f"<b>Etapa:</b> {nombre_hito_html(hito_actual_key)}\n"
+        message += f"<b>Tarea a Cumplir:</b> {tarea_html(hito_actual_key)}\n\n"
 
     else:
         message += "<b>Estatus General:</b> 🎉 ¡Completado! 🎉\n\n"
 
-    for hito_key in HITOS_SECUENCIA:
-        nombre_hito = HITO_NOMBRES_LARGOS.get(hito_key, hito_key)
-        fecha_plan = solicitud[f"fecha_planificada_{hito_key}"]
-        fecha_real = solicitud[f"fecha_real_{hito_key}"]
+    for hito_key, hito in HITOS.items():
+        fecha_plan = solicitud[hito.col_planificada]
+        fecha_real = solicitud[hito.col_real]
         if fecha_real:
-            message += f"✅ <b>{html.escape(nombre_hito)}:</b> Completado el {format_date_for_display(fecha_real)}\n"
+            message += f"✅ <b>{hito.nombre_html}:</b> Completado el {format_date_for_display(fecha_real)}\n"
         elif fecha_plan:
             if hito_key == hito_actual_key:
-                fecha_plan_dt = datetime.strptime(fecha_plan, "%Y-%m-%d")
-                hoy = datetime.now()
-                dias_restantes = (fecha_plan_dt.date() - hoy.date()).days
-                dias_anticipacion = int(get_config_value("dias_anticipacion") or 0)
+                dias_restantes = fechas.dias_restantes(fecha_plan)
                 if dias_restantes < 0:
                     estatus = f"🔴 Retrasado por {-dias_restantes} día(s)"
                 elif dias_restantes <= dias_anticipacion:
                     estatus = f"🟡 Próximo (faltan {dias_restantes} día(s))"
                 else:
                     estatus = f"🟢 A tiempo (faltan {dias_restantes} día(s))"
-                message += f"➡️ <b>{html.escape(nombre_hito)}:</b> Planificado para {format_date_for_display(fecha_plan)} ({estatus})\n"
+                message += f"➡️ <b>{hito.nombre_html}:</b> Planificado para {format_date_for_display(fecha_plan)} ({estatus})\n"
             else:
-                message += f"⚪️ <b>{html.escape(nombre_hito)}:</b> Pendiente para el {format_date_for_display(fecha_plan)}\n"
+                message += f"⚪️ <b>{hito.nombre_html}:</b> Pendiente para el {format_date_for_display(fecha_plan)}\n"
         else:
-            message += f"⚪️ <b>{html.escape(nombre_hito)}:</b> Sin fecha planificada\n"
+            message += f"⚪️ <b>{hito.nombre_html}:</b> Sin fecha planificada\n"
     await update.message.reply_text(message, parse_mode=ParseMode.HTML)
 
 
 async def configurar_dias_command(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    if get_user_role(update.effective_user.id) != "admin":
+    if context.user_role != "admin":
         await update.message.reply_text("No tienes permiso para ejecutar este comando.")
         return
     try:
         days = int(context.args[0])
         if days < 0:
             raise ValueError
-        set_config_value("dias_anticipacion", days)
+        await run_db(set_config_value, "dias_anticipacion", days)
         await update.message.reply_text(
             f"✅ Configuración guardada: Notificaciones con {days} día(s) de antelación."
         )
@@ -473,26 +339,51 @@ async def configurar_dias_command(
         await update.message.reply_text("Uso incorrecto. Ejemplo: /configurar_dias 2")
 
 
-async def configurar_hora_command(
+async def configurar_ventanas_command(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    if get_user_role(update.effective_user.id) != "admin":
+    """
+    /configurar_ventanas 7 3 1 0 atrasadas define los días antes del vencimiento en
+    que se alerta y, con 'atrasadas', un recordatorio diario de las vencidas.
+    Reemplaza a la ventana única de /configurar_dias.
+    """
+    if context.user_role != "admin":
         await update.message.reply_text("No tienes permiso para ejecutar este comando.")
         return
     try:
-        time_str = context.args[0]
-        hour, minute = map(int, time_str.split(":"))
-        scheduler = context.application.job_queue.scheduler
-        scheduler.add_job(
-            check_and_send_notifications,
-            "cron",
-            hour=hour,
-            minute=minute,
-            id="daily_check",
-            args=[context.application],
-            replace_existing=True,
+        argumentos = [arg.lower().strip(",") for arg in context.args]
+        atrasadas = "atrasadas" in argumentos
+        ventanas = sorted(
+            {int(arg) for arg in argumentos if arg != "atrasadas"}, reverse=True
+        )
+        if any(dias < 0 for dias in ventanas) or not (ventanas or atrasadas):
+            raise ValueError
+        valor = ",".join(
+            [str(dias) for dias in ventanas] + (["atrasadas"] if atrasadas else [])
         )
-        set_config_value("hora_notificacion", time_str)
+        await run_db(set_config_value, "ventanas_notificacion", valor)
+        descripcion = ", ".join(f"{dias} día(s)" for dias in ventanas) or "ninguna"
+        await update.message.reply_text(
+            f"✅ Configuración guardada: alertas a {descripcion} del vencimiento"
+            + (" y recordatorio diario de las atrasadas." if atrasadas else ".")
+        )
+    except ValueError:
+        await update.message.reply_text(
+            "Uso incorrecto. Ejemplo: /configurar_ventanas 7 3 1 0 atrasadas"
+        )
+
+
+async def configurar_hora_command(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+) -> None:
+    if context.user_role != "admin":
+        await update.message.reply_text("No tienes permiso para ejecutar este comando.")
+        return
+    try:
+        hora = datetime.strptime(context.args[0], "%H:%M").time()
+        time_str = f"{hora:%H:%M}"
+        programar_revision_diaria(context.application, hora)
+        await run_db(set_config_value, "hora_notificacion", time_str)
         await update.message.reply_text(
             f"✅ Configuración guardada: La revisión diaria se ejecutará a las {time_str}."
         )
@@ -502,8 +393,37 @@ async def configurar_hora_command(
         )
 
 
+async def estado_notificaciones_command(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+) -> None:
+    """Muestra la próxima y la última ejecución de la revisión diaria y la cola."""
+    if context.user_role != "admin":
+        await update.message.reply_text("No tienes permiso para ejecutar este comando.")
+        return
+    job = context.application.bot_data["scheduler"].get_job(ID_REVISION_DIARIA)
+    estado = await run_db(get_estado_job, ID_REVISION_DIARIA)
+    cola = await run_db(contar_mensajes_por_estado)
+
+    message = "<b>🔔 Estado de las Notificaciones 🔔</b>\n\n"
+    if job and job.next_run_time:
+        message += f"<b>Próxima revisión:</b> {job.next_run_time:%d/%m/%Y %H:%M}\n"
+    else:
+        message += "<b>Próxima revisión:</b> no programada (/configurar_hora)\n"
+    if estado:
+        inicio = datetime.strptime(estado["ultima_ejecucion"], "%Y-%m-%d %H:%M:%S")
+        message += f"<b>Última revisión:</b> {inicio:%d/%m/%Y %H:%M}\n"
+        message += f"<b>Resultado:</b> {html.escape(estado['resultado'] or 'N/A')}\n"
+    else:
+        message += "<b>Última revisión:</b> nunca\n"
+    message += (
+        f"\n<b>Cola de mensajes:</b> {cola.get('pendiente', 0)} pendientes, "
+        f"{cola.get('enviado', 0)} enviados, {cola.get('fallido', 0)} fallidos"
+    )
+    await update.message.reply_text(message, parse_mode=ParseMode.HTML)
+
+
 async def autorizar_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    if get_user_role(update.effective_user.id) != "admin":
+    if context.user_role != "admin":
         await update.message.reply_text("No tienes permiso para ejecutar este comando.")
         return
     try:
@@ -515,7 +435,7 @@ async def autorizar_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 f"Rol no válido. Roles permitidos: {', '.join(valid_roles)}"
             )
             return
-        if update_user_status(user_id_to_auth, rol):
+        if await run_db(update_user_status, user_id_to_auth, rol):
             await update.message.reply_text(
                 f"✅ Usuario {user_id_to_auth} autorizado con el rol de '{rol}'."
             )
@@ -541,10 +461,10 @@ async def autorizar_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def listar_usuarios_command(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    if get_user_role(update.effective_user.id) != "admin":
+    if context.user_role != "admin":
         await update.message.reply_text("No tienes permiso para ejecutar este comando.")
         return
-    users = get_all_users()
+    users = await run_db(get_all_users)
     if not users:
         await update.message.reply_text("No hay usuarios registrados.")
         return
@@ -558,10 +478,97 @@ async def listar_usuarios_command(
     await update.message.reply_text(message, parse_mode=ParseMode.HTML)
 
 
+def _describir_suscripciones(suscripcion):
+    if not suscripcion:
+        return "Recibes las notificaciones de todas las gerencias y distritos."
+    lineas = ["<b>Tus suscripciones:</b>"]
+    for campo in CAMPOS_SUSCRIPCION:
+        for valor in sorted(suscripcion.get(campo, ())):
+            lineas.append(f"  - {campo.capitalize()}: {html.escape(valor)}")
+    return "\n".join(lineas)
+
+
+async def suscribir_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    /suscribir gerencia|distrito NOMBRE limita las notificaciones diarias a esa
+    gerencia o distrito (se pueden combinar varias). Sin argumentos, muestra las
+    suscripciones actuales.
+    """
+    user_id = update.effective_user.id
+    if not context.args:
+        suscripciones = await run_db(get_suscripciones)
+        await update.message.reply_text(
+            _describir_suscripciones(suscripciones.get(user_id))
+            + "\n\nUso: /suscribir gerencia|distrito NOMBRE",
+            parse_mode=ParseMode.HTML,
+        )
+        return
+
+    campo = context.args[0].lower()
+    nombre = " ".join(context.args[1:]).strip()
+    if campo not in CAMPOS_SUSCRIPCION or not nombre:
+        await update.message.reply_text(
+            "Uso incorrecto. Ejemplo: /suscribir gerencia Gerencia de Finanzas"
+        )
+        return
+
+    # Se acepta el nombre sin distinguir mayúsculas, pero se guarda tal como
+    # aparece en las solicitudes
+    valores = {
+        str(valor).casefold(): str(valor)
+        for valor in await run_db(get_unique_column_values, campo)
+    }
+    valor = valores.get(nombre.casefold())
+    if valor is None:
+        await update.message.reply_text(f"No se encontró el {campo} '{nombre}'.")
+        return
+
+    await run_db(add_suscripcion, user_id, campo, valor)
+    await update.message.reply_text(
+        f"✅ Recibirás las notificaciones de {campo} '{valor}'."
+    )
+
+
+async def desuscribir_command(
+    update: Update, context: ContextTypes.DEFAULT_TYPE
+) -> None:
+    """
+    /desuscribir gerencia|distrito NOMBRE elimina una suscripción; sin argumentos
+    las elimina todas y se vuelven a recibir todas las notificaciones.
+    """
+    user_id = update.effective_user.id
+    if not context.args:
+        await run_db(delete_suscripciones, user_id)
+        await update.message.reply_text(
+            "✅ Suscripciones eliminadas. Recibirás todas las notificaciones."
+        )
+        return
+
+    campo = context.args[0].lower()
+    nombre = " ".join(context.args[1:]).strip()
+    if campo not in CAMPOS_SUSCRIPCION or not nombre:
+        await update.message.reply_text(
+            "Uso incorrecto. Ejemplo: /desuscribir distrito Distrito Norte"
+        )
+        return
+
+    suscripcion = (await run_db(get_suscripciones)).get(user_id, {})
+    valor = next(
+        (v for v in suscripcion.get(campo, ()) if v.casefold() == nombre.casefold()),
+        None,
+    )
+    if valor is None or not await run_db(delete_suscripciones, user_id, campo, valor):
+        await update.message.reply_text(f"No estás suscrito a {campo} '{nombre}'.")
+        return
+    await update.message.reply_text(
+        f"✅ Ya no recibirás las notificaciones de {campo} '{valor}'."
+    )
+
+
 async def replanificar_command(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    user_role = get_user_role(update.effective_user.id)
+    user_role = context.user_role
     if user_role not in ["admin", "contrataciones"]:
         await update.message.reply_text("No tienes permiso para ejecutar este comando.")
         return
@@ -571,18 +578,16 @@ async def replanificar_command(
         nueva_fecha_dt = datetime.strptime(nueva_fecha_usuario, "%d/%m/%Y")
         nueva_fecha_db = nueva_fecha_dt.strftime("%Y-%m-%d")
 
-        hito_replanificado, hitos_ajustados = replanificar_hito_actual(
-            solicitud_id, nueva_fecha_db
+        hito_replanificado, hitos_ajustados = await run_db(
+            replanificar_hito_actual, solicitud_id, nueva_fecha_db
         )
         if hito_replanificado:
-            nombre_largo = HITO_NOMBRES_LARGOS.get(
-                hito_replanificado, hito_replanificado
-            )
+            nombre_largo = nombre_hito(hito_replanificado)
             message = f"✅ Hito '{nombre_largo}' de la solicitud {solicitud_id} replanificado para el {nueva_fecha_usuario}."
             if hitos_ajustados:
                 message += "\n\n⚠️ <b>Hitos futuros ajustados automáticamente:</b>\n"
                 for hito, fecha in hitos_ajustados:
-                    nombre_largo_ajustado = HITO_NOMBRES_LARGOS.get(hito, hito)
+                    nombre_largo_ajustado = nombre_hito(hito)
                     message += f"- {nombre_largo_ajustado} movido a {format_date_for_display(fecha)}\n"
             await update.message.reply_text(message, parse_mode=ParseMode.HTML)
         else:
@@ -597,35 +602,28 @@ async def replanificar_command(
 
 
 async def completar_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    user_role = get_user_role(update.effective_user.id)
+    user_role = context.user_role
     if user_role not in ["admin", "contrataciones"]:
         await update.message.reply_text("No tienes permiso para ejecutar este comando.")
         return
     try:
         solicitud_id = int(context.args[0])
-        hito_completado, nuevo_hito = completar_hito_actual(solicitud_id)
+        hito_completado, nuevo_hito = await run_db(completar_hito_actual, solicitud_id)
         if hito_completado:
             if hito_completado == "fecha_solicitud":
-                conn = db_connect()
-                cursor = conn.cursor()
-                cursor.execute(
-                    "UPDATE solicitudes SET responsable = 'GERENCIA DE CONTRATACIONES' WHERE id = ?",
-                    (solicitud_id,),
+                await run_db(
+                    set_responsable, solicitud_id, "GERENCIA DE CONTRATACIONES"
                 )
-                conn.commit()
-                conn.close()
                 await update.message.reply_text(
                     "ℹ️ El responsable de esta solicitud ha sido actualizado a 'GERENCIA DE CONTRATACIONES'."
                 )
 
-            nombre_largo_completado = HITO_NOMBRES_LARGOS.get(
-                hito_completado, hito_completado
-            )
+            nombre_largo_completado = nombre_hito(hito_completado)
             await update.message.reply_text(
                 f"✅ Hito '{nombre_largo_completado}' de la solicitud {solicitud_id} marcado como completado."
             )
             if nuevo_hito:
-                nombre_largo_nuevo = HITO_NOMBRES_LARGOS.get(nuevo_hito, nuevo_hito)
+                nombre_largo_nuevo = nombre_hito(nuevo_hito)
                 await update.message.reply_text(
                     f"➡️ El próximo hito es: '{nombre_largo_nuevo}'."
                 )
@@ -642,11 +640,7 @@ async def completar_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 
 async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    if get_user_status(update.effective_user.id) != "autorizado":
-        await handle_unauthorized(update, context)
-        return
-    solicitudes = get_solicitudes_for_balance()
-    total, atrasadas, proximas, al_dia = calculate_balance(solicitudes)
+    total, atrasadas, proximas, al_dia = await run_db(get_balance_resumen)
     message = (
         "📊 <b>Balance General de Solicitudes Activas</b> 📊\n\n"
         f"Total de Solicitudes en Proceso: <b>{total}</b>\n"
@@ -658,18 +652,15 @@ async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 
 async def hoy_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    if get_user_status(update.effective_user.id) != "autorizado":
-        await handle_unauthorized(update, context)
-        return
-    solicitudes = get_solicitudes_for_today()
+    solicitudes = await run_db(get_solicitudes_for_today)
     if not solicitudes:
         await update.message.reply_text(
             "No hay hitos con fecha de vencimiento para hoy."
         )
         return
 
-    message = "<b>PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n"
-    message += "<b>🗓️ Vencimiento Hoy</b> 🗓️\n\n"
+    encabezado = "<b>PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n"
+    encabezado += "<b>🗓️ Vencimiento Hoy</b> 🗓️\n\n"
 
     # Agrupar por responsable
     hoy_por_responsable = {}
@@ -679,20 +670,25 @@ async def hoy_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
             hoy_por_responsable[r] = []
         hoy_por_responsable[r].append(sol)
 
+    bloques = []
     for responsable, solicitudes_responsable in hoy_por_responsable.items():
-        message += "----------------------------------------\n"
-        message += f"<b>Responsable:</b> {html.escape(responsable)}\n\n"
+        # El título del grupo va junto a su primera solicitud para no quedar suelto
+        grupo = render.GRUPO_RESPONSABLE(responsable=responsable)
         for solicitud in solicitudes_responsable:
             hito_actual = solicitud["hito_actual"]
-            nombre_hito = HITO_NOMBRES_LARGOS.get(hito_actual, hito_actual)
-            tarea = get_tarea_a_cumplir(hito_actual)
-
-            message += f"<b>Gerencia:</b> {html.escape(solicitud.get('gerencia', 'No especificada'))}\n"
-            message += f"<b>Fase:</b> {html.escape(nombre_hito)}\n"
-            message += f"<b>Tarea a Cumplir:</b> {html.escape(tarea)}\n"
-            message += f"<b>Solicitud ID {solicitud['id']}:</b> {html.escape(solicitud['solicitud_contratacion'])}\n\n"
+            bloques.append(
+                grupo
+                + render.SOLICITUD_HOY(
+                    gerencia=solicitud.get("gerencia", "No especificada"),
+                    fase=nombre_hito_html(hito_actual),
+                    tarea=tarea_html(hito_actual),
+                    id=solicitud["id"],
+                    solicitud=solicitud["solicitud_contratacion"],
+                )
+            )
+            grupo = ""
 
-    await update.message.reply_text(message, parse_mode=ParseMode.HTML)
+    await enviar_paginado(update.message.reply_text, bloques, encabezado)
 
 
 # --- ConversationHandlers ---
@@ -710,10 +706,7 @@ async def cancel_filtro(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
 async def balance_filtro_start(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> int:
-    if get_user_status(update.effective_user.id) != "autorizado":
-        await handle_unauthorized(update, context)
-        return ConversationHandler.END
-    distritos = get_unique_column_values("distrito")
+    distritos = await run_db(get_unique_column_values, "distrito")
     if not distritos:
         await update.message.reply_text("No hay distritos disponibles para filtrar.")
         return ConversationHandler.END
@@ -738,7 +731,9 @@ async def distrito_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await query.answer()
     distrito_seleccionado = query.data
     context.user_data["distrito_filtro"] = distrito_seleccionado
-    servicios = get_unique_column_values("servicio", distrito=distrito_seleccionado)
+    servicios = await run_db(
+        get_unique_column_values, "servicio", distrito=distrito_seleccionado
+    )
     if not servicios:
         await query.edit_message_text(
             "No hay servicios disponibles para este distrito."
@@ -766,10 +761,11 @@ async def servicio_callback(update: Update, context: ContextTypes.DEFAULT_TYPE)
     servicio_seleccionado = query.data
     distrito_seleccionado = context.user_data.get("distrito_filtro", "TODOS")
     await query.edit_message_text("Calculando balance con los filtros seleccionados...")
-    solicitudes = get_solicitudes_for_balance(
-        distrito=distrito_seleccionado, servicio=servicio_seleccionado
+    total, atrasadas, proximas, al_dia = await run_db(
+        get_balance_resumen,
+        distrito=distrito_seleccionado,
+        servicio=servicio_seleccionado,
     )
-    total, atrasadas, proximas, al_dia = calculate_balance(solicitudes)
     message = (
         f"📊 <b>Balance Filtrado</b> 📊\n\n"
         f"<b>Distrito:</b> {distrito_seleccionado}\n"
@@ -797,10 +793,7 @@ balance_filtro_handler = ConversationHandler(
 async def listar_solicitudes_start(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> int:
-    if get_user_status(update.effective_user.id) != "autorizado":
-        await handle_unauthorized(update, context)
-        return ConversationHandler.END
-    distritos = get_unique_column_values("distrito")
+    distritos = await run_db(get_unique_column_values, "distrito")
     if not distritos:
         await update.message.reply_text("No hay distritos disponibles para filtrar.")
         return ConversationHandler.END
@@ -827,7 +820,9 @@ async def distrito_callback_list(
     await query.answer()
     distrito_seleccionado = query.data
     context.user_data["distrito_filtro_list"] = distrito_seleccionado
-    servicios = get_unique_column_values("servicio", distrito=distrito_seleccionado)
+    servicios = await run_db(
+        get_unique_column_values, "servicio", distrito=distrito_seleccionado
+    )
     if not servicios:
         await query.edit_message_text(
             "No hay servicios disponibles para este distrito."
@@ -861,8 +856,10 @@ async def servicio_callback_list(
         f"Buscando solicitudes para:\n<b>Distrito:</b> {distrito_seleccionado}\n<b>Servicio:</b> {servicio_seleccionado}",
         parse_mode=ParseMode.HTML,
     )
-    solicitudes = get_filtered_solicitudes(
-        distrito=distrito_seleccionado, servicio=servicio_seleccionado
+    solicitudes = await run_db(
+        get_filtered_solicitudes,
+        distrito=distrito_seleccionado,
+        servicio=servicio_seleccionado,
     )
     if not solicitudes:
         await query.message.reply_text(
@@ -870,22 +867,19 @@ async def servicio_callback_list(
         )
         context.user_data.clear()
         return ConversationHandler.END
-    chunk_size = 20
-    message_chunk = ""
-    for i, (solicitud_id, nombre) in enumerate(solicitudes, 1):
-        message_chunk += f"ID: {solicitud_id} - {nombre}\n"
-        if i % chunk_size == 0 or i == len(solicitudes):
-            try:
-                await query.message.reply_text(message_chunk)
-                message_chunk = ""
-            except Exception as e:
-                logger.error(f"Error enviando bloque de solicitudes: {e}")
-                await query.message.reply_text(
-                    "Ocurrió un error al enviar una parte de la lista."
-                )
-                break
-    await query.message.reply_text(
-        "--- Fin de la lista ---\nUsa /ver_solicitud [ID] para ver los detalles."
+    encabezado = (
+        f"<b>Solicitudes ({len(solicitudes)})</b>\n"
+        "Usa /ver_solicitud [ID] para ver los detalles.\n\n"
+    )
+    await enviar_navegable(
+        query.message.reply_text,
+        update.effective_user.id,
+        "listar",
+        (
+            f"ID: {solicitud_id} - {html.escape(str(nombre))}\n"
+            for solicitud_id, nombre in solicitudes
+        ),
+        encabezado,
     )
     context.user_data.clear()
     return ConversationHandler.END
@@ -902,10 +896,7 @@ listar_solicitudes_handler = ConversationHandler(
 
 
 async def retrasado_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    if get_user_status(update.effective_user.id) != "autorizado":
-        await handle_unauthorized(update, context)
-        return ConversationHandler.END
-    distritos = get_unique_column_values("distrito", status="delayed")
+    distritos = await run_db(get_unique_column_values, "distrito", status="delayed")
     if not distritos:
         await update.message.reply_text(
             "¡Buenas noticias! No hay distritos con solicitudes retrasadas."
@@ -934,8 +925,11 @@ async def distrito_callback_retraso(
     await query.answer()
     distrito_seleccionado = query.data
     context.user_data["distrito_filtro_retraso"] = distrito_seleccionado
-    gerencias = get_unique_column_values(
-        "gerencia", distrito=distrito_seleccionado, status="delayed"
+    gerencias = await run_db(
+        get_unique_column_values,
+        "gerencia",
+        distrito=distrito_seleccionado,
+        status="delayed",
     )
     if not gerencias:
         await query.edit_message_text(
@@ -964,7 +958,8 @@ async def gerencia_callback_retraso(
     gerencia_seleccionada = query.data
     context.user_data["gerencia_filtro_retraso"] = gerencia_seleccionada
     distrito_seleccionado = context.user_data.get("distrito_filtro_retraso", "TODOS")
-    servicios = get_unique_column_values(
+    servicios = await run_db(
+        get_unique_column_values,
         "servicio",
         distrito=distrito_seleccionado,
         gerencia=gerencia_seleccionada,
@@ -1003,7 +998,8 @@ async def servicio_callback_retraso(
         parse_mode=ParseMode.HTML,
     )
 
-    solicitudes = get_delayed_solicitudes(
+    solicitudes = await run_db(
+        get_delayed_solicitudes,
         distrito=distrito_seleccionado,
         gerencia=gerencia_seleccionada,
         servicio=servicio_seleccionado,
@@ -1023,31 +1019,29 @@ async def servicio_callback_retraso(
             retrasados_por_gerencia[g] = []
         retrasados_por_gerencia[g].append(sol)
 
-    final_message = "<b>PLAZOS VENCIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n\n"
+    encabezado = "<b>PLAZOS VENCIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n\n"
 
+    bloques = []
     for gerencia, solicitudes_gerencia in retrasados_por_gerencia.items():
-        final_message += "----------------------------------------\n"
-        final_message += f"<b>Gerencia:</b> {html.escape(gerencia)}\n\n"
+        grupo = render.GRUPO_GERENCIA(gerencia=gerencia)
         for solicitud in solicitudes_gerencia:
-            nombre_hito = HITO_NOMBRES_LARGOS.get(
-                solicitud["hito_actual"], solicitud["hito_actual"]
+            hito_actual = solicitud["hito_actual"]
+            bloques.append(
+                grupo
+                + render.SOLICITUD_RETRASADA(
+                    responsable=solicitud.get("responsable", "No especificado"),
+                    fase=nombre_hito_html(hito_actual),
+                    tarea=tarea_html(hito_actual),
+                    fecha_limite=format_date_for_display(
+                        solicitud["fecha_planificada"]
+                    ),
+                    id=solicitud["id"],
+                    solicitud=solicitud["solicitud_contratacion"],
+                )
             )
-            responsable = solicitud.get("responsable", "No especificado")
-            fecha_limite = format_date_for_display(solicitud["fecha_planificada"])
-            solicitud_nombre = solicitud["solicitud_contratacion"]
-            tarea = get_tarea_a_cumplir(solicitud["hito_actual"])
-
-            final_message += f"<b>Responsable:</b> {html.escape(responsable)}\n"
-            final_message += f"<b>Fase:</b> {html.escape(nombre_hito)}\n"
-            final_message += f"<b>Tarea a Cumplir:</b> {html.escape(tarea)}\n"
-            final_message += f"<b>Fecha Límite:</b> {html.escape(fecha_limite)}\n"
-            final_message += f"🔴 <b>Solicitud (ID {solicitud['id']}):</b> {html.escape(solicitud_nombre)}\n\n"
-
-    chunk_size = 4096
-    for i in range(0, len(final_message), chunk_size):
-        await query.message.reply_text(
-            final_message[i : i + chunk_size], parse_mode=ParseMode.HTML
-        )
+            grupo = ""
+
+    await enviar_paginado(query.message.reply_text, bloques, encabezado)
 
     context.user_data.clear()
     return ConversationHandler.END
@@ -1065,11 +1059,11 @@ retrasado_handler = ConversationHandler(
 
 
 async def reporte_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    if get_user_role(update.effective_user.id) != "admin":
+    if context.user_role != "admin":
         await update.message.reply_text("No tienes permiso para ejecutar este comando.")
         return ConversationHandler.END
 
-    distritos = get_unique_column_values("distrito")
+    distritos = await run_db(get_unique_column_values, "distrito")
     if not distritos:
         await update.message.reply_text(
             "No hay distritos disponibles para generar el reporte."
@@ -1100,7 +1094,7 @@ async def distrito_callback_reporte(
     distrito = query.data
     context.user_data["reporte_distrito"] = distrito
 
-    gerencias = get_unique_column_values("gerencia", distrito=distrito)
+    gerencias = await run_db(get_unique_column_values, "gerencia", distrito=distrito)
     if not gerencias:
         await query.edit_message_text(
             "No hay gerencias disponibles para este distrito."
@@ -1129,8 +1123,8 @@ async def gerencia_callback_reporte(
     context.user_data["reporte_gerencia"] = gerencia
     distrito = context.user_data["reporte_distrito"]
 
-    servicios = get_unique_column_values(
-        "servicio", distrito=distrito, gerencia=gerencia
+    servicios = await run_db(
+        get_unique_column_values, "servicio", distrito=distrito, gerencia=gerencia
     )
     if not servicios:
         await query.edit_message_text(
@@ -1162,54 +1156,49 @@ async def servicio_callback_reporte(
 
     await query.edit_message_text("Generando reporte...")
 
-    solicitudes = get_solicitudes_for_balance(
-        distrito=distrito, gerencia=gerencia_filtro, servicio=servicio
+    resumen_por_gerencia = await run_db(
+        get_balance_por_gerencia,
+        distrito=distrito,
+        gerencia=gerencia_filtro,
+        servicio=servicio,
     )
 
-    reporte_por_gerencia = {}
-    for sol in solicitudes:
-        g = sol.get("gerencia")
-        if g:
-            if g not in reporte_por_gerencia:
-                reporte_por_gerencia[g] = []
-            reporte_por_gerencia[g].append(sol)
-
-    if not reporte_por_gerencia:
+    if not resumen_por_gerencia:
         await query.edit_message_text(
             "No se encontraron solicitudes activas con los filtros seleccionados."
         )
         return ConversationHandler.END
 
-    final_message = "<b>PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n\n"
-
-    for gerencia, solicitudes_gerencia in reporte_por_gerencia.items():
-        total, atrasadas, proximas, al_dia = calculate_balance(solicitudes_gerencia)
-
-        min_future_date = None
-        hoy = datetime.now().date()
-        for sol in solicitudes_gerencia:
-            fecha_plan_str = sol.get("fecha_planificada")
-            if fecha_plan_str:
-                fecha_plan = datetime.strptime(fecha_plan_str, "%Y-%m-%d").date()
-                if fecha_plan >= hoy:
-                    if min_future_date is None or fecha_plan < min_future_date:
-                        min_future_date = fecha_plan
-
-        if min_future_date:
-            nombre_dia = get_weekday_in_spanish(min_future_date)
-            fecha_formateada = min_future_date.strftime("%d/%m/%Y")
-            fecha_reporte = f"Fecha: {nombre_dia}, {fecha_formateada}"
+    encabezado = "<b>PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n\n"
+
+    bloques = []
+    for resumen in resumen_por_gerencia:
+        gerencia = resumen["gerencia"]
+        total, atrasadas, al_dia = (
+            resumen["total"],
+            resumen["atrasadas"],
+            resumen["al_dia"],
+        )
+
+        if resumen["proxima_fecha"]:
+            fecha_reporte = f"Fecha: {fechas.fecha_larga(resumen['proxima_fecha'])}"
         else:
             fecha_reporte = "Fecha: No hay hitos próximos"
 
-        final_message += "----------------------------------------\n"
-        final_message += f"{fecha_reporte}\n"
-        final_message += f"<b>Gerencia:</b> {gerencia}\n\n"
-        final_message += f"Total de Solicitudes en Proceso: <b>{total}</b>\n"
-        final_message += f"🟢 A tiempo: <b>{al_dia}</b>\n"
-        final_message += f"🔴 Retrasadas: <b>{atrasadas}</b>\n"
-
-    await query.edit_message_text(final_message, parse_mode=ParseMode.HTML)
+        bloque = "----------------------------------------\n"
+        bloque += f"{fecha_reporte}\n"
+        bloque += f"<b>Gerencia:</b> {gerencia}\n\n"
+        bloque += f"Total de Solicitudes en Proceso: <b>{total}</b>\n"
+        bloque += f"🟢 A tiempo: <b>{al_dia}</b>\n"
+        bloque += f"🔴 Retrasadas: <b>{atrasadas}</b>\n"
+        bloques.append(bloque)
+
+    # La primera página reemplaza al mensaje "Generando reporte..."; el resto se
+    # envía como respuestas
+    paginas = paginar(bloques, encabezado)
+    await query.edit_message_text(next(paginas), parse_mode=ParseMode.HTML)
+    for pagina in paginas:
+        await query.message.reply_text(pagina, parse_mode=ParseMode.HTML)
     context.user_data.clear()
     return ConversationHandler.END
 
@@ -1228,11 +1217,8 @@ reporte_handler = ConversationHandler(
 async def unidad_usuaria_start(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> int:
-    if get_user_status(update.effective_user.id) != "autorizado":
-        await handle_unauthorized(update, context)
-        return ConversationHandler.END
 
-    distritos = get_unique_column_values("distrito")
+    distritos = await run_db(get_unique_column_values, "distrito")
     if not distritos:
         await update.message.reply_text("No hay distritos disponibles para filtrar.")
         return ConversationHandler.END
@@ -1261,7 +1247,7 @@ async def distrito_callback_unidad(
     distrito = query.data
     context.user_data["unidad_distrito"] = distrito
 
-    gerencias = get_unique_column_values("gerencia", distrito=distrito)
+    gerencias = await run_db(get_unique_column_values, "gerencia", distrito=distrito)
     if not gerencias:
         await query.edit_message_text(
             "No hay gerencias disponibles para este distrito."
@@ -1290,8 +1276,8 @@ async def gerencia_callback_unidad(
     context.user_data["unidad_gerencia"] = gerencia
     distrito = context.user_data["unidad_distrito"]
 
-    servicios = get_unique_column_values(
-        "servicio", distrito=distrito, gerencia=gerencia
+    servicios = await run_db(
+        get_unique_column_values, "servicio", distrito=distrito, gerencia=gerencia
     )
     if not servicios:
         await query.edit_message_text(
@@ -1323,8 +1309,11 @@ async def servicio_callback_unidad(
 
     await query.edit_message_text("Generando reporte de Unidades Usuarias...")
 
-    solicitudes = get_solicitudes_unidad_usuaria(
-        distrito=distrito, gerencia=gerencia, servicio=servicio
+    solicitudes = await run_db(
+        get_solicitudes_unidad_usuaria,
+        distrito=distrito,
+        gerencia=gerencia,
+        servicio=servicio,
     )
 
     if not solicitudes:
@@ -1333,39 +1322,36 @@ async def servicio_callback_unidad(
         )
         return ConversationHandler.END
 
-    final_message = "<b>PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n\n"
+    encabezado = "<b>PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n\n"
 
+    bloques = []
     for solicitud in solicitudes:
-        final_message += "----------------------------------------\n"
-        final_message += f"<b>Gerencia:</b> {html.escape(solicitud['gerencia'])}\n"
-        final_message += f"<b>Responsable:</b> {html.escape(solicitud.get('responsable', 'No especificado'))}\n"
+        gerencia = solicitud["gerencia"]
+        responsable = solicitud.get("responsable", "No especificado")
 
         hito_actual = solicitud.get("hito_actual")
         if hito_actual:
-            nombre_hito = HITO_NOMBRES_LARGOS.get(hito_actual, hito_actual)
-            fecha_plan = solicitud.get(f"fecha_planificada_{hito_actual}")
-            fecha_plan_dt = datetime.strptime(fecha_plan, "%Y-%m-%d").date()
-            hoy = datetime.now().date()
-            dias_restantes = (fecha_plan_dt - hoy).days
-
-            estatus_simbolo = "🔴" if dias_restantes < 0 else "🟢"
-
-            tarea = get_tarea_a_cumplir(hito_actual)
-
-            final_message += f"<b>Fase:</b> {html.escape(nombre_hito)}\n"
-            final_message += (
-                f"<b>Fecha Límite:</b> {format_date_for_display(fecha_plan)}\n"
+            fecha_plan = solicitud.get(HITOS[hito_actual].col_planificada)
+            bloque = render.UNIDAD_USUARIA(
+                gerencia=gerencia,
+                responsable=responsable,
+                fase=nombre_hito_html(hito_actual),
+                fecha_limite=format_date_for_display(fecha_plan),
+                tarea=tarea_html(hito_actual),
+                estatus=fechas.estatus(fecha_plan),
+                id=solicitud["id"],
+                solicitud=solicitud["solicitud_contratacion"],
             )
-            final_message += f"<b>Tarea a Cumplir:</b> {html.escape(tarea)}\n"
-            final_message += f"{estatus_simbolo} <b>Solicitud (ID {solicitud['id']}):</b> {html.escape(solicitud['solicitud_contratacion'])}\n\n"
         else:
-            final_message += f"🎉 <b>Solicitud (ID {solicitud['id']}):</b> {html.escape(solicitud['solicitud_contratacion'])} (Completada)\n\n"
+            bloque = render.UNIDAD_USUARIA_COMPLETADA(
+                gerencia=gerencia,
+                responsable=responsable,
+                id=solicitud["id"],
+                solicitud=solicitud["solicitud_contratacion"],
+            )
+        bloques.append(bloque)
 
-    chunk_size = 4096
-    for i in range(0, len(final_message), chunk_size):
-        await query.message.reply_text(
-            final_message[i : i + chunk_size], parse_mode=ParseMode.HTML
-        )
+    await enviar_paginado(query.message.reply_text, bloques, encabezado)
 
     context.user_data.clear()
     return ConversationHandler.END
@@ -1382,16 +1368,41 @@ unidad_usuaria_handler = ConversationHandler(
 )
 
 
+def _bloques_pendientes_por_fecha(pendientes_por_fecha):
+    """
+    Bloques (uno por solicitud) de los reportes de pendientes por día. El título de
+    cada fecha va junto a su primera solicitud para que no quede suelto al paginar.
+    """
+    bloques = []
+    for fecha_str in sorted(pendientes_por_fecha.keys()):
+        estatus_simbolo = fechas.estatus(fecha_str)
+
+        titulo = f"<b>Fecha Límite: {fechas.fecha_larga(fecha_str)}</b>\n\n"
+        for solicitud in pendientes_por_fecha[fecha_str]:
+            hito_actual = solicitud["hito_actual"]
+            bloques.append(
+                titulo
+                + render.SOLICITUD_PENDIENTE(
+                    gerencia=solicitud.get("gerencia", "No especificada"),
+                    responsable=solicitud.get("responsable", "No especificado"),
+                    fase=nombre_hito_html(hito_actual),
+                    tarea=tarea_html(hito_actual),
+                    estatus=estatus_simbolo,
+                    id=solicitud["id"],
+                    solicitud=solicitud["solicitud_contratacion"],
+                )
+            )
+            titulo = ""
+    return bloques
+
+
 async def reporte_dia_pendiente_command(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    if get_user_status(update.effective_user.id) != "autorizado":
-        await handle_unauthorized(update, context)
-        return
 
     await update.message.reply_text("Generando reporte de pendientes por día...")
 
-    solicitudes = get_solicitudes_pendientes_por_dia()
+    solicitudes = await run_db(get_solicitudes_pendientes_por_dia)
 
     if not solicitudes:
         await update.message.reply_text(
@@ -1407,51 +1418,22 @@ async def reporte_dia_pendiente_command(
                 pendientes_por_fecha[fecha] = []
             pendientes_por_fecha[fecha].append(sol)
 
-    hoy = datetime.now().date()
-
-    for fecha_str in sorted(pendientes_por_fecha.keys()):
-
-        message_for_this_date = "<b>PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n\n"
-
-        fecha_obj = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-        nombre_dia = get_weekday_in_spanish(fecha_obj)
-        fecha_display = fecha_obj.strftime("%d/%m/%Y")
-
-        message_for_this_date += (
-            f"<b>Fecha Límite: {nombre_dia}, {fecha_display}</b>\n\n"
-        )
-
-        for solicitud in pendientes_por_fecha[fecha_str]:
-            nombre_hito = HITO_NOMBRES_LARGOS.get(
-                solicitud["hito_actual"], solicitud["hito_actual"]
-            )
-            dias_restantes = (fecha_obj - hoy).days
-            estatus_simbolo = "🔴" if dias_restantes < 0 else "🟢"
-            tarea = get_tarea_a_cumplir(solicitud["hito_actual"])
-
-            message_for_this_date += f"<b>Gerencia:</b> {html.escape(solicitud.get('gerencia', 'No especificada'))}\n"
-            message_for_this_date += f"<b>Responsable:</b> {html.escape(solicitud.get('responsable', 'No especificado'))}\n"
-            message_for_this_date += f"<b>Fase:</b> {html.escape(nombre_hito)}\n"
-            message_for_this_date += f"<b>Tarea a Cumplir:</b> {html.escape(tarea)}\n"
-            message_for_this_date += f"{estatus_simbolo} <b>Solicitud (ID {solicitud['id']}):</b> {html.escape(solicitud['solicitud_contratacion'])}\n"
-            message_for_this_date += "----------------------------------------\n\n"
-
-        # Enviar un mensaje por cada día
-        await update.message.reply_text(
-            message_for_this_date, parse_mode=ParseMode.HTML
-        )
+    await enviar_navegable(
+        update.message.reply_text,
+        update.effective_user.id,
+        "dia_pendiente",
+        _bloques_pendientes_por_fecha(pendientes_por_fecha),
+        "<b>PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n\n",
+    )
 
 
 async def unidad_usuaria_dia_command(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    if get_user_status(update.effective_user.id) != "autorizado":
-        await handle_unauthorized(update, context)
-        return
 
     await update.message.reply_text("Generando reporte de Unidades Usuarias por día...")
 
-    solicitudes = get_solicitudes_unidad_usuaria_pendientes_por_dia()
+    solicitudes = await run_db(get_solicitudes_unidad_usuaria_pendientes_por_dia)
 
     if not solicitudes:
         await update.message.reply_text(
@@ -1467,45 +1449,93 @@ async def unidad_usuaria_dia_command(
                 pendientes_por_fecha[fecha] = []
             pendientes_por_fecha[fecha].append(sol)
 
-    hoy = datetime.now().date()
+    await enviar_navegable(
+        update.message.reply_text,
+        update.effective_user.id,
+        "unidad_dia",
+        _bloques_pendientes_por_fecha(pendientes_por_fecha),
+        "<b>PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n\n",
+    )
 
-    for fecha_str in sorted(pendientes_por_fecha.keys()):
 
-        message_for_this_date = "<b>PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n\n"
+def construir_datos_reporte_principal(file_path):
+    """
+    Lee el Cronograma Principal y agrupa por fecha y gerencia responsable los hitos
+    planificados hasta la fecha de corte. Es síncrona: se ejecuta con run_reporte.
+    """
+    df = leer_excel(file_path).fillna("")
 
-        fecha_obj = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-        nombre_dia = get_weekday_in_spanish(fecha_obj)
-        fecha_display = fecha_obj.strftime("%d/%m/%Y")
+    fecha_corte = datetime(2025, 9, 2).date()
 
-        message_for_this_date += (
-            f"<b>Fecha Límite: {nombre_dia}, {fecha_display}</b>\n\n"
-        )
+    report_data = {}
+
+    for index, row in df.iterrows():
+        gerencia_base = row.get("GERENCIA", "Sin Gerencia")
+        solicitud_id = row.get("N", "N/A")
+        nombre_solicitud = row.get("SOLICITUD DE CONTRATACIÓN", "Sin Nombre")
+
+        for hito_key, hito in HITOS.items():
+            fecha_str_excel = row.get(hito.nombre)
+            fecha_obj_str = safe_date_convert(fecha_str_excel)
+
+            if fecha_obj_str:
+                if fechas.parse_iso(fecha_obj_str) <= fecha_corte:
+                    if hito_key in ["presupuesto_base", "fecha_solicitud"]:
+                        gerencia_resp = gerencia_base
+                    else:
+                        gerencia_resp = "GERENCIA DE CONTRATACIONES"
+
+                    if fecha_obj_str not in report_data:
+                        report_data[fecha_obj_str] = {}
+
+                    if gerencia_resp not in report_data[fecha_obj_str]:
+                        report_data[fecha_obj_str][gerencia_resp] = []
+
+                    report_data[fecha_obj_str][gerencia_resp].append(
+                        {
+                            "id": solicitud_id,
+                            "nombre_solicitud": nombre_solicitud,
+                            "tarea": hito.tarea,
+                            "nombre_hito": hito.nombre,
+                        }
+                    )
+    return report_data
+
+
+def _escribir_reporte_temporal(report_data):
+    """Escribe el reporte imprimible en un archivo temporal propio y devuelve su ruta."""
+    fd, ruta = tempfile.mkstemp(prefix="reporte_principal_", suffix=".html")
+    os.close(fd)
+    if not generate_printable_report_html(report_data, ruta):
+        os.remove(ruta)
+        return None
+    return ruta
+
+
+# Limita los reportes simultáneos; el resto espera su turno
+_reportes_semaforo = asyncio.Semaphore(REPORTES_CONCURRENTES)
 
-        for solicitud in pendientes_por_fecha[fecha_str]:
-            nombre_hito = HITO_NOMBRES_LARGOS.get(
-                solicitud["hito_actual"], solicitud["hito_actual"]
-            )
-            dias_restantes = (fecha_obj - hoy).days
-            estatus_simbolo = "🔴" if dias_restantes < 0 else "🟢"
-            tarea = get_tarea_a_cumplir(solicitud["hito_actual"])
-
-            message_for_this_date += f"<b>Gerencia:</b> {html.escape(solicitud.get('gerencia', 'No especificada'))}\n"
-            message_for_this_date += f"<b>Responsable:</b> {html.escape(solicitud.get('responsable', 'No especificado'))}\n"
-            message_for_this_date += f"<b>Fase:</b> {html.escape(nombre_hito)}\n"
-            message_for_this_date += f"<b>Tarea a Cumplir:</b> {html.escape(tarea)}\n"
-            message_for_this_date += f"{estatus_simbolo} <b>Solicitud (ID {solicitud['id']}):</b> {html.escape(solicitud['solicitud_contratacion'])}\n"
-            message_for_this_date += "----------------------------------------\n\n"
-
-        # Enviar un mensaje por cada día
-        await update.message.reply_text(
-            message_for_this_date, parse_mode=ParseMode.HTML
-        )
+
+def _bloques_reporte_principal(report_data):
+    """Bloques (uno por tarea) del reporte principal, con sus títulos de fecha y gerencia."""
+    for fecha_str in sorted(report_data.keys()):
+        titulo = f"<b>Fecha de Vencimiento: {fechas.fecha_larga(fecha_str)}</b>\n\n"
+        for gerencia_resp, tareas in report_data[fecha_str].items():
+            titulo += render.GRUPO_GERENCIA_RESPONSABLE(gerencia=gerencia_resp)
+            for tarea_info in tareas:
+                yield titulo + render.TAREA_PRINCIPAL(
+                    fase=tarea_info["nombre_hito"],
+                    tarea=tarea_info["tarea"],
+                    id=tarea_info["id"],
+                    solicitud=tarea_info["nombre_solicitud"],
+                )
+                titulo = ""
 
 
 async def reporte_principal_command(
     update: Update, context: ContextTypes.DEFAULT_TYPE
 ) -> None:
-    if get_user_role(update.effective_user.id) != "admin":
+    if context.user_role != "admin":
         await update.message.reply_text("No tienes permiso para ejecutar este comando.")
         return
 
@@ -1516,95 +1546,55 @@ async def reporte_principal_command(
         )
         return
 
-    await update.message.reply_text(
+    # Mensaje de progreso que se actualiza en cada etapa
+    progreso = await update.message.reply_text(
         f"Archivo {file_path} encontrado. Generando reporte principal..."
     )
+    if _reportes_semaforo.locked():
+        await progreso.edit_text(
+            "⏳ Hay otros reportes en curso; el tuyo comenzará en cuanto termine uno."
+        )
 
+    ruta_reporte = None
     try:
-        df = pd.read_excel(file_path).fillna("")
-
-        fecha_corte = datetime(2025, 9, 2).date()
-
-        report_data = {}
-
-        for index, row in df.iterrows():
-            gerencia_base = row.get("GERENCIA", "Sin Gerencia")
-            solicitud_id = row.get("N", "N/A")
-            nombre_solicitud = row.get("SOLICITUD DE CONTRATACIÓN", "Sin Nombre")
-
-            for hito_key, hito_col_name in HITO_NOMBRES_LARGOS.items():
-                fecha_str_excel = row.get(hito_col_name)
-                fecha_obj_str = safe_date_convert(fecha_str_excel)
-
-                if fecha_obj_str:
-                    fecha_obj = datetime.strptime(fecha_obj_str, "%Y-%m-%d").date()
-                    if fecha_obj <= fecha_corte:
-                        if hito_key in ["presupuesto_base", "fecha_solicitud"]:
-                            gerencia_resp = gerencia_base
-                        else:
-                            gerencia_resp = "GERENCIA DE CONTRATACIONES"
-
-                        tarea = get_tarea_a_cumplir(hito_key)
-
-                        if fecha_obj_str not in report_data:
-                            report_data[fecha_obj_str] = {}
-
-                        if gerencia_resp not in report_data[fecha_obj_str]:
-                            report_data[fecha_obj_str][gerencia_resp] = []
-
-                        report_data[fecha_obj_str][gerencia_resp].append(
-                            {
-                                "id": solicitud_id,
-                                "nombre_solicitud": nombre_solicitud,
-                                "tarea": tarea,
-                                "nombre_hito": HITO_NOMBRES_LARGOS[hito_key],
-                            }
-                        )
-
-        if not report_data:
-            await update.message.reply_text(
-                "No se encontraron hitos planificados hasta la fecha de corte."
+        async with _reportes_semaforo:
+            await progreso.edit_text(f"⏳ Leyendo {file_path}...")
+            report_data = await run_reporte(
+                construir_datos_reporte_principal, file_path
             )
-            return
 
-        for fecha_str in sorted(report_data.keys()):
-            fecha_obj = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-            nombre_dia = get_weekday_in_spanish(fecha_obj)
-            fecha_display = fecha_obj.strftime("%d/%m/%Y")
+            if not report_data:
+                await progreso.edit_text(
+                    "No se encontraron hitos planificados hasta la fecha de corte."
+                )
+                return
 
-            message_for_this_date = "<b>PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n\n"
-            message_for_this_date += (
-                f"<b>Fecha de Vencimiento: {nombre_dia}, {fecha_display}</b>\n\n"
+            await progreso.edit_text(
+                f"⏳ Enviando {len(report_data)} fecha(s) y generando el archivo..."
             )
-
-            for gerencia_resp, tareas in report_data[fecha_str].items():
-                message_for_this_date += "----------------------------------------\n"
-                message_for_this_date += (
-                    f"<b>Gerencia Responsable:</b> {html.escape(gerencia_resp)}\n\n"
+            # El archivo se genera en segundo plano mientras se envían los mensajes
+            escritura = asyncio.ensure_future(
+                run_reporte(_escribir_reporte_temporal, report_data)
+            )
+            try:
+                await enviar_paginado(
+                    update.message.reply_text,
+                    _bloques_reporte_principal(report_data),
+                    "<b>PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n\n",
                 )
-                for tarea_info in tareas:
-                    message_for_this_date += (
-                        f"<b>Fase:</b> {html.escape(tarea_info['nombre_hito'])}\n"
-                    )
-                    message_for_this_date += (
-                        f"<b>Tarea a Cumplir:</b> {html.escape(tarea_info['tarea'])}\n"
-                    )
-                    message_for_this_date += f"<b>Solicitud (ID {tarea_info['id']}):</b> {html.escape(tarea_info['nombre_solicitud'])}\n\n"
-
-            chunk_size = 4096
-            for i in range(0, len(message_for_this_date), chunk_size):
-                await update.message.reply_text(
-                    message_for_this_date[i : i + chunk_size], parse_mode=ParseMode.HTML
+            finally:
+                ruta_reporte = await escritura
+
+        if ruta_reporte:
+            with open(ruta_reporte, "rb") as documento:
+                await update.message.reply_document(
+                    document=documento,
+                    filename="Reporte_Principal.html",
+                    caption="Aquí tienes el reporte completo en formato imprimible.",
                 )
-
-        if generate_printable_report_html(report_data):
-            await update.message.reply_document(
-                document=open("reporte_imprimible.html", "rb"),
-                filename="Reporte_Principal.html",
-                caption="Aquí tienes el reporte completo en formato imprimible.",
-            )
+            await progreso.edit_text("✅ Reporte principal generado.")
         else:
-            await update.message.reply_text(
+            await progreso.edit_text(
                 "Ocurrió un error al generar el archivo del reporte."
             )
 
@@ -1613,3 +1603,6 @@ async def reporte_principal_command(
         await update.message.reply_text(
             f"❌ Ocurrió un error al generar el reporte principal: {e}"
         )
+    finally:
+        if ruta_reporte:
+            os.remove(ruta_reporte)
@@ -0,0 +1,113 @@
+# bot/hitos.py
+# Registro de hitos del proceso de contratación. Todo lo que depende solo de la
+# clave del hito (orden, siguiente hito, nombres, textos de tarea ya escapados y
+# nombres de columna) se calcula una vez al importar el módulo.
+
+import html
+from collections import namedtuple
+
+from .config import HITOS_SECUENCIA, HITO_NOMBRES_LARGOS
+
+Hito = namedtuple(
+    "Hito",
+    [
+        "clave",
+        "orden",  # Posición en HITOS_SECUENCIA
+        "siguiente",  # Clave del hito siguiente o None si es el último
+        "nombre",  # Nombre largo (columna del Excel)
+        "nombre_html",
+        "tarea",  # Tarea a cumplir en reportes y consultas
+        "tarea_html",
+        "tarea_alerta",  # Tarea a cumplir en las alertas diarias
+        "tarea_alerta_html",
+        "col_planificada",
+        "col_real",
+        "col_posposiciones",
+        "col_historial",
+    ],
+)
+
+
+def _tarea(hito_key):
+    if hito_key == "presupuesto_base":
+        return "Entrega de presupuesto base."
+    if hito_key == "fecha_solicitud":
+        return "Entrega de proceso de inicio a la Gerencia de Contrataciones."
+    hito = str(HITO_NOMBRES_LARGOS.get(hito_key, "")).lower()
+    return f"Entrega {hito} para firma de Presidencia ENT."
+
+
+def _tarea_alerta(hito_key):
+    if hito_key == "presupuesto_base":
+        return "Gerencia responsable recibe presupuesto base."
+    if hito_key == "fecha_solicitud":
+        return "Gerencia responsable entrega a Gerencia de Contrataciones."
+    return "Entrega para firma de Presidencia ENT."
+
+
+def _crear_hito(orden, clave):
+    nombre = HITO_NOMBRES_LARGOS.get(clave, clave)
+    siguiente = HITOS_SECUENCIA[orden + 1] if orden + 1 < len(HITOS_SECUENCIA) else None
+    tarea, tarea_alerta = _tarea(clave), _tarea_alerta(clave)
+    return Hito(
+        clave=clave,
+        orden=orden,
+        siguiente=siguiente,
+        nombre=nombre,
+        nombre_html=html.escape(nombre),
+        tarea=tarea,
+        tarea_html=html.escape(tarea),
+        tarea_alerta=tarea_alerta,
+        tarea_alerta_html=html.escape(tarea_alerta),
+        col_planificada=f"fecha_planificada_{clave}",
+        col_real=f"fecha_real_{clave}",
+        col_posposiciones=f"posposiciones_{clave}",
+        col_historial=f"historial_fechas_{clave}",
+    )
+
+
+HITOS = {
+    clave: _crear_hito(orden, clave) for orden, clave in enumerate(HITOS_SECUENCIA)
+}
+
+
+# --- Consultas por clave ---
+# Aceptan claves vacías (solicitud completada) o desconocidas, como los textos
+# calculados a mano que reemplazan.
+
+
+def nombre_hito(hito_key):
+    """Nombre largo del hito; para claves desconocidas, la propia clave."""
+    hito = HITOS.get(hito_key)
+    return hito.nombre if hito else hito_key
+
+
+def nombre_hito_html(hito_key):
+    hito = HITOS.get(hito_key)
+    return hito.nombre_html if hito else html.escape(str(hito_key))
+
+
+def get_tarea_a_cumplir(hito_key):
+    """Determina la tarea a cumplir según el hito actual."""
+    if not hito_key:
+        return "N/A"
+    hito = HITOS.get(hito_key)
+    return hito.tarea if hito else _tarea(hito_key)
+
+
+def tarea_html(hito_key):
+    hito = HITOS.get(hito_key)
+    return hito.tarea_html if hito else html.escape(get_tarea_a_cumplir(hito_key))
+
+
+def get_tarea_alerta(hito_key):
+    """Tarea a cumplir con el texto de las alertas diarias."""
+    if not hito_key:
+        return "N/A"
+    hito = HITOS.get(hito_key)
+    return hito.tarea_alerta if hito else _tarea_alerta(hito_key)
+
+
+def tarea_alerta_html(hito_key):
+    hito = HITOS.get(hito_key)
+    return hito.tarea_alerta_html if hito else html.escape(get_tarea_alerta(hito_key))
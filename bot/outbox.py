@@ -0,0 +1,88 @@
+# bot/outbox.py
+# Worker de la cola persistente de mensajes. Las alertas se guardan primero en la
+# tabla 'cola_mensajes' y este worker las envía en segundo plano; como el estado
+# vive en SQLite, tras un reinicio retoma los mensajes que quedaron pendientes.
+
+import asyncio
+
+from .config import logger, COLA_INTERVALO, COLA_LOTE, COLA_MAX_INTENTOS
+from .delivery import MotorEnvio
+from .database import (
+    get_mensajes_pendientes,
+    marcar_mensaje_enviado,
+    marcar_mensaje_fallido,
+    run_db,
+)
+
+
+class WorkerCola:
+    """Vacía la cola de mensajes pendientes, revisándola cada COLA_INTERVALO segundos."""
+
+    def __init__(self, bot):
+        self.motor = MotorEnvio(bot)
+        self._despertar = asyncio.Event()
+        self._tarea = None
+
+    def iniciar(self):
+        self._tarea = asyncio.create_task(self._bucle())
+
+    async def detener(self):
+        if self._tarea is None:
+            return
+        self._tarea.cancel()
+        try:
+            await self._tarea
+        except asyncio.CancelledError:
+            pass
+        self._tarea = None
+
+    def despertar(self):
+        """Avisa al worker de que hay mensajes nuevos sin esperar al intervalo."""
+        self._despertar.set()
+
+    async def _bucle(self):
+        while True:
+            try:
+                # Mientras cada lectura devuelva un lote completo, quedan más pendientes
+                while await self.procesar_pendientes() >= COLA_LOTE:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error procesando la cola de mensajes: {e}")
+            try:
+                await asyncio.wait_for(self._despertar.wait(), COLA_INTERVALO)
+            except asyncio.TimeoutError:
+                pass
+            self._despertar.clear()
+
+    async def procesar_pendientes(self):
+        """Envía un lote de mensajes pendientes y registra el resultado de cada uno."""
+        pendientes = await run_db(get_mensajes_pendientes, COLA_LOTE)
+        if not pendientes:
+            return 0
+
+        async def al_terminar(indice, ok):
+            mensaje = pendientes[indice]
+            if ok:
+                await run_db(marcar_mensaje_enviado, mensaje["id_mensaje"])
+                return
+            # Espera exponencial entre intentos, hasta una hora
+            espera = min(3600, COLA_INTERVALO * 2 ** mensaje["intentos"])
+            estado = await run_db(
+                marcar_mensaje_fallido,
+                mensaje["id_mensaje"],
+                COLA_MAX_INTENTOS,
+                espera,
+            )
+            if estado == "fallido":
+                logger.error(
+                    f"Mensaje {mensaje['id_mensaje']} para {mensaje['telegram_id_usuario']} "
+                    f"descartado tras {COLA_MAX_INTENTOS} intentos."
+                )
+
+        enviados, fallidos = await self.motor.enviar_todos(
+            [(m["telegram_id_usuario"], m["texto"]) for m in pendientes], al_terminar
+        )
+        logger.info(f"Cola de mensajes: {enviados} enviados, {fallidos} fallidos.")
+        return len(pendientes)
@@ -0,0 +1,108 @@
+# bot/paginator.py
+# Paginación de salidas largas. Agrupa bloques (un registro, una fecha...) en el
+# menor número de mensajes que caben en el límite de Telegram, cortando siempre
+# entre bloques y nunca dentro de una etiqueta HTML o un emoji.
+
+import re
+
+from telegram.constants import MessageLimit, ParseMode
+
+LIMITE_MENSAJE = MessageLimit.MAX_TEXT_LENGTH
+
+# Unidades indivisibles de un texto HTML: etiquetas, entidades y caracteres sueltos
+_TOKENS_HTML = re.compile(r"<[^>]*>|&#?\w+;|[\s\S]")
+_ETIQUETA = re.compile(r"<(/?)(\w+)")
+
+
+def longitud(texto):
+    """Longitud de `texto` tal como la cuenta Telegram (unidades UTF-16)."""
+    return len(texto.encode("utf-16-le")) // 2
+
+
+def _partir_linea(linea, limite):
+    """
+    Parte una línea más larga que `limite` entre tokens HTML. Las etiquetas que
+    quedan abiertas en un corte se cierran al final de la parte y se reabren al
+    comienzo de la siguiente.
+    """
+    partes, actual, abiertas = [], "", []
+    for token in _TOKENS_HTML.findall(linea):
+        cierre = "".join(f"</{nombre}>" for nombre, _ in reversed(abiertas))
+        if actual and longitud(actual + token + cierre) > limite:
+            partes.append(actual + cierre)
+            actual = "".join(apertura for _, apertura in abiertas)
+        actual += token
+        etiqueta = _ETIQUETA.match(token)
+        if etiqueta and token.startswith("<") and not token.endswith("/>"):
+            if etiqueta.group(1):
+                if abiertas and abiertas[-1][0] == etiqueta.group(2):
+                    abiertas.pop()
+            else:
+                abiertas.append((etiqueta.group(2), token))
+    if actual:
+        partes.append(actual)
+    return partes
+
+
+def _partir_bloque(bloque, limite):
+    """Parte un bloque mayor que `limite` por líneas y, si hace falta, por tokens."""
+    partes, actual = [], ""
+    for linea in bloque.splitlines(keepends=True):
+        if longitud(linea) > limite:
+            if actual:
+                partes.append(actual)
+                actual = ""
+            partes.extend(_partir_linea(linea, limite))
+        elif longitud(actual) + longitud(linea) > limite:
+            partes.append(actual)
+            actual = linea
+        else:
+            actual += linea
+    if actual:
+        partes.append(actual)
+    return partes
+
+
+def paginar(bloques, encabezado="", limite=LIMITE_MENSAJE):
+    """
+    Genera los mensajes que resultan de empaquetar `bloques` (en orden) hasta
+    `limite`. El `encabezado` abre el primer mensaje. Un bloque solo se parte si
+    por sí solo no cabe en un mensaje.
+    """
+    actual, tamano = encabezado, longitud(encabezado)
+    vacio = True  # El mensaje en curso aún no tiene bloques
+    for bloque in bloques:
+        tamano_bloque = longitud(bloque)
+        if tamano + tamano_bloque <= limite:
+            actual += bloque
+            tamano += tamano_bloque
+            vacio = False
+            continue
+        if not vacio:
+            yield actual
+            actual, tamano = "", 0
+        if tamano + tamano_bloque <= limite:
+            actual, tamano = bloque, tamano_bloque
+        else:
+            # El bloque no cabe ni en un mensaje propio (con el encabezado, si es
+            # el primero): se parte por líneas
+            *completas, actual = _partir_bloque(actual + bloque, limite)
+            yield from completas
+            tamano = longitud(actual)
+        vacio = False
+    if not vacio:
+        yield actual
+
+
+async def enviar_paginado(
+    enviar, bloques, encabezado="", parse_mode=ParseMode.HTML, **kwargs
+):
+    """
+    Envía con `enviar` (p. ej. update.message.reply_text) los mensajes de
+    paginar(bloques, encabezado). Devuelve el número de mensajes enviados.
+    """
+    enviados = 0
+    for mensaje in paginar(bloques, encabezado):
+        await enviar(mensaje, parse_mode=parse_mode, **kwargs)
+        enviados += 1
+    return enviados
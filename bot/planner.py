@@ -0,0 +1,39 @@
+# bot/planner.py
+# Planificador de alertas por ventanas (p. ej. 7, 3, 1 y 0 días antes del
+# vencimiento, más un recordatorio diario de las atrasadas).
+
+from .fechas import parse_iso
+
+# Alertas de solicitudes atrasadas; se registran con fecha_evento = día de la alerta
+EVENTO_ATRASADA = "atrasada"
+
+
+def evento_ventana(dias):
+    """Nombre del evento con el que se registra la alerta de una ventana."""
+    return f"ventana_{dias}"
+
+
+def planificar_alertas(solicitudes, hoy, ventanas, atrasadas):
+    """
+    Decide qué alerta corresponde hoy a cada solicitud. Devuelve una lista de
+    (solicitud, nombre_evento, fecha_evento, dias_restantes).
+
+    Para las solicitudes por vencer se usa la ventana más estrecha que las cubre
+    (con ventanas 7, 3, 1 y 0, a una solicitud que vence en 2 días le corresponde
+    la de 3). La alerta se registra con la fecha de vencimiento, de modo que si un
+    día no se ejecutó la revisión, la ventana pendiente se envía al siguiente y las
+    más amplias ya superadas se omiten. Las atrasadas se alertan una vez al día.
+    """
+    hoy_iso = hoy.isoformat()
+    ascendentes = sorted(ventanas)
+    plan = []
+    for sol in solicitudes:
+        dias = (parse_iso(sol["fecha_vencimiento"]) - hoy).days
+        if dias < 0:
+            if atrasadas:
+                plan.append((sol, EVENTO_ATRASADA, hoy_iso, dias))
+            continue
+        ventana = next((v for v in ascendentes if v >= dias), None)
+        if ventana is not None:
+            plan.append((sol, evento_ventana(ventana), sol["fecha_vencimiento"], dias))
+    return plan
@@ -0,0 +1,105 @@
+# bot/render.py
+# Plantillas precompiladas para los bloques de texto de los reportes por chat
+# (Gerencia / Responsable / Fase / Tarea a Cumplir / Solicitud). Los textos fijos
+# de cada hito llegan ya escapados desde bot/hitos.py y cada plantilla se compila
+# una sola vez en una función de Python.
+
+import html
+from string import Formatter
+
+
+def plantilla(texto):
+    """
+    Compila `texto` una sola vez en una función que recibe sus campos como
+    argumentos con nombre. Los campos "{nombre}" se escapan como HTML al
+    renderizar; los "{nombre!h}" se insertan tal cual (texto ya escapado, como los
+    textos *_html de bot/hitos.py). La función generada une literales y valores
+    con un único "".join, sin recorrer la plantilla en cada fila.
+    """
+    campos, partes = [], []
+    for literal, campo, _, conversion in Formatter().parse(texto):
+        if literal:
+            partes.append(repr(literal))
+        if campo is None:
+            continue
+        if not campo.isidentifier():
+            raise ValueError(f"Campo de plantilla no válido: {campo!r}")
+        if campo not in campos:
+            campos.append(campo)
+        if conversion == "h":
+            partes.append(f"str({campo})")
+        else:
+            partes.append(f"_escape(str({campo}))")
+    parametros = f"*, {', '.join(campos)}" if campos else ""
+    codigo = (
+        f"def renderizar({parametros}):\n"
+        f"    return ''.join(({''.join(p + ', ' for p in partes)}))\n"
+    )
+    espacio = {"_escape": html.escape}
+    exec(codigo, espacio)
+    return espacio["renderizar"]
+
+
+SEPARADOR = "----------------------------------------\n"
+
+GRUPO_RESPONSABLE = plantilla(SEPARADOR + "<b>Responsable:</b> {responsable}\n\n")
+GRUPO_GERENCIA = plantilla(SEPARADOR + "<b>Gerencia:</b> {gerencia}\n\n")
+GRUPO_GERENCIA_RESPONSABLE = plantilla(
+    SEPARADOR + "<b>Gerencia Responsable:</b> {gerencia}\n\n"
+)
+
+# /hoy
+SOLICITUD_HOY = plantilla(
+    "<b>Gerencia:</b> {gerencia}\n"
+    "<b>Fase:</b> {fase!h}\n"
+    "<b>Tarea a Cumplir:</b> {tarea!h}\n"
+    "<b>Solicitud ID {id}:</b> {solicitud}\n\n"
+)
+
+# /retrasado
+SOLICITUD_RETRASADA = plantilla(
+    "<b>Responsable:</b> {responsable}\n"
+    "<b>Fase:</b> {fase!h}\n"
+    "<b>Tarea a Cumplir:</b> {tarea!h}\n"
+    "<b>Fecha Límite:</b> {fecha_limite}\n"
+    "🔴 <b>Solicitud (ID {id}):</b> {solicitud}\n\n"
+)
+
+# /unidad_usuaria
+UNIDAD_USUARIA = plantilla(
+    SEPARADOR + "<b>Gerencia:</b> {gerencia}\n"
+    "<b>Responsable:</b> {responsable}\n"
+    "<b>Fase:</b> {fase!h}\n"
+    "<b>Fecha Límite:</b> {fecha_limite}\n"
+    "<b>Tarea a Cumplir:</b> {tarea!h}\n"
+    "{estatus} <b>Solicitud (ID {id}):</b> {solicitud}\n\n"
+)
+UNIDAD_USUARIA_COMPLETADA = plantilla(
+    SEPARADOR + "<b>Gerencia:</b> {gerencia}\n"
+    "<b>Responsable:</b> {responsable}\n"
+    "🎉 <b>Solicitud (ID {id}):</b> {solicitud} (Completada)\n\n"
+)
+
+# /reporte_dia_pendiente y /unidad_usuaria_dia
+SOLICITUD_PENDIENTE = plantilla(
+    "<b>Gerencia:</b> {gerencia}\n"
+    "<b>Responsable:</b> {responsable}\n"
+    "<b>Fase:</b> {fase!h}\n"
+    "<b>Tarea a Cumplir:</b> {tarea!h}\n"
+    "{estatus} <b>Solicitud (ID {id}):</b> {solicitud}\n" + SEPARADOR + "\n"
+)
+
+# /reporte_principal
+TAREA_PRINCIPAL = plantilla(
+    "<b>Fase:</b> {fase}\n"
+    "<b>Tarea a Cumplir:</b> {tarea}\n"
+    "<b>Solicitud (ID {id}):</b> {solicitud}\n\n"
+)
+
+# Resumen diario de alertas (bot/digest.py)
+SOLICITUD_ALERTA = plantilla(
+    "<b>Vencimiento:</b> {vencimiento} ({plazo})\n"
+    "<b>Fase:</b> {fase!h}\n"
+    "<b>Tarea a Cumplir:</b> {tarea!h}\n\n"
+    "<b>Solicitud ID {id}:</b> {solicitud}\n\n"
+)
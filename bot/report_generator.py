@@ -1,34 +1,37 @@
 # bot/report_generator.py
 # Lógica para generar el reporte imprimible en HTML, corregido para compatibilidad con Firefox.
 
+import asyncio
+import functools
 import html
-from datetime import datetime
-
-
-def get_weekday_in_spanish(date_obj):
-    """Devuelve el nombre del día de la semana en español."""
-    weekdays = [
-        "Lunes",
-        "Martes",
-        "Miércoles",
-        "Jueves",
-        "Viernes",
-        "Sábado",
-        "Domingo",
-    ]
-    return weekdays[date_obj.weekday()]
-
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from .config import REPORTES_CONCURRENTES
+from .fechas import fecha_larga
+
+ARCHIVO_REPORTE = "reporte_imprimible.html"
+TITULO_REPORTE = (
+    "PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN"
+)
+
+# Los reportes se generan fuera del bucle de eventos, en hilos propios para no
+# ocupar el executor de la base de datos
+_report_executor = ThreadPoolExecutor(
+    max_workers=REPORTES_CONCURRENTES, thread_name_prefix="reporte"
+)
+
+
+async def run_reporte(func, *args, **kwargs):
+    """Ejecuta una función síncrona de generación de reportes en su executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _report_executor, functools.partial(func, *args, **kwargs)
+    )
 
-def generate_printable_report_html(report_data):
-    """
-    Genera un archivo HTML con una estructura dual: una para la vista en pantalla
-    y otra optimizada para impresión (con encabezados repetidos en cada página)
-    que es compatible con Firefox y otros navegadores.
-    """
 
-    # --- INICIO DE CAMBIOS ---
-    # CSS completamente reescrito para manejar la estructura dual (pantalla vs. impresión)
-    styles = """
+# CSS para la estructura dual (pantalla vs. impresión)
+_ESTILOS = """
     <style>
         /* --- ESTILOS GENERALES PARA LA PANTALLA --- */
         body { 
@@ -119,76 +122,77 @@ def generate_printable_report_html(report_data):
     </style>
     """
 
-    # Construcción del encabezado del HTML
-    html_head = f'<!DOCTYPE html><html><head><meta charset="UTF-8"><title>Reporte de Planificación</title>{styles}</head><body>'
-
-    # Se inicializan dos strings vacíos para construir el contenido de ambas vistas por separado.
-    screen_html_content = ""
-    print_html_cards = ""
+_ENCABEZADO_HTML = f'<!DOCTYPE html><html><head><meta charset="UTF-8"><title>Reporte de Planificación</title>{_ESTILOS}</head><body>'
 
-    # Título del reporte
-    report_title = (
-        "PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN"
-    )
 
-    # Se itera una sola vez sobre los datos para construir el contenido de las tarjetas
-    for fecha_str in sorted(report_data.keys()):
-        fecha_obj = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-        nombre_dia = get_weekday_in_spanish(fecha_obj)
-        fecha_display = fecha_obj.strftime("%d/%m/%Y")
-
-        # Construye el contenido de una tarjeta (sin el div.card exterior)
-        card_inner_html = '<div class="card-header">'
-        card_inner_html += f'<h2 class="card-title">Fecha de Vencimiento: {nombre_dia}, {fecha_display}</h2>'
-        card_inner_html += "</div>"
-
-        for gerencia_resp, tareas in report_data[fecha_str].items():
-            card_inner_html += '<div class="gerencia-block">'
-            card_inner_html += f'<h3 class="gerencia-title">Gerencia Responsable: {html.escape(gerencia_resp)}</h3>'
-            for tarea in tareas:
-                card_inner_html += '<div class="task">'
-                card_inner_html += (
-                    f"<p><b>Fase:</b> {html.escape(tarea['nombre_hito'])}</p>"
-                )
-                card_inner_html += (
-                    f"<p><b>Tarea a Cumplir:</b> {html.escape(tarea['tarea'])}</p>"
-                )
-                card_inner_html += f"<p><b>Solicitud (ID {tarea['id']}):</b> {html.escape(tarea['nombre_solicitud'])}</p>"
-                card_inner_html += "</div><br>"
-            card_inner_html += "</div>"
-
-        # Para la vista de pantalla, se añade el título repetitivo y la tarjeta.
-        screen_html_content += f'<h1 class="page-title">{report_title}</h1>'
-        screen_html_content += f'<div class="card">{card_inner_html}</div>'
-
-        # Para la vista de impresión, solo se añade la tarjeta.
-        print_html_cards += f'<div class="card">{card_inner_html}</div>'
-
-    # Se ensambla la estructura final del HTML
-    body_html = (
-        f"{html_head}"
-        # 1. Estructura para la impresión (basada en tabla)
+def _render_card(fecha_str, gerencias):
+    """Renderiza la tarjeta (div.card) de una fecha de vencimiento."""
+    partes = [
+        '<div class="card"><div class="card-header">',
+        f'<h2 class="card-title">Fecha de Vencimiento: {fecha_larga(fecha_str)}</h2>',
+        "</div>",
+    ]
+    for gerencia_resp, tareas in gerencias.items():
+        partes.append('<div class="gerencia-block">')
+        partes.append(
+            f'<h3 class="gerencia-title">Gerencia Responsable: {html.escape(gerencia_resp)}</h3>'
+        )
+        for tarea in tareas:
+            partes.append(
+                '<div class="task">'
+                f"<p><b>Fase:</b> {html.escape(tarea['nombre_hito'])}</p>"
+                f"<p><b>Tarea a Cumplir:</b> {html.escape(tarea['tarea'])}</p>"
+                f"<p><b>Solicitud (ID {tarea['id']}):</b> {html.escape(tarea['nombre_solicitud'])}</p>"
+                "</div><br>"
+            )
+        partes.append("</div>")
+    partes.append("</div>")
+    return "".join(partes)
+
+
+def write_printable_report_html(report_data, f):
+    """
+    Escribe el reporte en el archivo de texto `f` a medida que se renderiza cada
+    tarjeta. El documento tiene una estructura dual: primero la vista de impresión
+    (tabla con encabezado repetido en cada página, compatible con Firefox) y luego
+    la vista en pantalla. Cada tarjeta se renderiza una sola vez: se escribe en la
+    vista de impresión y se guarda en un archivo temporal para la de pantalla, de
+    modo que la memoria usada no depende del tamaño del reporte.
+    """
+    f.write(_ENCABEZADO_HTML)
+    # 1. Estructura para la impresión (basada en tabla)
+    f.write(
         '<table id="reporte-impresion">'
         '<thead id="encabezado-impresion">'
         "<tr>"
-        f"<td><h1>{report_title}</h1></td>"
+        f"<td><h1>{TITULO_REPORTE}</h1></td>"
         "</tr>"
         "</thead>"
         '<tbody id="cuerpo-reporte">'
         "<tr>"
-        f"<td>{print_html_cards}</td>"
-        "</tr>"
-        "</tbody>"
-        "</table>"
-        # 2. Estructura para la vista en pantalla (la original)
-        f'<div id="vista-pantalla">{screen_html_content}</div>'
-        "</body></html>"
+        "<td>"
     )
-    # --- FIN DE CAMBIOS ---
-
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as pantalla:
+        for fecha_str in sorted(report_data.keys()):
+            card = _render_card(fecha_str, report_data[fecha_str])
+            f.write(card)
+            # En pantalla, cada tarjeta va precedida por el título
+            pantalla.write(f'<h1 class="page-title">{TITULO_REPORTE}</h1>')
+            pantalla.write(card)
+        f.write("</td></tr></tbody></table>")
+
+        # 2. Estructura para la vista en pantalla
+        f.write('<div id="vista-pantalla">')
+        pantalla.seek(0)
+        shutil.copyfileobj(pantalla, f)
+    f.write("</div></body></html>")
+
+
+def generate_printable_report_html(report_data, output_path=ARCHIVO_REPORTE):
+    """Genera el reporte imprimible en `output_path`. Devuelve True si se escribió."""
     try:
-        with open("reporte_imprimible.html", "w", encoding="utf-8") as f:
-            f.write(body_html)
+        with open(output_path, "w", encoding="utf-8", buffering=1024 * 1024) as f:
+            write_printable_report_html(report_data, f)
         return True
     except Exception as e:
         print(f"Error al generar el reporte: {e}")  # Añadido para mejor depuración
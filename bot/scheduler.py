@@ -1,113 +1,241 @@
 # bot/scheduler.py
 # Lógica para programar y ejecutar las notificaciones.
 
-import html
-import sqlite3
+import asyncio
+import time
+import uuid
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from telegram.ext import Application
-from telegram.constants import ParseMode
 
-from .config import logger, TIMEZONE, HITOS_SECUENCIA, HITO_NOMBRES_LARGOS
-from .database import get_config_value, get_notifiable_users, db_connect
+from .config import (
+    logger,
+    TIMEZONE,
+    JOB_MISFIRE_GRACE,
+    NOTIF_GRUPOS_CONCURRENTES,
+    NOTIF_ESCALONADO,
+)
+from . import fechas
+from .digest import construir_resumen, filtrar_por_suscripcion
+from .outbox import WorkerCola
+from .planner import planificar_alertas
+from .database import (
+    get_config_value,
+    get_ventanas_notificacion,
+    get_hora_notificacion,
+    cargar_configuracion,
+    get_notifiable_users,
+    get_suscripciones,
+    get_responsables_para_notificar,
+    get_solicitudes_para_notificar,
+    get_alertas_registradas,
+    get_estado_job,
+    registrar_ejecucion_job,
+    encolar_mensajes,
+    cargar_indice_facetas,
+    run_db,
+    close_all_connections,
+    shutdown_db_executor,
+)
 
+ID_REVISION_DIARIA = "daily_check"
+FORMATO_FECHA_HORA = "%Y-%m-%d %H:%M:%S"
 
-def get_tarea_a_cumplir(hito_key):
-    """Determina la tarea a cumplir según el hito actual."""
-    if not hito_key:
-        return "N/A"
-    if hito_key == "presupuesto_base":
-        return "Gerencia responsable recibe presupuesto base."
-    if hito_key == "fecha_solicitud":
-        return "Gerencia responsable entrega a Gerencia de Contrataciones."
-    return "Entrega para firma de Presidencia ENT."
+# Resultados de una revisión que no encoló todas las alertas del día. Se guardan
+# igualmente en 'estado_jobs' (los muestra /estado_notificaciones), pero al arrancar
+# cuentan como una revisión omitida
+RESULTADO_SIN_CONFIGURAR = "sin configurar"
+PREFIJO_ERROR = "error: "
+MARCA_GRUPOS_CON_ERROR = "grupos con error: "
+
+
+def _planificar_grupo(responsable, hoy, hasta, desde, ventanas, atrasadas):
+    """Consulta y planifica las alertas de un responsable (en el executor de BD)."""
+    solicitudes = get_solicitudes_para_notificar(hasta, desde, responsable)
+    return planificar_alertas(solicitudes, hoy, ventanas, atrasadas)
+
+
+async def _ejecutar_grupo(semaforo, responsable, *args):
+    """
+    Ejecuta un grupo de forma aislada: si falla, se registra y el resto continúa;
+    sus alertas no se encolan y se reintentan en la próxima revisión.
+    Devuelve (plan o None si falló, duración en segundos).
+    """
+    async with semaforo:
+        inicio = time.perf_counter()
+        try:
+            plan = await run_db(_planificar_grupo, responsable, *args)
+        except Exception as e:
+            logger.error(
+                f"Error en el grupo de notificación '{responsable or 'Sin Responsable'}': {e}"
+            )
+            plan = None
+        duracion = time.perf_counter() - inicio
+    logger.info(
+        f"Grupo '{responsable or 'Sin Responsable'}': {len(plan) if plan is not None else 'error'} "
+        f"alertas en {duracion * 1000:.0f} ms."
+    )
+    return plan, duracion
 
 
 async def check_and_send_notifications(context: Application):
-    """Función ejecutada por el scheduler para revisar y enviar alertas."""
+    """
+    Revisa y encola las alertas del día. Cada responsable se planifica como un grupo
+    independiente, con hasta NOTIF_GRUPOS_CONCURRENTES grupos en paralelo; luego se
+    compone un único resumen por usuario. Es idempotente: las alertas ya encoladas
+    se omiten, por lo que puede repetirse sin duplicar. Devuelve un resumen del
+    resultado para el estado del job.
+    """
+    # Las revisiones simultáneas (la diaria y la de recuperación tras un reinicio)
+    # se ejecutan en serie, para que la segunda vea lo que la primera ya encoló
+    async with context.bot_data.setdefault("lock_revision", asyncio.Lock()):
+        return await _revisar_notificaciones(context)
+
+
+async def _revisar_notificaciones(context: Application):
     logger.info("Ejecutando revisión diaria de notificaciones...")
 
-    days_in_advance_str = get_config_value("dias_anticipacion")
-    if not days_in_advance_str:
+    ventanas = await run_db(get_ventanas_notificacion)
+    if ventanas is None:
         logger.warning(
-            "No se pueden enviar notificaciones: 'dias_anticipacion' no está configurado."
+            "No se pueden enviar notificaciones: no hay ventanas ni 'dias_anticipacion' configurados."
         )
-        return
+        return RESULTADO_SIN_CONFIGURAR
+    ventanas, atrasadas = ventanas
 
     try:
-        days_in_advance = int(days_in_advance_str)
-        target_date_db = (datetime.now() + timedelta(days=days_in_advance)).strftime(
-            "%Y-%m-%d"
-        )
+        hoy = fechas.hoy()
+        hoy_iso = hoy.isoformat()
+        hasta = (hoy + timedelta(days=max(ventanas, default=-1))).isoformat()
+        desde = None if atrasadas else hoy_iso
 
-        conn = db_connect()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        # Query optimizada para buscar todas las notificaciones del día
-        query_parts = []
-        for hito in HITOS_SECUENCIA:
-            query_parts.append(f"WHEN '{hito}' THEN fecha_planificada_{hito}")
-        case_statement = "CASE hito_actual " + " ".join(query_parts) + " END"
-
-        query = f"""
-            SELECT id, solicitud_contratacion, hito_actual, responsable 
-            FROM solicitudes 
-            WHERE hito_actual IS NOT NULL AND ({case_statement}) = ?
-        """
-        cursor.execute(query, (target_date_db,))
-        solicitudes_a_notificar = cursor.fetchall()
-
-        users_to_notify = get_notifiable_users()
+        users_to_notify = await run_db(get_notifiable_users)
         if not users_to_notify:
             logger.warning("No hay usuarios configurados para recibir notificaciones.")
-            conn.close()
-            return
-
-        # Agrupar notificaciones por responsable
-        notificaciones_por_responsable = {}
-        for sol in solicitudes_a_notificar:
-            responsable = sol["responsable"] or "Sin Responsable"
-            if responsable not in notificaciones_por_responsable:
-                notificaciones_por_responsable[responsable] = []
-            notificaciones_por_responsable[responsable].append(sol)
-
-        conn.close()
-
-        # Enviar mensajes agrupados
-        for responsable, solicitudes in notificaciones_por_responsable.items():
-            target_date_display = datetime.strptime(
-                target_date_db, "%Y-%m-%d"
-            ).strftime("%d/%m/%Y")
-
-            message = "<b>PLAZOS CUMPLIDOS DENTRO DEL PLAN DE CONTRATACIONES Y PROYECTOS DE INVERSIÓN</b>\n"
-            message += f"<b>🗓️ Vencimiento: {target_date_display}</b> 🗓️\n\n"
-            message += "----------------------------------------\n"
-            message += f"<b>Gerencia Responsable:</b> {html.escape(responsable)}\n\n"
-
-            for solicitud in solicitudes:
-                hito_actual = solicitud["hito_actual"]
-                nombre_hito = HITO_NOMBRES_LARGOS.get(hito_actual, hito_actual)
-                tarea = get_tarea_a_cumplir(hito_actual)
-
-                message += f"<b>Fase:</b> {html.escape(nombre_hito)}\n"
-                message += f"<b>Tarea a Cumplir:</b> {html.escape(tarea)}\n\n"
-                message += f"<b>Solicitud ID {solicitud['id']}:</b> {html.escape(solicitud['solicitud_contratacion'])}\n\n"
-
-            for user_id in users_to_notify:
-                try:
-                    await context.bot.send_message(
-                        chat_id=user_id, text=message, parse_mode=ParseMode.HTML
-                    )
-                    logger.info(
-                        f"Notificación para responsable '{responsable}' enviada a {user_id}."
-                    )
-                except Exception as e:
-                    logger.error(f"No se pudo enviar notificación a {user_id}: {e}")
+            return "sin usuarios"
+
+        responsables = await run_db(get_responsables_para_notificar, hasta, desde)
+        semaforo = asyncio.Semaphore(NOTIF_GRUPOS_CONCURRENTES)
+        resultados = await asyncio.gather(
+            *(
+                _ejecutar_grupo(
+                    semaforo, responsable, hoy, hasta, desde, ventanas, atrasadas
+                )
+                for responsable in responsables
+            )
+        )
+        plan = [alerta for grupo, _ in resultados if grupo for alerta in grupo]
+        fallidos = [
+            r for r, (grupo, _) in zip(responsables, resultados) if grupo is None
+        ]
+
+        # Un resumen por usuario con las alertas de sus suscripciones, omitiendo
+        # las ya encoladas (la revisión puede repetirse tras un reinicio)
+        suscripciones = await run_db(get_suscripciones)
+        registradas = await run_db(get_alertas_registradas, hoy_iso)
+        mensajes = []
+        for user_id in users_to_notify:
+            nuevas = [
+                alerta
+                for alerta in filtrar_por_suscripcion(plan, suscripciones.get(user_id))
+                if (
+                    alerta[0]["id"],
+                    alerta[0]["hito_actual"],
+                    alerta[1],
+                    alerta[2],
+                    user_id,
+                )
+                not in registradas
+            ]
+            for texto, alertas in construir_resumen(hoy_iso, nuevas):
+                mensajes.append((str(uuid.uuid4()), user_id, texto, alertas))
+
+        encolados = 0
+        if mensajes:
+            # Una sola transacción; el worker de la cola se encarga del envío,
+            # repartido a lo largo de NOTIF_ESCALONADO segundos
+            encolados = await run_db(encolar_mensajes, mensajes, NOTIF_ESCALONADO)
+            context.bot_data["worker_cola"].despertar()
+        logger.info(
+            f"Notificaciones encoladas: {encolados} "
+            f"({len(plan)} alertas, {len(responsables)} grupos, {len(users_to_notify)} usuarios)."
+        )
 
         logger.info("Revisión de notificaciones completada.")
+        resultado = f"{encolados} mensajes encolados"
+        if fallidos:
+            resultado += (
+                "; "
+                + MARCA_GRUPOS_CON_ERROR
+                + ", ".join(r or "Sin Responsable" for r in fallidos)
+            )
+        elif resultados:
+            lento, (_, duracion) = max(
+                zip(responsables, resultados), key=lambda r: r[1][1]
+            )
+            resultado += (
+                f"; grupo más lento: {lento or 'Sin Responsable'} ({duracion:.2f} s)"
+            )
+        return resultado
     except Exception as e:
         logger.error(f"Error fatal en el proceso de notificación: {e}")
+        return f"{PREFIJO_ERROR}{e}"
+
+
+def _ahora():
+    return datetime.now(ZoneInfo(TIMEZONE)).replace(tzinfo=None, microsecond=0)
+
+
+async def revision_diaria(application: Application):
+    """Job de la revisión diaria: ejecuta la revisión y guarda su estado en SQLite."""
+    inicio = _ahora()
+    resultado = await check_and_send_notifications(application)
+    await run_db(
+        registrar_ejecucion_job,
+        ID_REVISION_DIARIA,
+        inicio.strftime(FORMATO_FECHA_HORA),
+        _ahora().strftime(FORMATO_FECHA_HORA),
+        resultado,
+    )
+
+
+def programar_revision_diaria(application: Application, hora):
+    """Programa (o reprograma) la revisión diaria a la hora indicada."""
+    application.bot_data["scheduler"].add_job(
+        revision_diaria,
+        "cron",
+        hour=hora.hour,
+        minute=hora.minute,
+        id=ID_REVISION_DIARIA,
+        args=[application],
+        replace_existing=True,
+    )
+
+
+def revision_fallida(resultado):
+    """Indica si el resultado guardado corresponde a una revisión incompleta."""
+    return (
+        resultado == RESULTADO_SIN_CONFIGURAR
+        or resultado.startswith(PREFIJO_ERROR)
+        or MARCA_GRUPOS_CON_ERROR in resultado
+    )
+
+
+def revision_omitida(hora, estado):
+    """
+    Indica si la última revisión programada (hoy o ayer a `hora`, en TIMEZONE) no
+    llegó a ejecutarse, por ejemplo porque el bot estaba detenido, o si falló.
+    `estado` es la fila de 'estado_jobs' de la revisión diaria, o None.
+    """
+    if estado is None:
+        return True
+    ahora = _ahora()
+    programada = datetime.combine(ahora.date(), hora)
+    if programada > ahora:
+        programada -= timedelta(days=1)
+    ultima = datetime.strptime(estado["ultima_ejecucion"], FORMATO_FECHA_HORA)
+    return ultima < programada or revision_fallida(estado["resultado"] or "")
 
 
 async def post_init(application: Application) -> None:
@@ -115,26 +243,54 @@ async def post_init(application: Application) -> None:
     Función para ejecutar después de que la aplicación se inicialice.
     Aquí es el lugar correcto para iniciar el scheduler.
     """
-    scheduler = AsyncIOScheduler(timezone=TIMEZONE)
+    # Configuración e índice de facetas en memoria
+    await run_db(cargar_configuracion)
+    await run_db(cargar_indice_facetas)
 
-    saved_time = get_config_value("hora_notificacion")
-    if saved_time:
-        try:
-            hour, minute = map(int, saved_time.split(":"))
-            scheduler.add_job(
-                check_and_send_notifications,
-                "cron",
-                hour=hour,
-                minute=minute,
-                id="daily_check",
-                args=[application],
-            )
-            logger.info(
-                f"Job de notificación programado para ejecutarse diariamente a las {saved_time}."
-            )
-        except ValueError:
-            logger.error(f"La hora guardada '{saved_time}' no es válida.")
+    # Worker de la cola persistente: retoma los mensajes pendientes de antes de un reinicio
+    worker = WorkerCola(application.bot)
+    application.bot_data["worker_cola"] = worker
+    worker.iniciar()
+
+    # Si el bucle de eventos se retrasa, la revisión aún se ejecuta dentro del margen
+    # y varias ejecuciones pendientes se agrupan en una sola
+    scheduler = AsyncIOScheduler(
+        timezone=TIMEZONE,
+        job_defaults={"misfire_grace_time": JOB_MISFIRE_GRACE, "coalesce": True},
+    )
+    application.bot_data["scheduler"] = scheduler
+
+    try:
+        hora = await run_db(get_hora_notificacion)
+    except ValueError:
+        hora = None
+        valor = await run_db(get_config_value, "hora_notificacion")
+        logger.error(f"La hora guardada '{valor}' no es válida.")
+    if hora:
+        programar_revision_diaria(application, hora)
+        logger.info(
+            f"Job de notificación programado para ejecutarse diariamente a las {hora:%H:%M}."
+        )
+
+        # Revisión de recuperación si la última programada no se ejecutó mientras el
+        # bot estaba detenido o terminó con error (las alertas ya encoladas no se repiten)
+        estado = await run_db(get_estado_job, ID_REVISION_DIARIA)
+        if revision_omitida(hora, estado):
+            scheduler.add_job(revision_diaria, id="recuperacion", args=[application])
+            logger.info("Revisión diaria omitida detectada; se ejecutará ahora.")
 
-    application.job_queue.scheduler = scheduler
     scheduler.start()
     logger.info("Scheduler iniciado correctamente.")
+
+
+async def post_shutdown(application: Application) -> None:
+    """Detiene el scheduler y el worker de la cola y libera la base de datos."""
+    scheduler = application.bot_data.get("scheduler")
+    if scheduler and scheduler.running:
+        scheduler.shutdown(wait=False)
+    worker = application.bot_data.get("worker_cola")
+    if worker:
+        await worker.detener()
+    shutdown_db_executor()
+    close_all_connections()
+    logger.info("Conexiones a la base de datos cerradas.")
@@ -4,6 +4,179 @@
 
 import sqlite3
 
+# Orden de los hitos del proceso de contratación (igual que HITOS_SECUENCIA en bot/config.py)
+HITOS = [
+    "presupuesto_base",
+    "fecha_solicitud",
+    "estrategia",
+    "inicio",
+    "decision",
+    "acta_otorgamiento",
+    "notif_otorgamiento",
+    "contrato",
+]
+
+# Columnas descriptivas de 'solicitudes' que expone la vista de compatibilidad
+COLUMNAS_DESCRIPTIVAS = [
+    "id",
+    "solicitud_contratacion",
+    "servicio",
+    "distrito",
+    "gerencia",
+    "responsable",
+    "presupuesto_base",
+    "fecha_solicitud",
+    "etapa_contratacion",
+    "hito_actual",
+    "eliminada",
+]
+
+
+def crear_tabla_hitos(cursor):
+    """Crea la tabla normalizada de hitos (una fila por solicitud y hito)."""
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS hitos (
+        solicitud_id INTEGER NOT NULL,
+        hito TEXT NOT NULL,
+        orden INTEGER NOT NULL,
+        fecha_planificada DATE,
+        fecha_real DATE,
+        posposiciones INTEGER DEFAULT 0,
+        historial_fechas TEXT,
+        PRIMARY KEY (solicitud_id, hito),
+        FOREIGN KEY (solicitud_id) REFERENCES solicitudes (id) ON DELETE CASCADE
+    )
+    """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_hitos_hito_fecha ON hitos (hito, fecha_planificada)"
+    )
+
+
+def crear_tabla_resumen_estado(cursor):
+    """
+    Crea la tabla 'resumen_estado' con los conteos por distrito/gerencia/servicio
+    que usan /balance y /reporte. El bot la llena y la mantiene actualizada.
+    """
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS resumen_estado (
+        distrito TEXT,
+        gerencia TEXT,
+        servicio TEXT,
+        total INTEGER NOT NULL,
+        atrasadas INTEGER NOT NULL,
+        proximas INTEGER NOT NULL,
+        al_dia INTEGER NOT NULL,
+        proxima_fecha DATE -- Fecha del próximo hito pendiente (hoy o posterior)
+    )
+    """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_resumen_estado_grupo ON resumen_estado (distrito, gerencia, servicio)"
+    )
+
+
+def crear_cola_mensajes(cursor):
+    """
+    Crea la cola persistente de mensajes salientes ('cola_mensajes') y el índice que
+    impide registrar dos veces la misma alerta en 'log_notificaciones'.
+    """
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS cola_mensajes (
+        id_mensaje TEXT PRIMARY KEY, -- UUID generado por el bot
+        telegram_id_usuario INTEGER NOT NULL,
+        texto TEXT NOT NULL,
+        estado TEXT NOT NULL DEFAULT 'pendiente', -- pendiente | enviado | fallido
+        intentos INTEGER NOT NULL DEFAULT 0,
+        proximo_intento DATETIME NOT NULL,
+        fecha_creacion DATETIME NOT NULL,
+        fecha_envio DATETIME
+    )
+    """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_cola_mensajes_pendientes ON cola_mensajes (estado, proximo_intento)"
+    )
+    cursor.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_log_notificaciones_alerta ON log_notificaciones (id_solicitud, hito, fecha_evento, nombre_evento, telegram_id_usuario)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_log_notificaciones_mensaje ON log_notificaciones (id_mensaje)"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_log_notificaciones_fecha ON log_notificaciones (fecha_evento)"
+    )
+
+
+def crear_tabla_suscripciones(cursor):
+    """
+    Crea la tabla 'suscripciones': cada fila limita las notificaciones de un usuario
+    a una gerencia o un distrito. Un usuario sin filas las recibe todas.
+    """
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS suscripciones (
+        telegram_id INTEGER NOT NULL,
+        campo TEXT NOT NULL CHECK (campo IN ('gerencia', 'distrito')),
+        valor TEXT NOT NULL,
+        PRIMARY KEY (telegram_id, campo, valor),
+        FOREIGN KEY (telegram_id) REFERENCES usuarios (telegram_id)
+    )
+    """
+    )
+
+
+def crear_tabla_estado_jobs(cursor):
+    """
+    Crea la tabla 'estado_jobs', que guarda la última ejecución de cada job del
+    scheduler para detectar al arrancar las revisiones que no se ejecutaron.
+    """
+    cursor.execute(
+        """
+    CREATE TABLE IF NOT EXISTS estado_jobs (
+        id_job TEXT PRIMARY KEY,
+        ultima_ejecucion DATETIME NOT NULL, -- Hora local (TIMEZONE) de inicio
+        fin_ejecucion DATETIME,
+        resultado TEXT
+    )
+    """
+    )
+
+
+def crear_vista_solicitudes(cursor):
+    """
+    Crea la vista 'vista_solicitudes', que reconstruye desde la tabla 'hitos' las
+    columnas anchas (fecha_planificada_*, fecha_real_*, ...) para el modo normalizado.
+    """
+    columnas = [f"s.{col}" for col in COLUMNAS_DESCRIPTIVAS]
+    joins = []
+    for i, hito in enumerate(HITOS):
+        alias = f"h{i}"
+        columnas += [
+            f"{alias}.fecha_planificada AS fecha_planificada_{hito}",
+            f"{alias}.fecha_real AS fecha_real_{hito}",
+            f"{alias}.posposiciones AS posposiciones_{hito}",
+            f"{alias}.historial_fechas AS historial_fechas_{hito}",
+        ]
+        joins.append(
+            f"LEFT JOIN hitos {alias} ON {alias}.solicitud_id = s.id AND {alias}.hito = '{hito}'"
+        )
+    columnas.append("ha.fecha_planificada AS fecha_planificada_actual")
+    joins.append(
+        "LEFT JOIN hitos ha ON ha.solicitud_id = s.id AND ha.hito = s.hito_actual"
+    )
+
+    cursor.execute("DROP VIEW IF EXISTS vista_solicitudes")
+    cursor.execute(
+        "CREATE VIEW vista_solicitudes AS SELECT "
+        + ", ".join(columnas)
+        + " FROM solicitudes s "
+        + " ".join(joins)
+    )
+
 
 def setup_database():
     """Crea y configura la base de datos y sus tablas."""
@@ -67,11 +240,47 @@ def setup_database():
             fecha_planificada_contrato DATE,
             fecha_real_contrato DATE,
             posposiciones_contrato INTEGER DEFAULT 0,
-            historial_fechas_contrato TEXT
+            historial_fechas_contrato TEXT,
+
+            -- Sincronización incremental con el Excel
+            hash_fila TEXT, -- Hash de los datos descriptivos de la fila del Excel
+            eliminada INTEGER NOT NULL DEFAULT 0, -- 1 si ya no aparece en el Excel
+
+            -- Fecha planificada del hito actual (columna generada e indexada)
+            fecha_planificada_actual DATE GENERATED ALWAYS AS (
+                CASE hito_actual
+                    WHEN 'presupuesto_base' THEN fecha_planificada_presupuesto_base
+                    WHEN 'fecha_solicitud' THEN fecha_planificada_fecha_solicitud
+                    WHEN 'estrategia' THEN fecha_planificada_estrategia
+                    WHEN 'inicio' THEN fecha_planificada_inicio
+                    WHEN 'decision' THEN fecha_planificada_decision
+                    WHEN 'acta_otorgamiento' THEN fecha_planificada_acta_otorgamiento
+                    WHEN 'notif_otorgamiento' THEN fecha_planificada_notif_otorgamiento
+                    WHEN 'contrato' THEN fecha_planificada_contrato
+                END
+            ) VIRTUAL
         )
         """
         )
 
+        # --- Índices sobre la fecha del hito actual ---
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_solicitudes_fecha_actual ON solicitudes (fecha_planificada_actual)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_solicitudes_filtros_fecha ON solicitudes (distrito, gerencia, servicio, fecha_planificada_actual)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_solicitudes_responsable_fecha ON solicitudes (responsable, fecha_planificada_actual)"
+        )
+
+        # --- Almacenamiento normalizado de hitos (opcional, ver HITOS_NORMALIZADOS) ---
+        crear_tabla_hitos(cursor)
+        crear_vista_solicitudes(cursor)
+
+        # --- Resumen materializado para /balance y /reporte ---
+        crear_tabla_resumen_estado(cursor)
+
         # --- Tablas sin cambios ---
         cursor.execute(
             """
@@ -99,11 +308,25 @@ def setup_database():
             nombre_evento TEXT NOT NULL,
             fecha_notificacion DATETIME NOT NULL,
             telegram_id_usuario INTEGER NOT NULL,
+            hito TEXT, -- Hito notificado
+            fecha_evento DATE, -- Fecha planificada que originó la alerta
+            id_mensaje TEXT, -- Mensaje de 'cola_mensajes' que la entrega
+            estado TEXT NOT NULL DEFAULT 'pendiente', -- pendiente | enviado | fallido
+            intentos INTEGER NOT NULL DEFAULT 0,
             FOREIGN KEY (id_solicitud) REFERENCES solicitudes (id)
         )
         """
         )
 
+        # --- Cola persistente de mensajes salientes ---
+        crear_cola_mensajes(cursor)
+
+        # --- Suscripciones de los usuarios a gerencias o distritos ---
+        crear_tabla_suscripciones(cursor)
+
+        # --- Estado de los jobs programados ---
+        crear_tabla_estado_jobs(cursor)
+
         conn.commit()
         conn.close()
         print(
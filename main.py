@@ -2,19 +2,32 @@
 # Punto de entrada principal para iniciar el bot.
 
 import logging
-from telegram.ext import Application, CommandHandler, MessageHandler, filters
+from telegram import Update
+from telegram.ext import (
+    Application,
+    CallbackQueryHandler,
+    CommandHandler,
+    MessageHandler,
+    TypeHandler,
+    filters,
+)
 
 from bot.config import TELEGRAM_TOKEN, logger
 from bot.handlers import (
     start_command,
     help_command,
-    handle_unauthorized,
+    texto_no_reconocido,
+    auth_gate,
     cargar_excel_local,
     sincerar_datos_command,
     configurar_dias_command,
     configurar_hora_command,
+    configurar_ventanas_command,
+    estado_notificaciones_command,
     autorizar_command,
     listar_usuarios_command,
+    suscribir_command,
+    desuscribir_command,
     ver_solicitud_command,
     replanificar_command,
     completar_command,
@@ -30,7 +43,8 @@ from bot.handlers import (
     # --- NUEVO COMANDO ---
     reporte_principal_command,
 )
-from bot.scheduler import post_init
+from bot.browser import PREFIJO, navegador_callback
+from bot.scheduler import post_init, post_shutdown
 
 
 def main() -> None:
@@ -42,9 +56,16 @@ def main() -> None:
         return
 
     application = (
-        Application.builder().token(TELEGRAM_TOKEN).post_init(post_init).build()
+        Application.builder()
+        .token(TELEGRAM_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
     )
 
+    # Filtro de autorización: se ejecuta antes que cualquier otro handler
+    application.add_handler(TypeHandler(Update, auth_gate), group=-1)
+
     # Registrar handlers de comandos
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("help", help_command))
@@ -52,8 +73,16 @@ def main() -> None:
     application.add_handler(CommandHandler("sincerar_datos", sincerar_datos_command))
     application.add_handler(CommandHandler("configurar_dias", configurar_dias_command))
     application.add_handler(CommandHandler("configurar_hora", configurar_hora_command))
+    application.add_handler(
+        CommandHandler("configurar_ventanas", configurar_ventanas_command)
+    )
+    application.add_handler(
+        CommandHandler("estado_notificaciones", estado_notificaciones_command)
+    )
     application.add_handler(CommandHandler("autorizar", autorizar_command))
     application.add_handler(CommandHandler("listar_usuarios", listar_usuarios_command))
+    application.add_handler(CommandHandler("suscribir", suscribir_command))
+    application.add_handler(CommandHandler("desuscribir", desuscribir_command))
     application.add_handler(CommandHandler("ver_solicitud", ver_solicitud_command))
     application.add_handler(CommandHandler("replanificar", replanificar_command))
     application.add_handler(CommandHandler("completar", completar_command))
@@ -70,6 +99,12 @@ def main() -> None:
         CommandHandler("reporte_principal", reporte_principal_command)
     )
 
+    # Botones ◀️/▶️ de los resultados navegables; antes que las conversaciones,
+    # cuyos estados aceptan cualquier callback
+    application.add_handler(
+        CallbackQueryHandler(navegador_callback, pattern=f"^{PREFIJO}")
+    )
+
     # Handlers de Conversación
     application.add_handler(balance_filtro_handler)
     application.add_handler(listar_solicitudes_handler)
@@ -78,7 +113,7 @@ def main() -> None:
     application.add_handler(unidad_usuaria_handler)
 
     application.add_handler(
-        MessageHandler(filters.TEXT & ~filters.COMMAND, handle_unauthorized)
+        MessageHandler(filters.TEXT & ~filters.COMMAND, texto_no_reconocido)
     )
 
     logger.info("Iniciando el bot...")
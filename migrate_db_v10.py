@@ -0,0 +1,32 @@
+# migrate_db_v10.py
+# Script de un solo uso para crear la tabla 'estado_jobs', donde el scheduler
+# guarda la última ejecución de la revisión diaria de notificaciones.
+
+import sqlite3
+
+from database_stup import crear_tabla_estado_jobs
+
+DB_FILE = "bot_database.db"
+
+
+def run_migration():
+    """Crea la tabla de estado de los jobs si no existe."""
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+
+        crear_tabla_estado_jobs(cursor)
+        conn.commit()
+        print(
+            "¡Éxito! La tabla 'estado_jobs' está disponible. Al arrancar, el bot "
+            "ejecutará la revisión diaria si detecta que no se realizó."
+        )
+
+        conn.close()
+
+    except sqlite3.Error as e:
+        print(f"Ocurrió un error en la base de datos: {e}")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,102 @@
+# migrate_db_v3.py
+# Script de un solo uso para añadir la columna generada 'fecha_planificada_actual'
+# (fecha planificada del hito actual) y sus índices a la base de datos existente.
+
+import sqlite3
+
+DB_FILE = "bot_database.db"
+
+FECHA_PLANIFICADA_ACTUAL_EXPR = """
+    CASE hito_actual
+        WHEN 'presupuesto_base' THEN fecha_planificada_presupuesto_base
+        WHEN 'fecha_solicitud' THEN fecha_planificada_fecha_solicitud
+        WHEN 'estrategia' THEN fecha_planificada_estrategia
+        WHEN 'inicio' THEN fecha_planificada_inicio
+        WHEN 'decision' THEN fecha_planificada_decision
+        WHEN 'acta_otorgamiento' THEN fecha_planificada_acta_otorgamiento
+        WHEN 'notif_otorgamiento' THEN fecha_planificada_notif_otorgamiento
+        WHEN 'contrato' THEN fecha_planificada_contrato
+    END
+"""
+
+INDICES = {
+    "idx_solicitudes_fecha_actual": "(fecha_planificada_actual)",
+    "idx_solicitudes_filtros_fecha": "(distrito, gerencia, servicio, fecha_planificada_actual)",
+    "idx_solicitudes_responsable_fecha": "(responsable, fecha_planificada_actual)",
+}
+
+# Consultas representativas y el índice que cada una debe usar.
+CONSULTAS_A_VERIFICAR = [
+    (
+        "SELECT id FROM solicitudes WHERE fecha_planificada_actual < '2000-01-01'",
+        "idx_solicitudes_fecha_actual",
+    ),
+    (
+        "SELECT id FROM solicitudes WHERE fecha_planificada_actual = '2000-01-01'",
+        "idx_solicitudes_fecha_actual",
+    ),
+    (
+        "SELECT id FROM solicitudes WHERE distrito = 'X' AND gerencia = 'Y' AND servicio = 'Z' AND fecha_planificada_actual < '2000-01-01'",
+        "idx_solicitudes_filtros_fecha",
+    ),
+    (
+        "SELECT id FROM solicitudes WHERE responsable = 'X' AND fecha_planificada_actual <= '2000-01-01'",
+        "idx_solicitudes_responsable_fecha",
+    ),
+]
+
+
+def verificar_planes(cursor):
+    """Comprueba con EXPLAIN QUERY PLAN que las consultas usan los nuevos índices."""
+    cursor.execute("ANALYZE")
+    correctas = True
+    for consulta, indice in CONSULTAS_A_VERIFICAR:
+        cursor.execute(f"EXPLAIN QUERY PLAN {consulta}")
+        plan = " | ".join(row[3] for row in cursor.fetchall())
+        if indice in plan:
+            print(f"OK   {indice}: {plan}")
+        else:
+            correctas = False
+            print(f"FAIL {indice} no se usa: {plan}")
+    return correctas
+
+
+def run_migration():
+    """Añade la columna generada y los índices si no existen."""
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+
+        # table_xinfo también lista las columnas generadas
+        cursor.execute("PRAGMA table_xinfo(solicitudes)")
+        columns = [column[1] for column in cursor.fetchall()]
+
+        if "fecha_planificada_actual" not in columns:
+            print("Añadiendo columna generada 'fecha_planificada_actual'...")
+            # SQLite solo permite añadir columnas generadas VIRTUAL con ALTER TABLE;
+            # el índice materializa su valor, por lo que las búsquedas no recalculan el CASE.
+            cursor.execute(
+                "ALTER TABLE solicitudes ADD COLUMN fecha_planificada_actual DATE "
+                f"GENERATED ALWAYS AS ({FECHA_PLANIFICADA_ACTUAL_EXPR}) VIRTUAL"
+            )
+        else:
+            print("La columna 'fecha_planificada_actual' ya existe.")
+
+        for nombre, columnas in INDICES.items():
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {nombre} ON solicitudes {columnas}"
+            )
+        conn.commit()
+        print(f"¡Éxito! Índices verificados: {', '.join(INDICES)}.")
+
+        if not verificar_planes(cursor):
+            print("Advertencia: alguna consulta no utiliza el índice esperado.")
+
+        conn.close()
+
+    except sqlite3.Error as e:
+        print(f"Ocurrió un error en la base de datos: {e}")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,111 @@
+# migrate_db_v4.py
+# Script de un solo uso para pasar al almacenamiento normalizado de hitos: crea la
+# tabla 'hitos', la llena a partir de las columnas anchas de 'solicitudes' y crea la
+# vista de compatibilidad 'vista_solicitudes'.
+# Después de ejecutarlo, activa el modo con HITOS_NORMALIZADOS=1 en el archivo .env.
+
+import sqlite3
+
+from database_stup import HITOS, crear_tabla_hitos
+
+DB_FILE = "bot_database.db"
+
+# Columnas descriptivas de la vista en esta versión del esquema. Se fijan aquí y no
+# se importan de database_stup, cuya lista crece con columnas de migraciones
+# posteriores (p. ej. 'eliminada', de v5, que vuelve a crear la vista).
+COLUMNAS_VISTA_V4 = [
+    "id",
+    "solicitud_contratacion",
+    "servicio",
+    "distrito",
+    "gerencia",
+    "responsable",
+    "presupuesto_base",
+    "fecha_solicitud",
+    "etapa_contratacion",
+    "hito_actual",
+]
+
+
+def crear_vista_solicitudes_v4(cursor):
+    """Crea 'vista_solicitudes' tal como era en la versión 4 del esquema."""
+    columnas = [f"s.{col}" for col in COLUMNAS_VISTA_V4]
+    joins = []
+    for i, hito in enumerate(HITOS):
+        alias = f"h{i}"
+        columnas += [
+            f"{alias}.fecha_planificada AS fecha_planificada_{hito}",
+            f"{alias}.fecha_real AS fecha_real_{hito}",
+            f"{alias}.posposiciones AS posposiciones_{hito}",
+            f"{alias}.historial_fechas AS historial_fechas_{hito}",
+        ]
+        joins.append(
+            f"LEFT JOIN hitos {alias} ON {alias}.solicitud_id = s.id AND {alias}.hito = '{hito}'"
+        )
+    columnas.append("ha.fecha_planificada AS fecha_planificada_actual")
+    joins.append(
+        "LEFT JOIN hitos ha ON ha.solicitud_id = s.id AND ha.hito = s.hito_actual"
+    )
+
+    cursor.execute("DROP VIEW IF EXISTS vista_solicitudes")
+    cursor.execute(
+        "CREATE VIEW vista_solicitudes AS SELECT "
+        + ", ".join(columnas)
+        + " FROM solicitudes s "
+        + " ".join(joins)
+    )
+
+
+def run_migration():
+    """Copia los datos de cada hito a la tabla normalizada 'hitos'."""
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+
+        crear_tabla_hitos(cursor)
+
+        # Con HITOS_NORMALIZADOS=1 los cambios se escriben en 'hitos': volver a copiar
+        # las columnas anchas desharía completados y replanificaciones
+        cursor.execute("SELECT COUNT(*) FROM hitos")
+        existentes = cursor.fetchone()[0]
+        if existentes:
+            print(
+                f"La tabla 'hitos' ya contiene {existentes} filas. La migración ya se "
+                "aplicó; no se necesita ninguna acción."
+            )
+            conn.close()
+            return
+
+        for orden, hito in enumerate(HITOS):
+            cursor.execute(
+                f"""
+                INSERT OR IGNORE INTO hitos (
+                    solicitud_id, hito, orden, fecha_planificada, fecha_real,
+                    posposiciones, historial_fechas
+                )
+                SELECT id, ?, ?, fecha_planificada_{hito}, fecha_real_{hito},
+                       COALESCE(posposiciones_{hito}, 0), historial_fechas_{hito}
+                FROM solicitudes
+                """,
+                (hito, orden),
+            )
+            print(f"Hito '{hito}': {cursor.rowcount} filas copiadas.")
+
+        crear_vista_solicitudes_v4(cursor)
+        conn.commit()
+
+        cursor.execute("SELECT COUNT(*) FROM hitos")
+        total = cursor.fetchone()[0]
+        print(
+            f"¡Éxito! La tabla 'hitos' contiene {total} filas y la vista "
+            "'vista_solicitudes' está disponible. Activa HITOS_NORMALIZADOS=1 en el .env."
+        )
+
+        conn.close()
+
+    except sqlite3.Error as e:
+        print(f"Ocurrió un error en la base de datos: {e}")
+
+
+if __name__ == "__main__":
+    run_migration()
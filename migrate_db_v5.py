@@ -0,0 +1,61 @@
+# migrate_db_v5.py
+# Script de un solo uso para añadir las columnas de la sincronización incremental con
+# el Excel ('hash_fila' y 'eliminada') y actualizar la vista 'vista_solicitudes'.
+
+import sqlite3
+
+from database_stup import crear_vista_solicitudes
+
+DB_FILE = "bot_database.db"
+
+
+def run_migration():
+    """Añade las nuevas columnas a la tabla de solicitudes si no existen."""
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+
+        cursor.execute("PRAGMA table_info(solicitudes)")
+        columns = [column[1] for column in cursor.fetchall()]
+
+        new_columns = {
+            "hash_fila": "TEXT",
+            "eliminada": "INTEGER NOT NULL DEFAULT 0",
+        }
+
+        added_count = 0
+        for col_name, col_type in new_columns.items():
+            if col_name not in columns:
+                print(f"Añadiendo columna '{col_name}'...")
+                cursor.execute(
+                    f"ALTER TABLE solicitudes ADD COLUMN {col_name} {col_type}"
+                )
+                added_count += 1
+
+        # La vista del modo normalizado debe exponer la nueva columna 'eliminada'
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'hitos'"
+        )
+        if cursor.fetchone():
+            crear_vista_solicitudes(cursor)
+            print("Vista 'vista_solicitudes' actualizada.")
+
+        conn.commit()
+        if added_count > 0:
+            print(
+                f"¡Éxito! Se han añadido {added_count} nuevas columnas a la tabla 'solicitudes'. "
+                "La próxima ejecución de /cargar_excel calculará los hashes de todas las filas."
+            )
+        else:
+            print(
+                "No se necesitaron añadir nuevas columnas. La base de datos ya está actualizada."
+            )
+
+        conn.close()
+
+    except sqlite3.Error as e:
+        print(f"Ocurrió un error en la base de datos: {e}")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,33 @@
+# migrate_db_v6.py
+# Script de un solo uso para crear la tabla 'resumen_estado' (resumen materializado
+# de /balance y /reporte). El bot la llena automáticamente en la primera consulta.
+
+import sqlite3
+
+from database_stup import crear_tabla_resumen_estado
+
+DB_FILE = "bot_database.db"
+
+
+def run_migration():
+    """Crea la tabla del resumen de estado si no existe."""
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+
+        crear_tabla_resumen_estado(cursor)
+        # Invalida cualquier resumen anterior para forzar su recálculo
+        cursor.execute(
+            "DELETE FROM configuracion WHERE clave IN ('resumen_estado_fecha', 'resumen_estado_dias')"
+        )
+        conn.commit()
+        print("¡Éxito! La tabla 'resumen_estado' está disponible.")
+
+        conn.close()
+
+    except sqlite3.Error as e:
+        print(f"Ocurrió un error en la base de datos: {e}")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,52 @@
+# migrate_db_v7.py
+# Script de un solo uso para crear la cola persistente de mensajes ('cola_mensajes')
+# y añadir a 'log_notificaciones' las columnas de estado de entrega.
+
+import sqlite3
+
+from database_stup import crear_cola_mensajes
+
+DB_FILE = "bot_database.db"
+
+
+def run_migration():
+    """Añade las nuevas columnas a 'log_notificaciones' y crea la cola de mensajes."""
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+
+        cursor.execute("PRAGMA table_info(log_notificaciones)")
+        columns = [column[1] for column in cursor.fetchall()]
+
+        new_columns = {
+            "hito": "TEXT",
+            "fecha_evento": "DATE",
+            "id_mensaje": "TEXT",
+            "estado": "TEXT NOT NULL DEFAULT 'pendiente'",
+            "intentos": "INTEGER NOT NULL DEFAULT 0",
+        }
+
+        added_count = 0
+        for col_name, col_type in new_columns.items():
+            if col_name not in columns:
+                print(f"Añadiendo columna '{col_name}'...")
+                cursor.execute(
+                    f"ALTER TABLE log_notificaciones ADD COLUMN {col_name} {col_type}"
+                )
+                added_count += 1
+
+        crear_cola_mensajes(cursor)
+        conn.commit()
+        print(
+            f"¡Éxito! Se han añadido {added_count} columnas a 'log_notificaciones' "
+            "y la tabla 'cola_mensajes' está disponible."
+        )
+
+        conn.close()
+
+    except sqlite3.Error as e:
+        print(f"Ocurrió un error en la base de datos: {e}")
+
+
+if __name__ == "__main__":
+    run_migration()
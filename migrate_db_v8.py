@@ -0,0 +1,32 @@
+# migrate_db_v8.py
+# Script de un solo uso para crear la tabla 'suscripciones', que permite a cada
+# usuario recibir solo las notificaciones de ciertas gerencias o distritos.
+
+import sqlite3
+
+from database_stup import crear_tabla_suscripciones
+
+DB_FILE = "bot_database.db"
+
+
+def run_migration():
+    """Crea la tabla de suscripciones si no existe."""
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+
+        crear_tabla_suscripciones(cursor)
+        conn.commit()
+        print(
+            "¡Éxito! La tabla 'suscripciones' está disponible. Los usuarios sin "
+            "suscripciones seguirán recibiendo todas las notificaciones."
+        )
+
+        conn.close()
+
+    except sqlite3.Error as e:
+        print(f"Ocurrió un error en la base de datos: {e}")
+
+
+if __name__ == "__main__":
+    run_migration()
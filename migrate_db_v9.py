@@ -0,0 +1,32 @@
+# migrate_db_v9.py
+# Script de un solo uso para crear el índice por fecha de evento de
+# 'log_notificaciones', que usan las alertas por ventanas para omitir las ya enviadas.
+
+import sqlite3
+
+from database_stup import crear_cola_mensajes
+
+DB_FILE = "bot_database.db"
+
+
+def run_migration():
+    """Crea los índices de la cola de mensajes y del registro que falten."""
+    try:
+        conn = sqlite3.connect(DB_FILE)
+        cursor = conn.cursor()
+
+        crear_cola_mensajes(cursor)
+        conn.commit()
+        print(
+            "¡Éxito! Índice 'idx_log_notificaciones_fecha' creado. Configura las "
+            "ventanas de alerta con /configurar_ventanas (p. ej. 7 3 1 0 atrasadas)."
+        )
+
+        conn.close()
+
+    except sqlite3.Error as e:
+        print(f"Ocurrió un error en la base de datos: {e}")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,47 @@
+# tests/conftest.py
+# Fixtures comunes: una base de datos en memoria con el esquema de database_stup.py
+# conectada a bot/database.py en lugar de bot_database.db.
+
+import os
+import sqlite3
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+import database_stup  # noqa: E402
+from bot import database  # noqa: E402
+
+
+def _reiniciar_estado():
+    """Descarta las copias en memoria de bot/database.py entre pruebas."""
+    database._config = None
+    database._facetas = {}
+    database._facetas_fecha = None
+    database._usuarios_cache.clear()
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """
+    Conexión en memoria con el esquema de setup_database(). Se usa como la
+    conexión del hilo actual de bot/database.py, por lo que las funciones del
+    módulo llamadas desde la prueba leen y escriben en ella.
+    """
+    monkeypatch.chdir(tmp_path)
+    database_stup.setup_database()
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    archivo = sqlite3.connect(tmp_path / "bot_database.db")
+    archivo.backup(conn)
+    archivo.close()
+    conn.row_factory = sqlite3.Row
+
+    _reiniciar_estado()
+    database._local.conn = conn
+    yield conn
+    database._local.__dict__.pop("conn", None)
+    conn.close()
+    _reiniciar_estado()
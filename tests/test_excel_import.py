@@ -0,0 +1,141 @@
+# tests/test_excel_import.py
+# Equivalencia de la carga vectorizada y la carga en streaming del Excel con la
+# carga original fila a fila (df.iterrows() + safe_date_convert).
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from bot import database, excel_import
+from bot.config import HITOS_SECUENCIA, HITO_NOMBRES_LARGOS
+
+COLUMNAS_COMPARADAS = (
+    ["id"]
+    + database.COLUMNAS_DESCRIPTIVAS_EXCEL
+    + ["hito_actual"]
+    + [f"fecha_planificada_{hito}" for hito in HITOS_SECUENCIA]
+    + [f"fecha_real_{hito}" for hito in HITOS_SECUENCIA]
+)
+
+# Valores de las celdas de fecha: fechas del Excel, texto DD/MM/YYYY, "-" (el hito
+# no aplica), vacías y texto que no es una fecha
+VALORES_FECHA = [
+    datetime(2026, 3, 5),
+    "15/04/2026",
+    "-",
+    None,
+    datetime(2025, 12, 31),
+    "no aplica",
+    "02/01/2027",
+    " - ",
+]
+
+
+def _safe_date_convert(date_value):
+    if pd.isna(date_value) or date_value == "" or str(date_value).strip() == "-":
+        return None
+    try:
+        return pd.to_datetime(date_value, dayfirst=True).strftime("%Y-%m-%d")
+    except (ValueError, TypeError):
+        return None
+
+
+def _registros_fila_a_fila(df):
+    """Registros como los construía la carga original, una fila a la vez."""
+    registros = {}
+    for _, row in df.rename(columns=excel_import.COLUMN_MAPPING).iterrows():
+        solicitud_id = row.get("id")
+        if pd.isna(solicitud_id):
+            continue
+        data = {"id": int(solicitud_id)}
+        for col in database.COLUMNAS_DESCRIPTIVAS_EXCEL:
+            data[col] = row.get(col)
+        hito_actual = None
+        for hito_key in HITOS_SECUENCIA:
+            excel_val = row.get(HITO_NOMBRES_LARGOS[hito_key])
+            if str(excel_val).strip() == "-":
+                data[f"fecha_real_{hito_key}"] = "-"
+                data[f"fecha_planificada_{hito_key}"] = None
+            else:
+                fecha_plan = _safe_date_convert(excel_val)
+                data[f"fecha_planificada_{hito_key}"] = fecha_plan
+                data[f"fecha_real_{hito_key}"] = None
+                if fecha_plan and not hito_actual:
+                    hito_actual = hito_key
+        data["hito_actual"] = hito_actual
+        registros[data["id"]] = data
+    return registros
+
+
+def _como_dict(registros):
+    return {
+        registro[0]: dict(zip(database.COLUMNAS_SOLICITUD_EXCEL, registro))
+        for registro in registros
+    }
+
+
+def _comparar(esperados, obtenidos):
+    assert set(obtenidos) == set(esperados)
+    for solicitud_id, esperado in esperados.items():
+        obtenido = obtenidos[solicitud_id]
+        for col in COLUMNAS_COMPARADAS:
+            assert obtenido[col] == esperado[col], (solicitud_id, col)
+
+
+@pytest.fixture
+def cronograma(tmp_path):
+    """Excel sintético con todas las combinaciones de VALORES_FECHA por hito."""
+    filas = []
+    for n in range(1, 121):
+        fila = {
+            "N": n,
+            "SOLICITUD DE CONTRATACIÓN": f"Solicitud <{n}> & cía",
+            "SERVICIO": f"Servicio {n % 3}",
+            "DISTRITO": f"Distrito {n % 2}",
+            "GERENCIA": f"Gerencia {n % 5}",
+            "RESPONSABLE": f"Gerencia {n % 4}",
+            "ETAPA DE CONTRATACIÓN": "Etapa",
+        }
+        for posicion, hito_key in enumerate(HITOS_SECUENCIA):
+            valor = VALORES_FECHA[(n + posicion * (n // 8)) % len(VALORES_FECHA)]
+            fila[HITO_NOMBRES_LARGOS[hito_key]] = valor
+        filas.append(fila)
+    # Filas sin N (totales, notas al pie) que la carga debe ignorar
+    filas.append({"SOLICITUD DE CONTRATACIÓN": "Total"})
+    ruta = tmp_path / "cronograma.xlsx"
+    pd.DataFrame(filas).to_excel(ruta, index=False)
+    return ruta
+
+
+def test_vectorizada_equivale_a_fila_a_fila(cronograma):
+    df = pd.read_excel(cronograma)
+    esperados = _registros_fila_a_fila(df)
+    _comparar(esperados, _como_dict(excel_import.preparar_registros(df)))
+
+
+def test_streaming_equivale_a_fila_a_fila(cronograma):
+    esperados = _registros_fila_a_fila(pd.read_excel(cronograma))
+    registros = []
+    for lote in excel_import.leer_excel_streaming(cronograma, tamano_lote=7):
+        assert len(lote) <= 7
+        registros.extend(excel_import.preparar_registros(lote))
+    _comparar(esperados, _como_dict(registros))
+
+
+def test_sincerar_guarda_lo_mismo_que_fila_a_fila(db, cronograma):
+    esperados = _registros_fila_a_fila(pd.read_excel(cronograma))
+    assert excel_import.sincerar_excel(str(cronograma)) == len(esperados)
+    obtenidos = {
+        solicitud_id: database.get_solicitud_by_id(solicitud_id)
+        for solicitud_id in esperados
+    }
+    _comparar(esperados, obtenidos)
+
+
+def test_sincronizar_es_idempotente(db, cronograma):
+    insertadas, actualizadas, sin_cambios, eliminadas = excel_import.sincronizar_excel(
+        str(cronograma)
+    )
+    assert (insertadas, actualizadas, sin_cambios, eliminadas) == (120, 0, 0, 0)
+    assert excel_import.sincronizar_excel(str(cronograma)) == (0, 0, 120, 0)
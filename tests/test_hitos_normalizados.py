@@ -0,0 +1,69 @@
+# tests/test_hitos_normalizados.py
+# En el modo normalizado, completar y replanificar escriben en la tabla 'hitos' y
+# también en las columnas anchas de 'solicitudes', que deben quedar iguales.
+
+from datetime import date, timedelta
+
+from bot import database
+from bot.config import HITOS_SECUENCIA
+from bot.hitos import HITOS
+
+SOLICITUD = 1
+INICIO = date(2026, 3, 2)
+
+
+def _fecha(orden):
+    return (INICIO + timedelta(days=10 * orden)).isoformat()
+
+
+def _poblar(db):
+    columnas = [HITOS[hito].col_planificada for hito in HITOS_SECUENCIA]
+    db.execute(
+        f"INSERT INTO solicitudes (id, solicitud_contratacion, hito_actual, "
+        f"{', '.join(columnas)}) VALUES (?, ?, ?, {', '.join('?' for _ in columnas)})",
+        [SOLICITUD, "Solicitud 1", HITOS_SECUENCIA[0]]
+        + [_fecha(orden) for orden in range(len(HITOS_SECUENCIA))],
+    )
+    db.executemany(
+        "INSERT INTO hitos (solicitud_id, hito, orden, fecha_planificada) "
+        "VALUES (?, ?, ?, ?)",
+        [
+            (SOLICITUD, hito, orden, _fecha(orden))
+            for orden, hito in enumerate(HITOS_SECUENCIA)
+        ],
+    )
+    db.commit()
+
+
+def _comprobar_columnas_anchas(db):
+    solicitud = db.execute(
+        "SELECT * FROM solicitudes WHERE id = ?", (SOLICITUD,)
+    ).fetchone()
+    for fila in db.execute(
+        "SELECT * FROM hitos WHERE solicitud_id = ?", (SOLICITUD,)
+    ).fetchall():
+        hito = HITOS[fila["hito"]]
+        assert solicitud[hito.col_planificada] == fila["fecha_planificada"]
+        assert solicitud[hito.col_real] == fila["fecha_real"]
+        assert solicitud[hito.col_posposiciones] == fila["posposiciones"]
+        assert solicitud[hito.col_historial] == fila["historial_fechas"]
+        if fila["hito"] == solicitud["hito_actual"]:
+            assert solicitud["fecha_planificada_actual"] == fila["fecha_planificada"]
+
+
+def test_replanificar_y_completar_actualizan_las_columnas_anchas(db, monkeypatch):
+    monkeypatch.setattr(database, "HITOS_NORMALIZADOS", True)
+    _poblar(db)
+
+    # La nueva fecha alcanza a los dos hitos siguientes, que se ajustan en cascada
+    hito, ajustados = database.replanificar_hito_actual(SOLICITUD, _fecha(2))
+    assert hito == HITOS_SECUENCIA[0]
+    assert [clave for clave, _ in ajustados] == HITOS_SECUENCIA[1:3]
+    _comprobar_columnas_anchas(db)
+
+    hito, siguiente = database.completar_hito_actual(SOLICITUD)
+    assert (hito, siguiente) == (HITOS_SECUENCIA[0], HITOS_SECUENCIA[1])
+    _comprobar_columnas_anchas(db)
+
+    database.replanificar_hito_actual(SOLICITUD, _fecha(5))
+    _comprobar_columnas_anchas(db)
@@ -0,0 +1,104 @@
+# tests/test_paginator.py
+# Paginación de salidas largas: ningún mensaje supera LIMITE_MENSAJE, las
+# etiquetas HTML quedan balanceadas en cada página y no se pierde texto.
+
+import html
+import re
+
+import pytest
+
+from bot.browser import _RESERVA_PIE, _pagina
+from bot.paginator import LIMITE_MENSAJE, longitud, paginar
+
+_ETIQUETA = re.compile(r"<(/?)(\w+)[^>]*>")
+
+
+def _etiquetas_balanceadas(texto):
+    abiertas = []
+    for cierre, nombre in _ETIQUETA.findall(texto):
+        if not cierre:
+            abiertas.append(nombre)
+        elif not abiertas or abiertas.pop() != nombre:
+            return False
+    return not abiertas
+
+
+def _sin_etiquetas(texto):
+    return _ETIQUETA.sub("", texto)
+
+
+def _bloque(n, nombre="Solicitud"):
+    return (
+        f"<b>Gerencia:</b> {html.escape(f'Gerencia {n % 7} & Asociados')}\n"
+        f"<b>Fase:</b> Estrategia de contratación 🔴\n"
+        f"<b>Solicitud (ID {n}):</b> {html.escape(f'{nombre} <{n}>')}\n\n"
+    )
+
+
+CASOS = {
+    "muchos_bloques": [_bloque(n) for n in range(600)],
+    "emoji_y_acentos": [
+        _bloque(n, "Contratación 🎉👍🏽 ñandú " * 10) for n in range(200)
+    ],
+    # Un bloque que por sí solo no cabe en un mensaje y debe partirse por líneas
+    "bloque_enorme": [_bloque(0), "".join(_bloque(n) for n in range(1, 200))],
+    # Una sola línea enorme dentro de una etiqueta: se parte entre tokens
+    "linea_enorme": ["<b>" + "texto &amp; 🔴 " * 2000 + "</b>\n"],
+}
+
+
+@pytest.mark.parametrize("caso", CASOS)
+def test_paginas_dentro_del_limite_y_balanceadas(caso):
+    bloques = CASOS[caso]
+    encabezado = "<b>Reporte de prueba</b>\n\n"
+    paginas = list(paginar(bloques, encabezado))
+    assert len(paginas) > 1
+    for pagina in paginas:
+        assert longitud(pagina) <= LIMITE_MENSAJE
+        assert _etiquetas_balanceadas(pagina), pagina[:200]
+        # Ninguna entidad HTML queda cortada al final de una página
+        assert not re.search(r"&#?\w*$", pagina)
+    assert _sin_etiquetas("".join(paginas)) == _sin_etiquetas(
+        encabezado + "".join(bloques)
+    )
+
+
+def test_corta_entre_bloques_y_llena_cada_pagina():
+    """
+    Cada página es una secuencia de bloques completos y se cerró porque el bloque
+    siguiente ya no cabía en ella.
+    """
+    bloques = [_bloque(n) for n in range(600)]
+    paginas = list(paginar(bloques))
+    siguiente = 0
+    for pagina in paginas:
+        contenido = ""
+        while contenido != pagina:
+            contenido += bloques[siguiente]
+            siguiente += 1
+            assert len(contenido) <= len(pagina)
+        if siguiente < len(bloques):
+            assert longitud(pagina) + longitud(bloques[siguiente]) > LIMITE_MENSAJE
+    assert siguiente == len(bloques)
+
+
+def test_longitud_en_unidades_utf16():
+    assert longitud("abc") == 3
+    assert longitud("ñ") == 1
+    assert longitud("🔴") == 2
+    assert longitud("👍🏽") == 4
+
+
+def test_sin_bloques_no_genera_mensajes():
+    assert list(paginar([])) == []
+    assert list(paginar([], "Encabezado")) == []
+
+
+def test_paginas_del_navegador_con_pie():
+    bloques = [_bloque(n) for n in range(600)]
+    paginas = list(paginar(bloques, limite=LIMITE_MENSAJE - _RESERVA_PIE))
+    for indice in range(len(paginas)):
+        texto, teclado = _pagina("prueba", 1, paginas, indice)
+        assert longitud(texto) <= LIMITE_MENSAJE
+        assert _etiquetas_balanceadas(texto)
+        assert teclado is not None
@@ -0,0 +1,81 @@
+# tests/test_plan_consultas.py
+# Regresión de EXPLAIN QUERY PLAN: las consultas por fecha del hito actual deben
+# resolverse con índices y no recorrer completas las tablas de solicitudes o hitos.
+
+from functools import partial
+
+import pytest
+
+from bot import database
+
+HASTA, DESDE = "2026-10-20", "2026-10-01"
+
+CONSULTAS = {
+    "hoy": partial(database.get_solicitudes_for_today),
+    "retrasadas": partial(database.get_delayed_solicitudes),
+    "retrasadas_filtradas": partial(database.get_delayed_solicitudes, "D", "G", "S"),
+    "responsables_notificar": partial(
+        database.get_responsables_para_notificar, HASTA, DESDE
+    ),
+    "solicitudes_notificar": partial(
+        database.get_solicitudes_para_notificar, HASTA, DESDE, "R"
+    ),
+    "pendientes_por_dia": partial(database.get_solicitudes_pendientes_por_dia),
+    "unidad_usuaria_por_dia": partial(
+        database.get_solicitudes_unidad_usuaria_pendientes_por_dia
+    ),
+}
+
+
+def _consultas_ejecutadas(conn, funcion):
+    """SQL (con los parámetros ya sustituidos) de los SELECT que ejecuta `funcion`."""
+    sentencias = []
+    conn.set_trace_callback(sentencias.append)
+    try:
+        funcion()
+    finally:
+        conn.set_trace_callback(None)
+    return [s for s in sentencias if s.lstrip().upper().startswith(("SELECT", "WITH"))]
+
+
+def _plan(conn, sql):
+    return [fila[3] for fila in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+
+
+@pytest.mark.parametrize("nombre", CONSULTAS)
+def test_consulta_usa_indices(db, nombre):
+    consultas = _consultas_ejecutadas(db, CONSULTAS[nombre])
+    assert consultas, f"{nombre} no ejecutó ninguna consulta"
+    for sql in consultas:
+        plan = _plan(db, sql)
+        recorridos = [
+            paso
+            for paso in plan
+            if paso.startswith("SCAN ")
+            and paso.split()[1] in ("solicitudes", "hitos", "s")
+            and "INDEX" not in paso
+        ]
+        assert not recorridos, f"{nombre} recorre la tabla completa: {plan}"
+        assert any("INDEX" in paso or "PRIMARY KEY" in paso for paso in plan), plan
+
+
+@pytest.mark.skipif(
+    database.HITOS_NORMALIZADOS, reason="solo aplica al modo de columnas anchas"
+)
+def test_fecha_actual_indexada(db):
+    """Las consultas por rango de fecha usan los índices de fecha_planificada_actual."""
+    for nombre in ("hoy", "retrasadas", "pendientes_por_dia"):
+        planes = [
+            _plan(db, sql) for sql in _consultas_ejecutadas(db, CONSULTAS[nombre])
+        ]
+        assert any(
+            "idx_solicitudes_fecha_actual" in paso for plan in planes for paso in plan
+        ), planes
+    for nombre, indice in (
+        ("retrasadas_filtradas", "idx_solicitudes_filtros_fecha"),
+        ("solicitudes_notificar", "idx_solicitudes_responsable_fecha"),
+    ):
+        planes = [
+            _plan(db, sql) for sql in _consultas_ejecutadas(db, CONSULTAS[nombre])
+        ]
+        assert any(indice in paso for plan in planes for paso in plan), planes
@@ -0,0 +1,51 @@
+# tests/test_scheduler.py
+# Detección al arrancar de una revisión diaria omitida o fallida.
+
+from datetime import datetime, time
+
+import pytest
+
+from bot import scheduler
+
+HORA = time(8, 0)
+
+
+@pytest.fixture(autouse=True)
+def ahora(monkeypatch):
+    monkeypatch.setattr(scheduler, "_ahora", lambda: datetime(2026, 5, 12, 10, 30))
+
+
+def _estado(ultima_ejecucion, resultado):
+    return {"ultima_ejecucion": ultima_ejecucion, "resultado": resultado}
+
+
+def test_sin_ejecuciones_registradas():
+    assert scheduler.revision_omitida(HORA, None)
+
+
+def test_la_revision_de_hoy_se_completo():
+    estado = _estado("2026-05-12 08:00:01", "12 mensajes encolados")
+    assert not scheduler.revision_omitida(HORA, estado)
+
+
+def test_la_ultima_revision_es_de_ayer():
+    estado = _estado("2026-05-11 08:00:01", "12 mensajes encolados")
+    assert scheduler.revision_omitida(HORA, estado)
+
+
+@pytest.mark.parametrize(
+    "resultado",
+    [
+        scheduler.RESULTADO_SIN_CONFIGURAR,
+        f"{scheduler.PREFIJO_ERROR}database is locked",
+        f"3 mensajes encolados; {scheduler.MARCA_GRUPOS_CON_ERROR}Gerencia 4",
+    ],
+)
+def test_una_revision_fallida_cuenta_como_omitida(resultado):
+    assert scheduler.revision_omitida(HORA, _estado("2026-05-12 08:00:01", resultado))
+
+
+def test_antes_de_la_hora_cuenta_la_revision_de_ayer(monkeypatch):
+    monkeypatch.setattr(scheduler, "_ahora", lambda: datetime(2026, 5, 12, 7, 0))
+    estado = _estado("2026-05-11 08:00:01", "sin usuarios")
+    assert not scheduler.revision_omitida(HORA, estado)